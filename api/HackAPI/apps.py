@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class HackapiConfig(AppConfig):
     default_auto_field = 'django_mongodb_backend.fields.ObjectIdAutoField'
     name = 'HackAPI'
+
+    def ready(self):
+        from .services import workspace_cache  # connects its Workspace signal receivers
@@ -0,0 +1,66 @@
+import random
+import re
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from HackAPI.services.github import parse_checkboxes_from_body
+
+
+def _line_by_line_parse(body):
+    """The previous parser (per-line re.match on '- [ ]' items), kept as a baseline."""
+    results = []
+    for line in body.splitlines():
+        match = re.match(r'^- \[([ xX])\] (.+)$', line.strip())
+        if match:
+            results.append((match.group(2).strip(), match.group(1).lower() == 'x'))
+    return results
+
+
+def _synthetic_body(checkboxes, rng, mixed=True):
+    """A PR-template-like body: prose, headings, code fences and nested task lists.
+
+    With mixed=False every item is a top-level '- [ ]' line, which both parsers read
+    the same way, so the timings compare equal work.
+    """
+    lines = []
+    for i in range(checkboxes):
+        if i % 10 == 0:
+            lines += ['', f'## Section {i // 10}', '', 'Some prose describing the section. ' * 3, '']
+        if mixed and i % 50 == 25:
+            lines += ['```python', 'for item in items:', '    - [ ] not a task', '```']
+        bullet = rng.choice(['-', '*', '+', f'{i}.']) if mixed else '-'
+        indent = '  ' * rng.choice([0, 0, 1, 2]) if mixed else ''
+        mark = rng.choice([' ', 'x'])
+        lines.append(f'{indent}{bullet} [{mark}] Task number {i} with a reasonably descriptive title')
+    return '\n'.join(lines)
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmark parse_checkboxes_from_body over large synthetic issue bodies.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10,100,1000,5000', help='Comma-separated checkbox counts.')
+        parser.add_argument('--repeat', type=int, default=5, help='Timing runs per size (best is reported).')
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        self.stdout.write(
+            f'{"syntax":>7} {"checkboxes":>10} {"body KiB":>9} {"parser ms":>10} {"found":>6} '
+            f'{"line-by-line ms":>16} {"found":>6}'
+        )
+        sizes = [int(s) for s in options['sizes'].split(',')]
+        for mixed, size in [(mixed, size) for mixed in (True, False) for size in sizes]:
+            body = _synthetic_body(size, rng, mixed)
+            number = max(1, 2000 // size)
+            parsed = min(timeit.repeat(
+                lambda: parse_checkboxes_from_body(body), number=number, repeat=options['repeat'],
+            )) / number
+            baseline = min(timeit.repeat(
+                lambda: _line_by_line_parse(body), number=number, repeat=options['repeat'],
+            )) / number
+            self.stdout.write(
+                f'{"mixed" if mixed else "dash":>7} {size:>10} {len(body) / 1024:>9.1f} '
+                f'{parsed * 1000:>10.3f} {len(parse_checkboxes_from_body(body)):>6} '
+                f'{baseline * 1000:>16.3f} {len(_line_by_line_parse(body)):>6}'
+            )
@@ -0,0 +1,122 @@
+import json
+
+from bson import ObjectId
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from HackAPI.models import BootstrapJob, Commit, CommitAnalysis, Feature, PullRequest, Task, WebhookEvent, Workspace
+from HackAPI.views import FeatureViewSet, TaskViewSet, WorkspaceViewSet
+
+
+def _viewset_queryset(viewset_class, user, params=None):
+    """Build a viewset's list queryset for `user` without going through the router."""
+    request = Request(APIRequestFactory().get('/', params or {}))
+    request.user = user
+    view = viewset_class(request=request, format_kwarg=None, action='list', kwargs={})
+    return view.get_queryset()
+
+
+def _plan_summary(plan, found=None):
+    """Collect 'STAGE(indexName)' entries from an explain document, outermost first."""
+    found = [] if found is None else found
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            stage = plan['stage']
+            found.append(f"{stage}({plan['indexName']})" if 'indexName' in plan else stage)
+        for key, value in plan.items():
+            if key not in ('rejectedPlans', 'allPlansExecution'):
+                _plan_summary(value, found)
+    elif isinstance(plan, list):
+        for item in plan:
+            _plan_summary(item, found)
+    return found
+
+
+class Command(BaseCommand):
+    help = 'Print MongoDB explain() output for the viewset and webhook hot query paths.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workspace', help='Workspace id to build sample queries for (default: most recent).')
+        parser.add_argument('--verbose', action='store_true', help='Print the full explain document.')
+
+    def handle(self, *args, **options):
+        if options['workspace']:
+            workspace = Workspace.objects.filter(pk=ObjectId(options['workspace'])).first()
+        else:
+            workspace = Workspace.objects.order_by('-created_at').first()
+        if workspace is None:
+            raise CommandError('No workspace found to build sample queries from.')
+
+        user = User.objects.filter(pk__in=workspace.members).first() or workspace.created_by
+        feature = workspace.features.first() or Feature(pk=ObjectId(), workspace=workspace)
+
+        for label, queryset in self._queries(workspace, user, feature):
+            explain = queryset.explain()
+            if options['verbose']:
+                self.stdout.write(f'== {label}\n{explain}\n')
+                continue
+            stages = _plan_summary(json.loads(explain))
+            uses_collscan = 'COLLSCAN' in stages
+            line = f'{label:<45} {" > ".join(stages) or "?"}'
+            self.stdout.write(self.style.WARNING(line) if uses_collscan else line)
+
+    def _queries(self, workspace, user, feature):
+        open_statuses = [Task.Status.TODO, Task.Status.IN_PROGRESS]
+        return [
+            # viewsets
+            ('WorkspaceViewSet list', _viewset_queryset(WorkspaceViewSet, user)),
+            ('FeatureViewSet list', _viewset_queryset(FeatureViewSet, user)),
+            ('FeatureViewSet ?workspace=',
+             _viewset_queryset(FeatureViewSet, user, {'workspace': str(workspace.pk)})),
+            ('TaskViewSet list', _viewset_queryset(TaskViewSet, user)),
+            ('TaskViewSet ?feature=', _viewset_queryset(TaskViewSet, user, {'feature': str(feature.pk)})),
+            ('TaskViewSet ?workspace=', _viewset_queryset(TaskViewSet, user, {'workspace': str(workspace.pk)})),
+            ('feature tasks by checkbox order', Task.objects.filter(feature=feature).order_by('checkbox_index')),
+            # webhook routing and handlers
+            ('workspace by owner/name', Workspace.objects.filter(
+                github_repo_owner=workspace.github_repo_owner, github_repo_name=workspace.github_repo_name,
+            )),
+            ('workspace by repository id', Workspace.objects.filter(github_repo_id=workspace.github_repo_id or 0)),
+            ('push: existing commit shas', Commit.objects.filter(sha__in=['0' * 40])),
+            ('push: open tasks', Task.objects.filter(workspace=workspace).exclude(status=Task.Status.DONE)),
+            ('push: features by closing reference', Feature.objects.filter(
+                workspace=workspace, github_number__in=[1],
+            )),
+            ('push: open tasks of referenced features', Task.objects.filter(
+                feature_id__in=[feature.pk], status__in=open_statuses,
+            )),
+            ('push: open tasks by normalized title', Task.objects.filter(
+                workspace=workspace, status__in=open_statuses, normalized_title__in=[''],
+            )),
+            ('push: complete tasks by title', Task.objects.filter(
+                workspace=workspace, title__in=[''], status__in=open_statuses,
+            )),
+            ('issues: feature by number', Feature.objects.filter(
+                workspace=workspace, github_number=1, type=Feature.Type.ISSUE,
+            )),
+            ('pull_request: feature by github_id', Feature.objects.filter(workspace=workspace, github_id=1)),
+            ('issue_comment: PR by number', PullRequest.objects.filter(workspace=workspace, number=1)),
+            ('commit history', Commit.objects.filter(workspace=workspace).order_by('-github_timestamp')),
+            ('bootstrap: latest job', BootstrapJob.objects.filter(workspace=workspace).order_by('-created_at')),
+            ('bootstrap: active job', BootstrapJob.objects.filter(
+                workspace=workspace, status__in=[BootstrapJob.Status.PENDING, BootstrapJob.Status.RUNNING],
+            ).order_by('-created_at')),
+            ('bootstrap: pending jobs', BootstrapJob.objects.filter(
+                status=BootstrapJob.Status.PENDING,
+            ).order_by('created_at')),
+            ('webhook queue: due deliveries', WebhookEvent.objects.filter(
+                status=WebhookEvent.Status.PENDING,
+            ).order_by('next_attempt_at')),
+            ('issue sync: dirty features', Feature.objects.filter(
+                body_dirty_at__lte=timezone.now(),
+            ).order_by('body_dirty_at')),
+            ('commit analysis: due batches', CommitAnalysis.objects.filter(
+                status=CommitAnalysis.Status.PENDING, next_attempt_at__lte=timezone.now(),
+            ).order_by('created_at')),
+            ('commit analysis: workspace queue', CommitAnalysis.objects.filter(
+                workspace=workspace, status=CommitAnalysis.Status.PENDING,
+            ).order_by('created_at')),
+        ]
@@ -0,0 +1,160 @@
+import json
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from HackAPI.models import WebhookEvent
+from HackAPI.services.bootstrap import claim_bootstrap_jobs, release_stale_bootstraps, run_bootstrap
+from HackAPI.services.commit_batcher import process_due_analyses
+from HackAPI.services.delivery_ledger import forget_delivery, record_result
+from HackAPI.services.issue_sync import flush_dirty_features
+from HackAPI.services.process_metrics import snapshot_metrics
+from HackAPI.services.webhook_queue import claim_due_events, mark_done, mark_failed, release_expired_leases
+from HackAPI.views.webhooks import dispatch_event
+
+# Ceiling on the wait between polls after consecutive queue errors
+_MAX_ERROR_BACKOFF_SECONDS = 60
+
+# Durable background work drained alongside the webhook queue, once per poll interval
+_CHORES = [
+    ('issue body sync', flush_dirty_features),
+    ('commit analysis', process_due_analyses),
+    ('metrics snapshot', snapshot_metrics),
+]
+
+
+@contextmanager
+def _db_work():
+    """Clean up this thread's database connections around a unit of work, as Django does per request.
+
+    Pool threads live as long as the worker; without this a connection that broke
+    or outlived CONN_MAX_AGE would be reused by every later delivery on the thread.
+    """
+    close_old_connections()
+    try:
+        yield
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = (
+        'Drain queued GitHub webhook deliveries (GITHUB_WEBHOOK_ASYNC mode), pending issue-body syncs, '
+        'queued commit analyses and workspace bootstrap jobs.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=settings.WEBHOOK_WORKER_CONCURRENCY,
+            help='Deliveries processed in parallel (never more than one per repo at a time).',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=settings.WEBHOOK_WORKER_POLL_SECONDS,
+            help='Seconds to wait between polls when the queue is idle.',
+        )
+        parser.add_argument(
+            '--max-attempts', type=int, default=settings.WEBHOOK_MAX_ATTEMPTS,
+            help='Attempts before a delivery is marked failed.',
+        )
+        parser.add_argument('--once', action='store_true', help='Exit once nothing is due instead of polling.')
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        poll_interval = options['poll_interval']
+        max_attempts = options['max_attempts']
+
+        self.stdout.write(f'[INFO] Webhook worker started (concurrency={concurrency})')
+        in_flight = {}  # future -> ordering_key
+        bootstrapping = set()  # futures of running bootstrap jobs
+        failures = 0
+        chore, chores_started = None, float('-inf')
+        with (
+            ThreadPoolExecutor(max_workers=concurrency) as pool,
+            ThreadPoolExecutor(max_workers=1) as chores,
+            ThreadPoolExecutor(max_workers=max(1, settings.BOOTSTRAP_MAX_WORKERS)) as bootstraps,
+        ):
+            while True:
+                if (chore is None or chore.done()) and time.monotonic() - chores_started >= poll_interval:
+                    chore, chores_started = chores.submit(self._run_chores), time.monotonic()
+
+                for future in [f for f in in_flight if f.done()]:
+                    in_flight.pop(future)
+                    if future.exception() is not None:
+                        # mark_done/mark_failed itself failed; the lease expiry hands the delivery back
+                        print('[ERROR] Webhook worker task crashed')
+                        traceback.print_exception(future.exception())
+
+                bootstrapping = {future for future in bootstrapping if not future.done()}
+
+                try:
+                    release_expired_leases()
+                    claimed = claim_due_events(concurrency - len(in_flight), busy_keys=set(in_flight.values()))
+                    release_stale_bootstraps()
+                    jobs = claim_bootstrap_jobs(settings.BOOTSTRAP_MAX_WORKERS - len(bootstrapping))
+                except Exception:
+                    # A transient MongoDB error must not stop the queue from draining
+                    close_old_connections()
+                    failures += 1
+                    delay = min(max(poll_interval, 1) * 2 ** (failures - 1), _MAX_ERROR_BACKOFF_SECONDS)
+                    print(f'[ERROR] Webhook worker poll failed, retrying in {delay:.1f}s')
+                    traceback.print_exc()
+                    time.sleep(delay)
+                    continue
+                failures = 0
+
+                for webhook_event in claimed:
+                    future = pool.submit(self._process, webhook_event, max_attempts)
+                    in_flight[future] = webhook_event.ordering_key
+                for job_id in jobs:
+                    bootstrapping.add(bootstraps.submit(self._bootstrap, job_id))
+
+                if claimed:
+                    continue
+                if options['once'] and not in_flight and not bootstrapping:
+                    break
+                if in_flight:
+                    wait(list(in_flight), timeout=poll_interval, return_when=FIRST_COMPLETED)
+                else:
+                    time.sleep(poll_interval)
+
+    def _run_chores(self):
+        for name, chore in _CHORES:
+            try:
+                with _db_work():
+                    chore()
+            except Exception:
+                print(f'[ERROR] Worker chore failed: {name}')
+                traceback.print_exc()
+
+    def _bootstrap(self, job_id):
+        try:
+            with _db_work():
+                run_bootstrap(job_id)
+        except Exception:
+            # run_bootstrap records its own failures; this is a crash writing them, so the job
+            # stays 'running' until release_stale_bootstraps() hands it out again
+            print(f'[ERROR] Bootstrap job {job_id} crashed')
+            traceback.print_exc()
+
+    def _process(self, webhook_event, max_attempts):
+        with _db_work():
+            self._deliver(webhook_event, max_attempts)
+
+    def _deliver(self, webhook_event, max_attempts):
+        try:
+            result = dispatch_event(webhook_event.event, json.loads(webhook_event.body))
+        except Exception:
+            print(f'[ERROR] Webhook delivery {webhook_event.delivery_id} ({webhook_event.event}) failed')
+            traceback.print_exc()
+            mark_failed(webhook_event, traceback.format_exc(), max_attempts)
+            if webhook_event.status == WebhookEvent.Status.FAILED:
+                # Let a manual redelivery from GitHub try again
+                forget_delivery(webhook_event.delivery_id)
+            return
+        mark_done(webhook_event, result)
+        record_result(webhook_event.delivery_id, result)
@@ -0,0 +1,41 @@
+import django_mongodb_backend.fields
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_ttl_index(apps, schema_editor):
+    WebhookDelivery = apps.get_model('HackAPI', 'WebhookDelivery')
+    collection = schema_editor.connection.get_collection(WebhookDelivery._meta.db_table)
+    collection.create_index(
+        'created_at',
+        name='webhookdelivery_created_at_ttl',
+        expireAfterSeconds=settings.WEBHOOK_DELIVERY_TTL_SECONDS,
+    )
+
+
+def drop_ttl_index(apps, schema_editor):
+    WebhookDelivery = apps.get_model('HackAPI', 'WebhookDelivery')
+    collection = schema_editor.connection.get_collection(WebhookDelivery._meta.db_table)
+    collection.drop_index('webhookdelivery_created_at_ttl')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HackAPI', '0007_webhookevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookDelivery',
+            fields=[
+                ('id', django_mongodb_backend.fields.ObjectIdAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delivery_id', models.CharField(max_length=255, unique=True)),
+                ('event', models.CharField(max_length=100)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(create_ttl_index, drop_ttl_index),
+    ]
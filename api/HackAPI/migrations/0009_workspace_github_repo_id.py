@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HackAPI', '0008_webhookdelivery'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workspace',
+            name='github_repo_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='workspace',
+            index=models.Index(fields=['github_repo_owner', 'github_repo_name'], name='HackAPI_wor_github__e61313_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workspace',
+            index=models.Index(fields=['github_repo_id'], name='HackAPI_wor_github__eccc9c_idx'),
+        ),
+    ]
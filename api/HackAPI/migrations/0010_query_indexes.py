@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HackAPI', '0009_workspace_github_repo_id'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='commit',
+            index=models.Index(fields=['workspace', 'github_timestamp'], name='HackAPI_com_workspa_7e9389_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feature',
+            index=models.Index(fields=['workspace', 'github_id'], name='HackAPI_fea_workspa_46dd87_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feature',
+            index=models.Index(fields=['workspace', 'type', 'github_number'], name='HackAPI_fea_workspa_dcde91_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pullrequest',
+            index=models.Index(fields=['workspace', 'number'], name='HackAPI_pul_workspa_4f9a0e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['feature', 'status'], name='HackAPI_tas_feature_03e9bd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['feature', 'checkbox_index'], name='HackAPI_tas_feature_bc17ed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workspace',
+            index=models.Index(fields=['members'], name='HackAPI_wor_members_f801e5_idx'),
+        ),
+    ]
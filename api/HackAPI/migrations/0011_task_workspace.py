@@ -0,0 +1,34 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_task_workspace(apps, schema_editor):
+    Feature = apps.get_model('HackAPI', 'Feature')
+    Task = apps.get_model('HackAPI', 'Task')
+    feature_ids_by_workspace = {}
+    for feature_id, workspace_id in Feature.objects.values_list('id', 'workspace_id'):
+        feature_ids_by_workspace.setdefault(workspace_id, []).append(feature_id)
+    for workspace_id, feature_ids in feature_ids_by_workspace.items():
+        Task.objects.filter(feature_id__in=feature_ids).update(workspace_id=workspace_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HackAPI', '0010_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='workspace',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='HackAPI.workspace'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['workspace', 'status'], name='HackAPI_tas_workspa_cb909c_idx'),
+        ),
+        migrations.RunPython(backfill_task_workspace, migrations.RunPython.noop),
+    ]
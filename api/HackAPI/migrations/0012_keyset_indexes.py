@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HackAPI', '0011_task_workspace'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='feature',
+            index=models.Index(fields=['workspace', 'created_at'], name='HackAPI_fea_workspa_eff9f2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['workspace', 'created_at'], name='HackAPI_tas_workspa_69bc13_idx'),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HackAPI', '0012_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feature',
+            name='github_body_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,41 @@
+import django_mongodb_backend.fields
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_ttl_index(apps, schema_editor):
+    GeminiResponse = apps.get_model('HackAPI', 'GeminiResponse')
+    collection = schema_editor.connection.get_collection(GeminiResponse._meta.db_table)
+    collection.create_index(
+        'created_at',
+        name='geminiresponse_created_at_ttl',
+        expireAfterSeconds=settings.GEMINI_CACHE_TTL_SECONDS,
+    )
+
+
+def drop_ttl_index(apps, schema_editor):
+    GeminiResponse = apps.get_model('HackAPI', 'GeminiResponse')
+    collection = schema_editor.connection.get_collection(GeminiResponse._meta.db_table)
+    collection.drop_index('geminiresponse_created_at_ttl')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HackAPI', '0013_feature_github_body_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeminiResponse',
+            fields=[
+                ('id', django_mongodb_backend.fields.ObjectIdAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('model', models.CharField(max_length=100)),
+                ('template', models.CharField(max_length=100)),
+                ('text', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RunPython(create_ttl_index, drop_ttl_index),
+    ]
@@ -0,0 +1,32 @@
+import django.db.models.deletion
+import django_mongodb_backend.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HackAPI', '0014_geminiresponse'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BootstrapJob',
+            fields=[
+                ('id', django_mongodb_backend.fields.ObjectIdAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('step', models.CharField(blank=True, default='', max_length=50)),
+                ('progress', models.IntegerField(default=0)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('workspace', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bootstrap_jobs', to='HackAPI.workspace')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['workspace', 'created_at'], name='HackAPI_boo_workspa_b8fd90_idx')],
+            },
+        ),
+    ]
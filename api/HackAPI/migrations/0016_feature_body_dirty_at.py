@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HackAPI', '0015_bootstrapjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feature',
+            name='body_dirty_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='feature',
+            index=models.Index(fields=['body_dirty_at'], name='HackAPI_fea_body_di_1c9857_idx'),
+        ),
+    ]
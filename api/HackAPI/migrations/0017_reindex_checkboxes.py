@@ -0,0 +1,87 @@
+import re
+
+from django.db import migrations
+
+# The checkbox grammar the previous line-by-line parser accepted: '- [ ] title' lines,
+# at any indentation, including inside code fences
+_LEGACY_CHECKBOX_RE = re.compile(r'^- \[([ xX])\] (.+)$')
+
+
+def _legacy_checkbox_lines(body):
+    """1-based ('\\n'-counted) line numbers of the checkboxes the old parser found, in order."""
+    lines = []
+    line = 1
+    for text in body.splitlines(keepends=True):
+        if _LEGACY_CHECKBOX_RE.match(text.strip()):
+            lines.append(line)
+        line += text.count('\n')
+    return lines
+
+
+# The current grammar, frozen from services/github.py at the time of this migration:
+# '-', '*', '+' bullets or '1.' / '1)' ordered items, at any indentation, outside fences
+_CHECKBOX_RE = re.compile(
+    r'^(?P<indent>[ \t]*)(?:'
+    r'(?P<fence>`{3,}|~{3,})[^\n]*'
+    r'|(?:[-*+]|\d{1,9}[.)])[ \t]+\[(?P<mark>[ xX])\][ \t]+(?P<title>[^\n]*\S)[ \t\r]*'
+    r')$',
+    re.MULTILINE,
+)
+
+
+def _current_checkbox_lines(body):
+    """1-based line numbers of the checkboxes the current parser finds, in order."""
+    lines = []
+    fence = None
+    line, pos = 1, 0
+    for match in _CHECKBOX_RE.finditer(body):
+        start = match.start()
+        line += body.count('\n', pos, start)
+        pos = start
+        marker = match.group('fence')
+        if marker is not None:
+            if fence is None:
+                fence = marker
+            elif marker[0] == fence[0] and len(marker) >= len(fence):
+                fence = None
+            continue
+        if fence is None:
+            lines.append(line)
+    return lines
+
+
+def reindex_checkboxes(apps, schema_editor):
+    """Move Task.checkbox_index from the old parser's numbering to the current one.
+
+    Bodies with '*', '+' or numbered items, or checkboxes inside code fences, are
+    numbered differently by the two parsers. Each task is moved to the index the
+    current parser gives its line; a task whose line is no longer a checkbox
+    (inside a fence) loses its index, so the next sync matches it by title.
+    """
+    Feature = apps.get_model('HackAPI', 'Feature')
+    Task = apps.get_model('HackAPI', 'Task')
+    features = Feature.objects.filter(description__contains='[').values_list('pk', 'description')
+    for feature_id, body in features.iterator():
+        current = {line: i for i, line in enumerate(_current_checkbox_lines(body))}
+        remap = {
+            old: current.get(line)
+            for old, line in enumerate(_legacy_checkbox_lines(body))
+            if current.get(line) != old
+        }
+        if not remap:
+            continue
+        tasks = list(Task.objects.filter(feature_id=feature_id, checkbox_index__in=list(remap)))
+        for task in tasks:
+            task.checkbox_index = remap[task.checkbox_index]
+        Task.objects.bulk_update(tasks, ['checkbox_index'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HackAPI', '0016_feature_body_dirty_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(reindex_checkboxes, migrations.RunPython.noop),
+    ]
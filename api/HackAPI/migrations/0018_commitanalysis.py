@@ -0,0 +1,54 @@
+import django.db.models.deletion
+import django.utils.timezone
+import django_mongodb_backend.fields
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_ttl_index(apps, schema_editor):
+    CommitAnalysis = apps.get_model('HackAPI', 'CommitAnalysis')
+    collection = schema_editor.connection.get_collection(CommitAnalysis._meta.db_table)
+    collection.create_index(
+        'updated_at',
+        name='commitanalysis_finished_ttl',
+        expireAfterSeconds=settings.COMMIT_ANALYSIS_TTL_SECONDS,
+        partialFilterExpression={'status': {'$in': ['done', 'failed']}},
+    )
+
+
+def drop_ttl_index(apps, schema_editor):
+    CommitAnalysis = apps.get_model('HackAPI', 'CommitAnalysis')
+    collection = schema_editor.connection.get_collection(CommitAnalysis._meta.db_table)
+    collection.drop_index('commitanalysis_finished_ttl')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HackAPI', '0017_reindex_checkboxes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommitAnalysis',
+            fields=[
+                ('id', django_mongodb_backend.fields.ObjectIdAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('commit_messages', django_mongodb_backend.fields.ArrayField(base_field=models.TextField(), blank=True, default=list)),
+                ('changed_files', django_mongodb_backend.fields.ArrayField(base_field=models.CharField(max_length=500), blank=True, default=list)),
+                ('sha', models.CharField(blank=True, default='', max_length=40)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.IntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('workspace', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='commit_analyses', to='HackAPI.workspace')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='HackAPI_com_status_684e7f_idx'), models.Index(fields=['workspace', 'status', 'created_at'], name='HackAPI_com_workspa_9975df_idx')],
+            },
+        ),
+        migrations.RunPython(create_ttl_index, drop_ttl_index),
+    ]
@@ -0,0 +1,47 @@
+import re
+
+from django.db import migrations, models
+
+# Frozen from services/commit_matcher.py at the time of this migration
+_CONVENTIONAL_PREFIX_RE = re.compile(r'^[a-z]+(?:\([^)]*\))?!?:\s*', re.IGNORECASE)
+_TRAILING_REF_RE = re.compile(r'\s*\(?#\d+\)?$')
+_NON_WORD_RE = re.compile(r'[^\w]+')
+
+
+def normalize_title(text):
+    text = _CONVENTIONAL_PREFIX_RE.sub('', text.strip())
+    text = _TRAILING_REF_RE.sub('', text)
+    return _NON_WORD_RE.sub(' ', text).strip().lower()
+
+
+def backfill_normalized_titles(apps, schema_editor):
+    Task = apps.get_model('HackAPI', 'Task')
+    batch = []
+    for task in Task.objects.only('pk', 'title').iterator():
+        task.normalized_title = normalize_title(task.title)
+        batch.append(task)
+        if len(batch) >= 1000:
+            Task.objects.bulk_update(batch, ['normalized_title'])
+            batch = []
+    if batch:
+        Task.objects.bulk_update(batch, ['normalized_title'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HackAPI', '0018_commitanalysis'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='normalized_title',
+            field=models.CharField(blank=True, default='', editable=False, max_length=500),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['workspace', 'normalized_title'], name='HackAPI_tas_workspa_6ada7c_idx'),
+        ),
+        migrations.RunPython(backfill_normalized_titles, migrations.RunPython.noop),
+    ]
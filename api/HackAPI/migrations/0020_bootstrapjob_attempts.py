@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HackAPI', '0019_task_normalized_title'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bootstrapjob',
+            name='attempts',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='bootstrapjob',
+            index=models.Index(fields=['status', 'created_at'], name='HackAPI_boo_status_1a9b03_idx'),
+        ),
+    ]
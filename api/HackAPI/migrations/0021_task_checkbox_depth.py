@@ -0,0 +1,66 @@
+import re
+
+from django.db import migrations, models
+
+# Frozen from services/github.py at the time of this migration
+_CHECKBOX_RE = re.compile(
+    r'^(?P<indent>[ \t]*)(?:'
+    r'(?P<fence>`{3,}|~{3,})[^\n]*'
+    r'|(?:[-*+]|\d{1,9}[.)])[ \t]+\[(?P<mark>[ xX])\][ \t]+(?P<title>[^\n]*\S)[ \t\r]*'
+    r')$',
+    re.MULTILINE,
+)
+
+
+def _checkbox_depths(body):
+    """Nesting depth of each checkbox in the body, in order."""
+    depths = []
+    stack = []  # indent widths of the open ancestor checkboxes
+    fence = None
+    for match in _CHECKBOX_RE.finditer(body):
+        indent, marker = match.group('indent', 'fence')
+        if marker is not None:
+            if fence is None:
+                fence = marker
+            elif marker[0] == fence[0] and len(marker) >= len(fence):
+                fence = None
+            continue
+        if fence is not None:
+            continue
+        width = len(indent.expandtabs(4))
+        while stack and stack[-1] >= width:
+            stack.pop()
+        depths.append(len(stack))
+        stack.append(width)
+    return depths
+
+
+def backfill_checkbox_depths(apps, schema_editor):
+    """Give tasks synced from nested checkboxes their depth, so re-rendering keeps the nesting."""
+    Feature = apps.get_model('HackAPI', 'Feature')
+    Task = apps.get_model('HackAPI', 'Task')
+    features = Feature.objects.filter(description__contains='[').values_list('pk', 'description')
+    for feature_id, body in features.iterator():
+        nested = {i: depth for i, depth in enumerate(_checkbox_depths(body)) if depth}
+        if not nested:
+            continue
+        tasks = list(Task.objects.filter(feature_id=feature_id, checkbox_index__in=list(nested)))
+        for task in tasks:
+            task.checkbox_depth = nested[task.checkbox_index]
+        Task.objects.bulk_update(tasks, ['checkbox_depth'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HackAPI', '0020_bootstrapjob_attempts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='checkbox_depth',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_checkbox_depths, migrations.RunPython.noop),
+    ]
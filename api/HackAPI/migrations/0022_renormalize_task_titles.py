@@ -0,0 +1,40 @@
+import re
+
+from django.db import migrations
+
+# Frozen from services/commit_matcher.py at the time of this migration: titles keep
+# any "word:" prefix, which is now stripped from commit subjects only
+_TRAILING_REF_RE = re.compile(r'\s*\(?#\d+\)?$')
+_NON_WORD_RE = re.compile(r'[^\w]+')
+
+
+def normalize_title(text):
+    text = _TRAILING_REF_RE.sub('', text.strip())
+    return _NON_WORD_RE.sub(' ', text).strip().lower()
+
+
+def renormalize_task_titles(apps, schema_editor):
+    """Recompute Task.normalized_title for titles whose prefix 0019 stripped."""
+    Task = apps.get_model('HackAPI', 'Task')
+    batch = []
+    for task in Task.objects.filter(title__contains=':').only('pk', 'title', 'normalized_title').iterator():
+        normalized = normalize_title(task.title)
+        if normalized != task.normalized_title:
+            task.normalized_title = normalized
+            batch.append(task)
+        if len(batch) >= 1000:
+            Task.objects.bulk_update(batch, ['normalized_title'])
+            batch = []
+    if batch:
+        Task.objects.bulk_update(batch, ['normalized_title'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HackAPI', '0021_task_checkbox_depth'),
+    ]
+
+    operations = [
+        migrations.RunPython(renormalize_task_titles, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+import django_mongodb_backend.fields
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_ttl_index(apps, schema_editor):
+    ProcessMetrics = apps.get_model('HackAPI', 'ProcessMetrics')
+    collection = schema_editor.connection.get_collection(ProcessMetrics._meta.db_table)
+    collection.create_index(
+        'updated_at',
+        name='processmetrics_stale_ttl',
+        expireAfterSeconds=settings.METRICS_SNAPSHOT_TTL_SECONDS,
+    )
+
+
+def drop_ttl_index(apps, schema_editor):
+    ProcessMetrics = apps.get_model('HackAPI', 'ProcessMetrics')
+    collection = schema_editor.connection.get_collection(ProcessMetrics._meta.db_table)
+    collection.drop_index('processmetrics_stale_ttl')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HackAPI', '0022_renormalize_task_titles'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessMetrics',
+            fields=[
+                ('id', django_mongodb_backend.fields.ObjectIdAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('process', models.CharField(max_length=255, unique=True)),
+                ('metrics', models.JSONField(default=dict)),
+                ('started_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(create_ttl_index, drop_ttl_index),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 from django_mongodb_backend.fields import ArrayField, ObjectIdField
 
@@ -8,6 +9,8 @@ class Workspace(models.Model):
     github_repo_url = models.URLField()
     github_repo_owner = models.CharField(max_length=255)
     github_repo_name = models.CharField(max_length=255)
+    # GitHub's numeric repository id — survives repo renames and transfers
+    github_repo_id = models.BigIntegerField(null=True, blank=True)
     webhook_id = models.CharField(max_length=255, blank=True, default='')
     github_token = models.CharField(max_length=255, blank=True, default='')
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='owned_workspaces')
@@ -15,6 +18,14 @@ class Workspace(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['github_repo_owner', 'github_repo_name']),
+            models.Index(fields=['github_repo_id']),
+            # members is an array, so this is a multikey index
+            models.Index(fields=['members']),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -37,12 +48,40 @@ class Feature(models.Model):
     github_id = models.BigIntegerField(null=True, blank=True)
     html_url = models.URLField(blank=True, default='')
     state = models.CharField(max_length=10, choices=State.choices, default=State.OPEN)
+    # sha256 of the issue/PR body as last pushed to or received from GitHub
+    github_body_hash = models.CharField(max_length=64, blank=True, default='')
+    # Set when task edits leave the GitHub body out of date; cleared once it is PATCHed
+    body_dirty_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['workspace', 'github_id']),
+            models.Index(fields=['workspace', 'type', 'github_number']),
+            models.Index(fields=['workspace', 'created_at']),
+            models.Index(fields=['body_dirty_at']),
+        ]
+
     def __str__(self):
         return self.name
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # workspace_id as loaded, to tell a save that moves the feature; read from
+        # __dict__ so a deferred field isn't fetched (None then means unknown)
+        self._loaded_workspace_id = self.__dict__.get('workspace_id')
+
+    def save(self, *args, **kwargs):
+        writes_workspace = kwargs.get('update_fields') is None or 'workspace' in kwargs['update_fields']
+        moving = writes_workspace and not self._state.adding and self.workspace_id != self._loaded_workspace_id
+        super().save(*args, **kwargs)
+        if moving:
+            # Keep the denormalized Task.workspace in step when a feature changes workspace
+            self.tasks.exclude(workspace_id=self.workspace_id).update(workspace_id=self.workspace_id)
+        if writes_workspace:
+            self._loaded_workspace_id = self.workspace_id
+
 
 class Task(models.Model):
     class Status(models.TextChoices):
@@ -56,7 +95,13 @@ class Task(models.Model):
         HIGH = 'high', 'High'
 
     feature = models.ForeignKey(Feature, on_delete=models.CASCADE, related_name='tasks', null=True, blank=True)
+    # Denormalized from feature.workspace so workspace-wide task queries stay on one collection
+    workspace = models.ForeignKey(
+        Workspace, on_delete=models.CASCADE, related_name='tasks', null=True, blank=True, editable=False
+    )
     title = models.CharField(max_length=500)
+    # normalize_title(title), so commits can be matched to tasks with an indexed lookup
+    normalized_title = models.CharField(max_length=500, blank=True, default='', editable=False)
     description = models.TextField(blank=True, default='')
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.TODO)
     priority = models.CharField(max_length=10, choices=Priority.choices, default=Priority.MEDIUM)
@@ -65,12 +110,45 @@ class Task(models.Model):
     )
     completed_by_commit = models.CharField(max_length=255, blank=True, default='')
     checkbox_index = models.IntegerField(null=True, blank=True)
+    # Nesting level of the task's checkbox line (0 = top level); read in checkbox_index
+    # order, each task's parent is the nearest earlier one a level up
+    checkbox_depth = models.PositiveSmallIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['feature', 'status']),
+            models.Index(fields=['feature', 'checkbox_index']),
+            models.Index(fields=['workspace', 'status']),
+            models.Index(fields=['workspace', 'created_at']),
+            models.Index(fields=['workspace', 'normalized_title']),
+        ]
+
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        from .services.commit_matcher import normalize_title
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'feature' in update_fields:
+            self.workspace_id = self._feature_workspace_id()
+            if update_fields is not None:
+                kwargs['update_fields'] = update_fields = {*update_fields, 'workspace'}
+        if update_fields is None or 'title' in update_fields:
+            self.normalized_title = normalize_title(self.title)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'normalized_title'}
+        super().save(*args, **kwargs)
+
+    def _feature_workspace_id(self):
+        if self.feature_id is None:
+            return None
+        if Task.feature.is_cached(self) and self.feature.pk == self.feature_id:
+            return self.feature.workspace_id
+        return Feature.objects.filter(pk=self.feature_id).values_list('workspace_id', flat=True).first()
+
 
 class GitHubLabel(models.Model):
     workspace = models.ForeignKey(Workspace, on_delete=models.CASCADE, related_name='labels')
@@ -161,6 +239,9 @@ class PullRequest(models.Model):
 
     class Meta:
         unique_together = [('workspace', 'github_id')]
+        indexes = [
+            models.Index(fields=['workspace', 'number']),
+        ]
 
     def __str__(self):
         return f'PR #{self.number}: {self.title}'
@@ -187,6 +268,11 @@ class Commit(models.Model):
     github_timestamp = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['workspace', 'github_timestamp']),
+        ]
+
     def __str__(self):
         return self.sha[:12]
 
@@ -252,3 +338,141 @@ class PRComment(models.Model):
 
     def __str__(self):
         return f'{self.comment_type} comment {self.github_id}'
+
+
+class WebhookEvent(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        PROCESSING = 'processing', 'Processing'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+
+    delivery_id = models.CharField(max_length=255, blank=True, default='')
+    event = models.CharField(max_length=100)
+    # Deliveries sharing a key (the repo's owner/name) are processed strictly in order
+    ordering_key = models.CharField(max_length=511, blank=True, default='')
+    headers = models.JSONField(default=dict, blank=True)
+    body = models.TextField()
+
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    result = models.JSONField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+            models.Index(fields=['ordering_key', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.event} {self.delivery_id}'
+
+
+class WebhookDelivery(models.Model):
+    # Ledger of X-GitHub-Delivery ids already accepted; expired by a TTL index on created_at
+    delivery_id = models.CharField(max_length=255, unique=True)
+    event = models.CharField(max_length=100)
+    result = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.delivery_id
+
+
+class GeminiResponse(models.Model):
+    # Content-addressed cache of Gemini responses; expired by a TTL index on created_at
+    key = models.CharField(max_length=64, unique=True)
+    model = models.CharField(max_length=100)
+    template = models.CharField(max_length=100)
+    text = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.template} ({self.model})'
+
+
+class BootstrapJob(models.Model):
+    # Tracks the background setup of a new workspace: webhook, repo scan, AI-generated features
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        RUNNING = 'running', 'Running'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+
+    workspace = models.ForeignKey(Workspace, on_delete=models.CASCADE, related_name='bootstrap_jobs')
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    step = models.CharField(max_length=50, blank=True, default='')
+    progress = models.IntegerField(default=0)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    # Times a worker has claimed the job; more than one means an interrupted run was resumed
+    attempts = models.IntegerField(default=0)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['workspace', 'created_at']),
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.workspace_id} {self.status}'
+
+
+class CommitAnalysis(models.Model):
+    # A push or merged PR waiting for Gemini to decide which tasks it completes. Queued by
+    # the webhook handlers and analyzed in per-workspace batches by `manage.py process_webhooks`;
+    # finished rows are expired by a partial TTL index on updated_at
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        PROCESSING = 'processing', 'Processing'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+
+    workspace = models.ForeignKey(Workspace, on_delete=models.CASCADE, related_name='commit_analyses')
+    commit_messages = ArrayField(models.TextField(), default=list, blank=True)
+    changed_files = ArrayField(models.CharField(max_length=500), default=list, blank=True)
+    # Recorded as Task.completed_by_commit on the tasks this analysis completes
+    sha = models.CharField(max_length=40, blank=True, default='')
+
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    result = models.JSONField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+            models.Index(fields=['workspace', 'status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.workspace_id} {self.sha} {self.status}'
+
+
+class ProcessMetrics(models.Model):
+    # The latest service counters of one `manage.py process_webhooks` worker, written
+    # every METRICS_SNAPSHOT_SECONDS so the metrics endpoint can report work done outside
+    # the web process; rows of workers that stopped are expired by a TTL index on updated_at
+    process = models.CharField(max_length=255, unique=True)  # "worker@<host>:<pid>"
+    metrics = models.JSONField(default=dict)
+    started_at = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.process
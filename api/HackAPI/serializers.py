@@ -1,7 +1,9 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.db.models import Count
+from django.db.models.manager import BaseManager
 
-from .models import Workspace, Feature, Task
+from .models import BootstrapJob, Workspace, Feature, Task
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -13,7 +15,37 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class FeatureSerializer(serializers.ModelSerializer):
+def _task_counts(group_field, ids):
+    """Task counts for many features/workspaces in one grouped aggregation."""
+    rows = Task.objects.filter(**{f'{group_field}__in': ids}).values(group_field).annotate(n=Count('pk'))
+    return {row[group_field]: row['n'] for row in rows}
+
+
+class BulkContextListSerializer(serializers.ListSerializer):
+    """List serializer that loads per-item related data for the whole page up front.
+
+    The child serializer implements `bulk_context(instances)`, returning values that are
+    merged into the shared context before any item is serialized.
+    """
+
+    def to_representation(self, data):
+        instances = list(data.all() if isinstance(data, BaseManager) else data)
+        self.child.context.update(self.child.bulk_context(instances))
+        return super().to_representation(instances)
+
+
+class ProjectedFieldsMixin:
+    """Serialize only the fields named in context['fields'] (the ?fields= projection)."""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested = self.context.get('fields')
+        if requested:
+            fields = {name: field for name, field in fields.items() if name in requested}
+        return fields
+
+
+class FeatureSerializer(ProjectedFieldsMixin, serializers.ModelSerializer):
     id = serializers.CharField(read_only=True)
     workspace = serializers.PrimaryKeyRelatedField(queryset=Workspace.objects.all())
     task_count = serializers.SerializerMethodField()
@@ -26,8 +58,17 @@ class FeatureSerializer(serializers.ModelSerializer):
             'task_count', 'created_at', 'updated_at',
         ]
         read_only_fields = ['id', 'github_number', 'github_id', 'html_url', 'created_at', 'updated_at']
+        list_serializer_class = BulkContextListSerializer
+
+    def bulk_context(self, features):
+        if 'task_count' not in self.fields:
+            return {}
+        return {'task_counts': _task_counts('feature_id', [f.pk for f in features])}
 
     def get_task_count(self, obj):
+        task_counts = self.context.get('task_counts')
+        if task_counts is not None:
+            return task_counts.get(obj.pk, 0)
         return obj.tasks.count()
 
     def to_representation(self, instance):
@@ -37,7 +78,7 @@ class FeatureSerializer(serializers.ModelSerializer):
         return ret
 
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(ProjectedFieldsMixin, serializers.ModelSerializer):
     id = serializers.CharField(read_only=True)
     feature = serializers.PrimaryKeyRelatedField(queryset=Feature.objects.all(), allow_null=True)
     assigned_to = UserSerializer(read_only=True)
@@ -50,9 +91,11 @@ class TaskSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'feature', 'title', 'description', 'status', 'priority',
             'assigned_to', 'assigned_to_id', 'completed_by_commit',
-            'checkbox_index', 'created_at', 'updated_at',
+            'checkbox_index', 'checkbox_depth', 'created_at', 'updated_at',
+        ]
+        read_only_fields = [
+            'id', 'completed_by_commit', 'checkbox_index', 'checkbox_depth', 'created_at', 'updated_at',
         ]
-        read_only_fields = ['id', 'completed_by_commit', 'checkbox_index', 'created_at', 'updated_at']
 
     def to_representation(self, instance):
         ret = super().to_representation(instance)
@@ -61,7 +104,7 @@ class TaskSerializer(serializers.ModelSerializer):
         return ret
 
 
-class WorkspaceSerializer(serializers.ModelSerializer):
+class WorkspaceSerializer(ProjectedFieldsMixin, serializers.ModelSerializer):
     id = serializers.CharField(read_only=True)
     created_by = UserSerializer(read_only=True)
     members = serializers.SerializerMethodField()
@@ -69,7 +112,11 @@ class WorkspaceSerializer(serializers.ModelSerializer):
     task_count = serializers.SerializerMethodField()
 
     def get_members(self, obj):
-        users = User.objects.filter(pk__in=obj.members)
+        users_by_id = self.context.get('members_by_id')
+        if users_by_id is not None:
+            users = [users_by_id[pk] for pk in obj.members if pk in users_by_id]
+        else:
+            users = User.objects.filter(pk__in=obj.members)
         return UserSerializer(users, many=True).data
 
     class Meta:
@@ -79,6 +126,51 @@ class WorkspaceSerializer(serializers.ModelSerializer):
             'github_token', 'created_by', 'members', 'task_count', 'created_at', 'updated_at',
         ]
         read_only_fields = ['id', 'created_by', 'webhook_id', 'created_at', 'updated_at']
+        list_serializer_class = BulkContextListSerializer
+
+    def bulk_context(self, workspaces):
+        # Skip anything a ?fields= projection left out (its columns may not be loaded)
+        context = {}
+        if 'task_count' in self.fields:
+            context['task_counts'] = _task_counts('workspace_id', [w.pk for w in workspaces])
+
+        user_ids = set()
+        if 'members' in self.fields:
+            user_ids |= {pk for w in workspaces for pk in w.members}
+        if 'created_by' in self.fields:
+            user_ids |= {w.created_by_id for w in workspaces}
+        if not user_ids:
+            return context
+
+        users_by_id = {u.pk: u for u in User.objects.filter(pk__in=user_ids)}
+        if 'created_by' in self.fields:
+            created_by_field = Workspace._meta.get_field('created_by')
+            for w in workspaces:
+                if w.created_by_id in users_by_id:
+                    created_by_field.set_cached_value(w, users_by_id[w.created_by_id])
+        context['members_by_id'] = users_by_id
+        return context
 
     def get_task_count(self, obj):
-        return Task.objects.filter(feature__workspace=obj).count()
+        task_counts = self.context.get('task_counts')
+        if task_counts is not None:
+            return task_counts.get(obj.pk, 0)
+        return Task.objects.filter(workspace=obj).count()
+
+
+class BootstrapJobSerializer(serializers.ModelSerializer):
+    id = serializers.CharField(read_only=True)
+    workspace = serializers.PrimaryKeyRelatedField(read_only=True)
+
+    class Meta:
+        model = BootstrapJob
+        fields = [
+            'id', 'workspace', 'status', 'step', 'progress', 'result', 'error',
+            'started_at', 'finished_at', 'created_at', 'updated_at',
+        ]
+        read_only_fields = fields
+
+    def to_representation(self, instance):
+        ret = super().to_representation(instance)
+        ret['workspace'] = str(ret['workspace'])
+        return ret
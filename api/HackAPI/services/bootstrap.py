@@ -0,0 +1,174 @@
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from ..models import BootstrapJob, Feature, Task
+from .commit_matcher import normalize_title
+from .gemini import generate_features_from_repo
+from .github import create_github_issue, fetch_repo_summary, register_webhook
+from .github_rate_limit import BACKGROUND, github_call_priority
+
+_ACTIVE_STATUSES = [BootstrapJob.Status.PENDING, BootstrapJob.Status.RUNNING]
+
+
+def create_generated_feature(workspace, feature_data):
+    """Persist one Gemini-generated feature with its tasks and open its GitHub issue."""
+    feature = Feature.objects.create(
+        workspace=workspace,
+        name=feature_data.get('name', 'Untitled Feature'),
+        description=feature_data.get('description', ''),
+    )
+    tasks = []
+    for i, task_data in enumerate(feature_data.get('tasks', [])):
+        priority = task_data.get('priority', 'medium')
+        if priority not in ('low', 'medium', 'high'):
+            priority = 'medium'
+        title = task_data.get('title', 'Untitled Task')
+        tasks.append(Task(
+            feature=feature,
+            workspace_id=workspace.pk,  # bulk_create bypasses Task.save()
+            title=title,
+            normalized_title=normalize_title(title),
+            description=task_data.get('description', ''),
+            priority=priority,
+            checkbox_index=i,
+        ))
+    if tasks:
+        Task.objects.bulk_create(tasks)
+    try:
+        create_github_issue(workspace, feature)
+    except Exception:
+        print(f'[ERROR] Failed to create GitHub issue for generated feature {feature.id}')
+        traceback.print_exc()
+    return feature, tasks
+
+
+def _update(job, **fields):
+    """Save `fields` on the job; progress never moves backwards, even when a resumed run repeats a step."""
+    if 'progress' in fields:
+        fields['progress'] = max(fields['progress'], job.progress)
+    for name, value in fields.items():
+        setattr(job, name, value)
+    job.save(update_fields=[*fields, 'updated_at'])
+
+
+def register_workspace_webhook(workspace):
+    """Register the GitHub webhook for `workspace`; failures are logged. Returns True on success."""
+    try:
+        register_webhook(workspace, webhook_url=settings.GITHUB_WEBHOOK_URL, secret=settings.GITHUB_WEBHOOK_SECRET)
+    except Exception:
+        print(f'[WARNING] Failed to register webhook for workspace {workspace.id}')
+        traceback.print_exc()
+        return False
+    return True
+
+
+def run_bootstrap(job_id):
+    """Run a claimed bootstrap job: register the webhook, scan the repo, generate features.
+
+    Progress is written to the job as each step starts: 5% webhook, 15% repo summary,
+    30% generation, then 30-100% as each generated feature is created. The generated
+    feature list is saved on the job before any feature is created, and the result
+    after every feature, so a run resuming an interrupted job skips the webhook if it
+    was registered, reuses the saved list instead of asking Gemini again, and skips
+    the features whose names are already among result['feature_ids']. The saved
+    list is dropped from the result once the job finishes.
+    """
+    job = BootstrapJob.objects.select_related('workspace').get(pk=job_id)
+    workspace = job.workspace
+    result = {'webhook_registered': False, 'features_created': 0, 'feature_ids': [], **(job.result or {})}
+    _update(job, step='webhook', progress=5)
+    try:
+        with github_call_priority(BACKGROUND):
+            if not result['webhook_registered']:
+                result['webhook_registered'] = register_workspace_webhook(workspace)
+
+            generated = result.get('generated')
+            if generated is None:
+                _update(job, step='repo_summary', progress=15, result=result)
+                summary = fetch_repo_summary(workspace)
+                if not summary:
+                    print(f'[INFO] Empty repo summary for workspace {workspace.id}, skipping AI generation')
+                    generated = []
+                else:
+                    _update(job, step='generating', progress=30)
+                    generated = generate_features_from_repo(summary) or []
+                    if not generated:
+                        print(f'[INFO] Gemini returned no features for workspace {workspace.id}')
+                result['generated'] = generated
+                _update(job, result=result)
+
+            created_names = set(
+                Feature.objects.filter(pk__in=result['feature_ids']).values_list('name', flat=True)
+            ) if result['feature_ids'] else set()
+            for i, feature_data in enumerate(generated):
+                if feature_data.get('name', 'Untitled Feature') in created_names:
+                    continue  # created by the interrupted run this one resumes
+                feature, _ = create_generated_feature(workspace, feature_data)
+                result['features_created'] += 1
+                result['feature_ids'].append(str(feature.pk))
+                _update(job, step='creating_features', progress=30 + 70 * (i + 1) // len(generated), result=result)
+    except Exception as e:
+        print(f'[ERROR] Bootstrap failed for workspace {workspace.id}')
+        traceback.print_exc()
+        result.pop('generated', None)
+        _update(
+            job, status=BootstrapJob.Status.FAILED, error=f'{type(e).__name__}: {e}',
+            result=result, finished_at=timezone.now(),
+        )
+        return
+    result.pop('generated', None)
+    _update(job, status=BootstrapJob.Status.DONE, step='', progress=100, result=result, finished_at=timezone.now())
+
+
+def start_bootstrap(workspace):
+    """Queue a bootstrap job for `workspace`. Returns (job, created).
+
+    The job is run by `manage.py process_webhooks`; poll it through
+    GET workspaces/<id>/bootstrap/. If the workspace already has a job pending or
+    running, that job is returned instead of queuing another.
+    """
+    active = workspace.bootstrap_jobs.filter(status__in=_ACTIVE_STATUSES).order_by('-created_at').first()
+    if active is not None:
+        return active, False
+    return BootstrapJob.objects.create(workspace=workspace), True
+
+
+def release_stale_bootstraps():
+    """Requeue jobs left 'running' by a worker that died; fail those out of attempts.
+
+    A running job saves its progress at every step, so one not updated for
+    BOOTSTRAP_JOB_TIMEOUT_SECONDS is no longer being worked on. Returns how many
+    were requeued.
+    """
+    now = timezone.now()
+    stale = BootstrapJob.objects.filter(
+        status=BootstrapJob.Status.RUNNING,
+        updated_at__lt=now - timedelta(seconds=settings.BOOTSTRAP_JOB_TIMEOUT_SECONDS),
+    )
+    stale.filter(attempts__gte=settings.BOOTSTRAP_MAX_ATTEMPTS).update(
+        status=BootstrapJob.Status.FAILED, error='Interrupted too many times', finished_at=now, updated_at=now,
+    )
+    return stale.update(status=BootstrapJob.Status.PENDING, updated_at=now)
+
+
+def claim_bootstrap_jobs(limit):
+    """Claim up to `limit` pending jobs, oldest first, and mark them running. Returns their pks."""
+    if limit <= 0:
+        return []
+    claimed = []
+    for pk, attempts in (
+        BootstrapJob.objects.filter(status=BootstrapJob.Status.PENDING)
+        .order_by('created_at')
+        .values_list('pk', 'attempts')[:limit]
+    ):
+        now = timezone.now()
+        # Conditional update so two workers never claim the same job
+        won = BootstrapJob.objects.filter(pk=pk, status=BootstrapJob.Status.PENDING).update(
+            status=BootstrapJob.Status.RUNNING, attempts=attempts + 1, started_at=now, updated_at=now,
+        )
+        if won:
+            claimed.append(pk)
+    return claimed
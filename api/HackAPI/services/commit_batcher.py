@@ -0,0 +1,248 @@
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Min
+from django.utils import timezone
+
+from ..models import CommitAnalysis, Task
+from .gemini import analyze_commit_batch, analyze_commits
+from .task_relevance import candidate_tasks
+
+_OPEN_TASK_STATUSES = [Task.Status.TODO, Task.Status.IN_PROGRESS]
+_QUEUED_STATUSES = [CommitAnalysis.Status.PENDING, CommitAnalysis.Status.PROCESSING]
+
+
+class _Counters:
+    def __init__(self):
+        self.pushes = 0
+        self.calls = 0
+        self.tasks_open = 0
+        self.tasks_sent = 0
+        self._lock = threading.Lock()
+
+    def add(self, pushes, open_count=0, sent=0):
+        with self._lock:
+            self.pushes += pushes
+            if sent:
+                self.calls += 1
+                self.tasks_open += open_count
+                self.tasks_sent += sent
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'pushes': self.pushes,
+                'gemini_calls': self.calls,
+                'open_tasks_seen': self.tasks_open,
+                'tasks_sent': self.tasks_sent,
+            }
+
+
+_counters = _Counters()
+
+
+def mark_tasks_done(sha, **lookup):
+    """Mark the open tasks matching `lookup` done by `sha` in one update. Returns how many changed."""
+    return Task.objects.filter(status__in=_OPEN_TASK_STATUSES, **lookup).update(
+        status=Task.Status.DONE, completed_by_commit=sha,
+    )
+
+
+def complete_tasks(workspace_id, titles, sha):
+    """Mark the workspace's open tasks with these titles done, in a single filtered update.
+
+    Returns (titles, number of tasks changed); tasks already done are left alone.
+    """
+    if not titles:
+        return [], 0
+    return list(titles), mark_tasks_done(sha, workspace_id=workspace_id, title__in=list(titles))
+
+
+def _analyze(workspace_id, pushes):
+    """Ask Gemini which open tasks each push completes, in one call. Returns a title list per push.
+
+    pushes: [(commit messages, changed files)]. Raises RuntimeError when Gemini gives
+    no usable answer, so the analyses are retried instead of completing nothing.
+    """
+    open_tasks, open_count = candidate_tasks(
+        workspace_id, ['\n'.join([*messages, *files]) for messages, files in pushes],
+    )
+    _counters.add(len(pushes), open_count, len(open_tasks))
+    if not open_tasks:
+        return [[] for _ in pushes]
+    if len(pushes) == 1:
+        titles = analyze_commits(pushes[0][0], open_tasks)
+        by_push = None if titles is None else {'push-0': titles}
+    else:
+        by_push = analyze_commit_batch(
+            {f'push-{i}': messages for i, (messages, _) in enumerate(pushes)}, open_tasks,
+        )
+    if by_push is None:
+        raise RuntimeError(f'Gemini gave no usable commit analysis for workspace {workspace_id}')
+    return [by_push[f'push-{i}'] for i in range(len(pushes))]
+
+
+def submit_commit_analysis(workspace_id, commit_messages, sha, changed_files=()):
+    """Queue `commit_messages` for batched task-completion analysis.
+
+    changed_files (paths added or modified by the push) help pick which open tasks
+    are sent to Gemini alongside the messages; tasks found complete are marked done
+    by `sha`. The analysis is stored in MongoDB and applied by process_due_analyses()
+    in the worker, so it survives restarts and is retried on failure. Returns None
+    once queued, or the completion ({'completed_tasks', 'tasks_completed'}) when
+    GEMINI_BATCH_WINDOW_SECONDS is 0 and the push was analyzed inline.
+    """
+    changed_files = list(changed_files)
+    if settings.GEMINI_BATCH_WINDOW_SECONDS <= 0:
+        [titles] = _analyze(workspace_id, [(commit_messages, changed_files)])
+        completed, count = complete_tasks(workspace_id, titles, sha)
+        return {'completed_tasks': completed, 'tasks_completed': count}
+
+    CommitAnalysis.objects.create(
+        workspace_id=workspace_id,
+        commit_messages=commit_messages,
+        changed_files=changed_files,
+        sha=sha,
+        next_attempt_at=timezone.now() + timedelta(seconds=settings.GEMINI_BATCH_WINDOW_SECONDS),
+    )
+    queued = CommitAnalysis.objects.filter(workspace_id=workspace_id, status=CommitAnalysis.Status.PENDING)
+    if queued.count() >= settings.GEMINI_BATCH_MAX_PUSHES:
+        # A full batch doesn't wait out the window; analyses backing off after a
+        # failure keep their retry time
+        queued.filter(attempts=0).update(next_attempt_at=timezone.now())
+    return None
+
+
+def release_expired_analyses():
+    """Hand analyses whose worker died mid-batch back to the queue."""
+    cutoff = timezone.now() - timedelta(seconds=settings.WEBHOOK_LEASE_SECONDS)
+    return CommitAnalysis.objects.filter(
+        status=CommitAnalysis.Status.PROCESSING, locked_at__lt=cutoff,
+    ).update(status=CommitAnalysis.Status.PENDING, locked_at=None)
+
+
+def _claim_batch(workspace_id, head_pk, now):
+    """Claim a workspace's oldest queued analyses, starting with its head. Returns them oldest first.
+
+    Winning the head (a conditional update) serializes the workspace: other workers
+    see a processing head and skip it until this batch is finished.
+    """
+    if not CommitAnalysis.objects.filter(pk=head_pk, status=CommitAnalysis.Status.PENDING).update(
+        status=CommitAnalysis.Status.PROCESSING, locked_at=now,
+    ):
+        return []
+    rest = list(
+        CommitAnalysis.objects.filter(workspace_id=workspace_id, status=CommitAnalysis.Status.PENDING)
+        .order_by('created_at')
+        .values_list('pk', flat=True)[:settings.GEMINI_BATCH_MAX_PUSHES - 1]
+    )
+    if rest:
+        CommitAnalysis.objects.filter(pk__in=rest, status=CommitAnalysis.Status.PENDING).update(
+            status=CommitAnalysis.Status.PROCESSING, locked_at=now,
+        )
+    return list(
+        CommitAnalysis.objects.filter(
+            pk__in=[head_pk, *rest], status=CommitAnalysis.Status.PROCESSING, locked_at=now,
+        ).order_by('created_at')
+    )
+
+
+def _mark_done(analysis, result):
+    analysis.status = CommitAnalysis.Status.DONE
+    analysis.attempts += 1
+    analysis.locked_at = None
+    analysis.last_error = ''
+    analysis.result = result
+    analysis.save(update_fields=['status', 'attempts', 'locked_at', 'last_error', 'result', 'updated_at'])
+
+
+def _mark_failed(analysis, error):
+    """Record a failed attempt and schedule an exponential-backoff retry, or give up."""
+    analysis.attempts += 1
+    analysis.locked_at = None
+    analysis.last_error = error
+    if analysis.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+        analysis.status = CommitAnalysis.Status.FAILED
+    else:
+        delay = min(
+            settings.WEBHOOK_RETRY_BACKOFF_SECONDS * 2 ** (analysis.attempts - 1),
+            settings.WEBHOOK_RETRY_MAX_BACKOFF_SECONDS,
+        )
+        analysis.status = CommitAnalysis.Status.PENDING
+        analysis.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+    analysis.save(update_fields=['status', 'attempts', 'locked_at', 'last_error', 'next_attempt_at', 'updated_at'])
+
+
+def _process_batch(workspace_id, batch):
+    """Analyze a claimed batch and apply each push's result in queue order.
+
+    An analysis is marked done only after its tasks are updated; if anything fails,
+    the analyses not yet applied are retried later as a batch (already-completed
+    tasks are not touched again).
+    """
+    remaining = list(batch)
+    try:
+        results = _analyze(workspace_id, [(a.commit_messages, a.changed_files) for a in batch])
+        for analysis, titles in zip(batch, results):
+            completed, count = complete_tasks(workspace_id, titles, analysis.sha)
+            _mark_done(analysis, {'completed_tasks': completed, 'tasks_completed': count})
+            remaining.remove(analysis)
+    except Exception:
+        print(f'[ERROR] Commit analysis failed for workspace {workspace_id}')
+        traceback.print_exc()
+        error = traceback.format_exc()
+        for analysis in remaining:
+            _mark_failed(analysis, error)
+
+
+def process_due_analyses(limit=20):
+    """Analyze up to `limit` workspaces' queued pushes, one batch per workspace. Returns how many pushes.
+
+    Run periodically by `manage.py process_webhooks`. A workspace is due once its
+    oldest queued analysis is; a batch takes that analysis and up to
+    GEMINI_BATCH_MAX_PUSHES - 1 newer ones, so pushes are always applied in the
+    order they arrived and a batch waiting out a retry holds back the rest.
+    """
+    release_expired_analyses()
+    now = timezone.now()
+    heads = {
+        row['workspace_id']: row['head']
+        for row in (
+            CommitAnalysis.objects.filter(status__in=_QUEUED_STATUSES)
+            .values('workspace_id')
+            .annotate(head=Min('created_at'))
+        )
+    }
+    if not heads:
+        return 0
+
+    due = (
+        CommitAnalysis.objects.filter(
+            workspace_id__in=list(heads), status=CommitAnalysis.Status.PENDING, next_attempt_at__lte=now,
+        )
+        .order_by('created_at')
+        .only('id', 'workspace_id', 'created_at')
+    )
+    processed = 0
+    for candidate in due:
+        if limit <= 0:
+            break
+        if heads.get(candidate.workspace_id) != candidate.created_at:
+            continue
+        heads.pop(candidate.workspace_id)
+        batch = _claim_batch(candidate.workspace_id, candidate.pk, now)
+        if batch:
+            _process_batch(candidate.workspace_id, batch)
+            processed += len(batch)
+            limit -= 1
+    return processed
+
+
+def commit_batcher_metrics():
+    """Counters for analyses run by this process, plus the queue depth shared by all processes."""
+    return {
+        **_counters.snapshot(),
+        'queued': CommitAnalysis.objects.filter(status__in=_QUEUED_STATUSES).count(),
+    }
@@ -0,0 +1,119 @@
+import re
+import threading
+from collections import defaultdict
+
+from ..models import Feature, Task
+
+# GitHub's closing keywords, optionally followed by ".N" to name the N-th checkbox
+# of that issue/PR (1-based, as the list is displayed): "fixes #42", "closes #42.3"
+_CLOSING_RE = re.compile(
+    r'\b(?:close[sd]?|fix(?:e[sd])?|resolve[sd]?)\b:?\s+#(\d+)(?:\.(\d+))?\b',
+    re.IGNORECASE,
+)
+# Conventional-commit prefixes such as "feat(api)!: ", "fix: " or "chore(deps): ". Only
+# these types: "Backend: add login" and "Frontend: add login" are different work
+_CONVENTIONAL_PREFIX_RE = re.compile(
+    r'^(?:feat|fix|chore|docs|refactor|perf|test|build|ci|style|revert)(?:\([^)]*\))?!?:\s*',
+    re.IGNORECASE,
+)
+# Trailing "(#12)" squash-merge suffixes and issue references
+_TRAILING_REF_RE = re.compile(r'\s*\(?#\d+\)?$')
+_NON_WORD_RE = re.compile(r'[^\w]+')
+
+_OPEN_STATUSES = [Task.Status.TODO, Task.Status.IN_PROGRESS]
+
+
+class _Counters:
+    def __init__(self):
+        self.matched = 0
+        self.unmatched = 0
+        self._lock = threading.Lock()
+
+    def add(self, matched, unmatched):
+        with self._lock:
+            self.matched += matched
+            self.unmatched += unmatched
+
+    def snapshot(self):
+        with self._lock:
+            total = self.matched + self.unmatched
+            return {
+                'commits_matched_without_llm': self.matched,
+                'commits_sent_to_llm': self.unmatched,
+                'llm_skip_rate': round(self.matched / total, 3) if total else None,
+            }
+
+
+_counters = _Counters()
+
+
+def normalize_title(text):
+    """Comparable form of a task title: case, punctuation and a trailing "(#12)" are ignored."""
+    text = _TRAILING_REF_RE.sub('', text.strip())
+    return _NON_WORD_RE.sub(' ', text).strip().lower()
+
+
+def _subject_forms(message):
+    """Normalized forms of a commit's subject line: as written and without a conventional prefix."""
+    subject = message.split('\n', 1)[0].strip()
+    forms = {normalize_title(subject), normalize_title(_CONVENTIONAL_PREFIX_RE.sub('', subject))}
+    forms.discard('')
+    return forms
+
+
+def match_commits(workspace, commits):
+    """Link commits to open tasks without the LLM.
+
+    commits: [(message, sha)]. A commit completes
+      - every open task of the issue/PR it closes ("fixes #42"),
+      - the N-th checkbox task of that issue/PR ("fixes #42.3"),
+      - the open task whose normalized title equals its normalized subject line,
+        with or without a conventional-commit prefix ("fix: add login").
+    Returns ({task pk: (title, sha)}, shas of the commits that named an open task);
+    when several commits name the same task, the first one is credited. Commits
+    whose sha is not in the set still need analysis.
+    """
+    whole_features = defaultdict(list)  # github_number -> shas
+    checkboxes = defaultdict(list)  # (github_number, checkbox_index) -> shas
+    subjects = defaultdict(list)  # normalized subject -> shas
+    for message, sha in commits:
+        for number, position in _CLOSING_RE.findall(message):
+            if position:
+                checkboxes[(int(number), int(position) - 1)].append(sha)
+            else:
+                whole_features[int(number)].append(sha)
+        for subject in _subject_forms(message):
+            subjects[subject].append(sha)
+
+    matches = {}
+    matched_shas = set()
+    numbers = set(whole_features) | {number for number, _ in checkboxes}
+    if numbers:
+        feature_numbers = dict(
+            Feature.objects.filter(workspace=workspace, github_number__in=numbers).values_list('pk', 'github_number')
+        )
+        if feature_numbers:
+            for pk, title, feature_id, checkbox_index in Task.objects.filter(
+                feature_id__in=list(feature_numbers), status__in=_OPEN_STATUSES,
+            ).values_list('pk', 'title', 'feature_id', 'checkbox_index'):
+                number = feature_numbers[feature_id]
+                shas = whole_features.get(number, []) + checkboxes.get((number, checkbox_index), [])
+                if shas:
+                    matches.setdefault(pk, (title, shas[0]))
+                    matched_shas.update(shas)
+
+    if subjects:
+        for pk, title, normalized in Task.objects.filter(
+            workspace=workspace, status__in=_OPEN_STATUSES, normalized_title__in=list(subjects),
+        ).values_list('pk', 'title', 'normalized_title'):
+            shas = subjects[normalized]
+            matches.setdefault(pk, (title, shas[0]))
+            matched_shas.update(shas)
+
+    matched = sum(1 for _, sha in commits if sha in matched_shas)
+    _counters.add(matched, len(commits) - matched)
+    return matches, matched_shas
+
+
+def commit_matcher_metrics():
+    return _counters.snapshot()
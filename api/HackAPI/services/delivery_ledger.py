@@ -0,0 +1,56 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.utils import timezone
+
+from ..models import WebhookDelivery
+
+IN_PROGRESS = {'status': 'in_progress'}
+
+
+def claim_delivery(delivery_id, event):
+    """Record a delivery id the first time it is seen.
+
+    Returns (True, None) for a new delivery, or (False, stored_result) when GitHub is
+    redelivering one we already accepted. The unique index on delivery_id makes the
+    check-and-insert atomic across workers. A claim still in progress after
+    WEBHOOK_DELIVERY_CLAIM_TIMEOUT_SECONDS belongs to a request that crashed, so a
+    redelivery takes it over instead of being rejected as a duplicate.
+    """
+    try:
+        WebhookDelivery.objects.create(delivery_id=delivery_id, event=event, result=IN_PROGRESS)
+    except IntegrityError:
+        row = WebhookDelivery.objects.filter(delivery_id=delivery_id).values('result', 'updated_at').first()
+        if row is None:
+            return False, IN_PROGRESS
+        stored = row['result'] or IN_PROGRESS
+        if stored == IN_PROGRESS and _reclaim_stale(delivery_id, row['updated_at']):
+            return True, None
+        return False, stored
+    return True, None
+
+
+def _reclaim_stale(delivery_id, claimed_at):
+    """Take over an abandoned in-progress claim. Returns True if this caller won it."""
+    cutoff = timezone.now() - timedelta(seconds=settings.WEBHOOK_DELIVERY_CLAIM_TIMEOUT_SECONDS)
+    if claimed_at >= cutoff:
+        return False
+    # Conditional on the timestamp read above, so only one concurrent redelivery wins
+    return bool(
+        WebhookDelivery.objects.filter(delivery_id=delivery_id, updated_at=claimed_at).update(
+            result=IN_PROGRESS, updated_at=timezone.now(),
+        )
+    )
+
+
+def record_result(delivery_id, result):
+    """Store the response returned for a delivery so redeliveries can replay it."""
+    if delivery_id:
+        WebhookDelivery.objects.filter(delivery_id=delivery_id).update(result=result, updated_at=timezone.now())
+
+
+def forget_delivery(delivery_id):
+    """Drop a delivery that was not processed, so a redelivery is allowed to retry it."""
+    if delivery_id:
+        WebhookDelivery.objects.filter(delivery_id=delivery_id).delete()
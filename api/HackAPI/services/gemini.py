@@ -1,46 +1,255 @@
 import json
 import re
+import threading
+import time
 import traceback
 from google import genai
 from google.genai import errors as genai_errors
 from django.conf import settings
 
+from .gemini_cache import cache_enabled, get_cached, store
+
 # Try models in order; fall back if a model is unavailable or quota-exhausted.
 _MODELS = ['gemini-2.5-pro', 'gemini-2.0-flash']
 
+# Prompt template versions, part of the response-cache key: bump one whenever its
+# prompt wording changes so stale answers are not reused.
+REPO_FEATURES_TEMPLATE = 'features_from_repo/v1'
+ANALYZE_COMMITS_TEMPLATE = 'analyze_commits/v1'
+
+# Responses that mean "this model can't serve us right now", as opposed to a bad request
+_UNAVAILABLE_CODES = (429, 503)
+
+
+class ModelHealth:
+    """Circuit breaker and call counters for one Gemini model.
+
+    A 429/503 trips the breaker: the model is skipped for `cooldown` seconds,
+    doubling on consecutive trips up to `max_cooldown`. The first call after the
+    cooldown is a probe; success closes the breaker and resets the backoff.
+    """
+
+    def __init__(self, cooldown, max_cooldown):
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.open_until = 0.0
+        self.consecutive_trips = 0
+        self._lock = threading.Lock()
+        # metrics
+        self.calls = 0
+        self.successes = 0
+        self.unavailable = 0
+        self.failures = 0
+        self.skipped = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def available(self):
+        with self._lock:
+            if time.monotonic() < self.open_until:
+                self.skipped += 1
+                return False
+            return True
+
+    def record(self, latency, outcome):
+        """outcome: 'success', 'unavailable' (429/503, trips the breaker) or 'failure'."""
+        with self._lock:
+            self.calls += 1
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+            if outcome == 'success':
+                self.successes += 1
+                self.consecutive_trips = 0
+            elif outcome == 'unavailable':
+                self.unavailable += 1
+                self.consecutive_trips += 1
+                backoff = min(self.cooldown * 2 ** (self.consecutive_trips - 1), self.max_cooldown)
+                self.open_until = time.monotonic() + backoff
+            else:
+                self.failures += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'open_for': round(max(self.open_until - time.monotonic(), 0), 1),
+                'calls': self.calls,
+                'successes': self.successes,
+                'unavailable': self.unavailable,
+                'failures': self.failures,
+                'skipped': self.skipped,
+                'avg_latency_ms': round(self.latency_total / self.calls * 1000, 1) if self.calls else None,
+                'max_latency_ms': round(self.latency_max * 1000, 1),
+            }
+
+
+_health = {
+    model: ModelHealth(settings.GEMINI_MODEL_COOLDOWN_SECONDS, settings.GEMINI_MODEL_MAX_COOLDOWN_SECONDS)
+    for model in _MODELS
+}
 
-def _call_gemini(client: genai.Client, prompt: str) -> str | None:
-    """Try each model in _MODELS until one succeeds. Returns response text or None."""
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_gemini_client() -> genai.Client:
+    """Return the process-wide Gemini client, building it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = genai.Client(api_key=settings.GEMINI_API_KEY)
+    return _client
+
+
+def gemini_model_metrics():
+    """Breaker state and call counters per model, for the metrics endpoint."""
+    return {model: health.snapshot() for model, health in _health.items()}
+
+
+def _call_gemini(prompt: str, template: str | None = None) -> str | None:
+    """Try each available model in _MODELS until one succeeds. Returns response text or None.
+
+    With a `template` version, a cached response to the identical prompt is returned
+    without any request, and a fresh one is cached. Models whose breaker is open
+    after a recent 429/503 are skipped without a request.
+    """
+    use_cache = template is not None and cache_enabled()
+    if use_cache:
+        cached = get_cached(template, prompt, _MODELS)
+        if cached is not None:
+            return cached[1]
+
+    client = get_gemini_client()
     for model in _MODELS:
+        health = _health[model]
+        if not health.available():
+            continue
+        started = time.perf_counter()
         try:
             response = client.models.generate_content(model=model, contents=prompt)
-            try:
-                return response.text.strip()
-            except ValueError:
-                print(f'[ERROR] Gemini response blocked or empty (model={model})')
-                return None
-        except genai_errors.ClientError as e:
-            if e.status_code in (429, 503):
-                print(f'[WARNING] Gemini model {model} unavailable ({e.status_code}), trying next...')
+        except genai_errors.APIError as e:
+            unavailable = e.code in _UNAVAILABLE_CODES
+            health.record(time.perf_counter() - started, 'unavailable' if unavailable else 'failure')
+            if unavailable:
+                print(f'[WARNING] Gemini model {model} unavailable ({e.code}), trying next...')
                 continue
             raise
-    print(f'[ERROR] All Gemini models exhausted: {_MODELS}')
+        except Exception:
+            health.record(time.perf_counter() - started, 'failure')
+            raise
+        health.record(time.perf_counter() - started, 'success')
+        try:
+            text = response.text.strip()
+        except (ValueError, AttributeError):
+            print(f'[ERROR] Gemini response blocked or empty (model={model})')
+            return None
+        if use_cache and text:
+            store(template, prompt, model, text)
+        return text
+    print(f'[ERROR] All Gemini models exhausted or cooling down: {_MODELS}')
     return None
 
 
-def generate_features_and_tasks(description: str) -> list[dict]:
-    """Use Gemini to parse a free-text description into features and tasks.
+class JSONArrayStream:
+    """Incrementally decodes the elements of a JSON array arriving in text chunks.
 
-    Returns a list of dicts with shape:
-        [{"name": str, "description": str, "tasks": [{"title": str, "description": str, "priority": "low"|"medium"|"high"}]}]
-    Returns an empty list if Gemini is unavailable or parsing fails.
+    feed() returns every top-level element completed by the chunk. Text before the
+    opening '[' (such as a ```json fence) and after the closing ']' is ignored; an
+    element that fails to decode is logged and skipped.
     """
-    if not settings.GEMINI_API_KEY:
-        return []
 
-    client = genai.Client(api_key=settings.GEMINI_API_KEY)
+    def __init__(self):
+        self._element = []
+        self._started = False
+        self.done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
 
-    prompt = (
+    def feed(self, chunk: str) -> list:
+        elements = []
+        for ch in chunk:
+            if self.done:
+                break
+            if not self._started:
+                self._started = ch == '['
+                continue
+            if self._in_string:
+                self._element.append(ch)
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+            if self._depth == 0 and ch in ',]':
+                if self._element:
+                    elements.append(self._finish())
+                self.done = ch == ']'
+                continue
+            if self._depth == 0 and ch.isspace():
+                continue
+            self._element.append(ch)
+            if ch == '"':
+                self._in_string = True
+            elif ch in '{[':
+                self._depth += 1
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    elements.append(self._finish())
+        return [element for element in elements if element is not None]
+
+    def _finish(self):
+        text = ''.join(self._element)
+        self._element = []
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            print(f'[ERROR] Failed to parse streamed Gemini JSON element. Raw: {text[:200]}')
+            return None
+
+
+def _stream_gemini(prompt: str):
+    """Yield response text chunks from the first available model in _MODELS.
+
+    Falls back to the next model on 429/503 only while nothing has been yielded;
+    once output has started a failure is raised to the caller.
+    """
+    client = get_gemini_client()
+    for model in _MODELS:
+        health = _health[model]
+        if not health.available():
+            continue
+        started = time.perf_counter()
+        emitted = False
+        try:
+            for chunk in client.models.generate_content_stream(model=model, contents=prompt):
+                try:
+                    text = chunk.text
+                except ValueError:
+                    text = None
+                if text:
+                    emitted = True
+                    yield text
+        except genai_errors.APIError as e:
+            unavailable = e.code in _UNAVAILABLE_CODES
+            health.record(time.perf_counter() - started, 'unavailable' if unavailable else 'failure')
+            if unavailable and not emitted:
+                print(f'[WARNING] Gemini model {model} unavailable ({e.code}), trying next...')
+                continue
+            raise
+        except Exception:
+            health.record(time.perf_counter() - started, 'failure')
+            raise
+        health.record(time.perf_counter() - started, 'success')
+        return
+    print(f'[ERROR] All Gemini models exhausted or cooling down: {_MODELS}')
+
+
+def _feature_plan_prompt(description: str) -> str:
+    return (
         'You are a project planning assistant. Given a product or feature description, '
         'break it down into a structured list of features and their tasks.\n\n'
         f'Description:\n{description}\n\n'
@@ -55,7 +264,18 @@ def generate_features_and_tasks(description: str) -> list[dict]:
         'Respond with ONLY the JSON array, no other text.'
     )
 
-    text = _call_gemini(client, prompt)
+
+def generate_features_and_tasks(description: str) -> list[dict]:
+    """Use Gemini to parse a free-text description into features and tasks.
+
+    Returns a list of dicts with shape:
+        [{"name": str, "description": str, "tasks": [{"title": str, "description": str, "priority": "low"|"medium"|"high"}]}]
+    Returns an empty list if Gemini is unavailable or parsing fails.
+    """
+    if not settings.GEMINI_API_KEY:
+        return []
+
+    text = _call_gemini(_feature_plan_prompt(description))
     if text is None:
         return []
 
@@ -74,6 +294,22 @@ def generate_features_and_tasks(description: str) -> list[dict]:
     return []
 
 
+def stream_features_and_tasks(description: str):
+    """Streaming generate_features_and_tasks: yields each feature dict as soon as
+    Gemini has finished writing it. Yields nothing if Gemini is unavailable.
+    """
+    if not settings.GEMINI_API_KEY:
+        return
+
+    parser = JSONArrayStream()
+    for text in _stream_gemini(_feature_plan_prompt(description)):
+        for element in parser.feed(text):
+            if isinstance(element, dict):
+                yield element
+        if parser.done:
+            return
+
+
 def generate_features_from_repo(repo_summary: str) -> list[dict]:
     """Use Gemini to generate features and tasks from a repository summary.
 
@@ -86,8 +322,6 @@ def generate_features_from_repo(repo_summary: str) -> list[dict]:
     if not settings.GEMINI_API_KEY:
         return []
 
-    client = genai.Client(api_key=settings.GEMINI_API_KEY)
-
     prompt = (
         'You are analyzing a GitHub repository. Based on the provided repository files '
         '(README, language info, dependency files), generate features and tasks that represent '
@@ -104,7 +338,7 @@ def generate_features_from_repo(repo_summary: str) -> list[dict]:
         'Respond with ONLY the JSON array, no other text.'
     )
 
-    text = _call_gemini(client, prompt)
+    text = _call_gemini(prompt, REPO_FEATURES_TEMPLATE)
     if text is None:
         return []
 
@@ -123,28 +357,29 @@ def generate_features_from_repo(repo_summary: str) -> list[dict]:
     return []
 
 
-def analyze_commits(commit_messages: list[str], open_tasks: list[str]) -> list[str]:
+def analyze_commits(commit_messages: list[str], open_tasks: list[str]) -> list[str] | None:
     """Use Gemini to determine which open tasks were completed by the given commits.
 
-    Returns a list of task titles that Gemini considers completed.
+    Returns a list of task titles that Gemini considers completed, or None when no
+    usable answer came back (every model unavailable, a blocked or unparseable
+    response), so the caller can retry rather than treat it as "nothing completed".
     """
     if not settings.GEMINI_API_KEY:
         return []
 
-    client = genai.Client(api_key=settings.GEMINI_API_KEY)
-
     prompt = (
         "You are an assistant that analyzes git commit messages to detect task completion.\n\n"
-        f"Open tasks:\n{json.dumps(open_tasks)}\n\n"
+        # sorted so the same open tasks always give the same prompt (and cache key)
+        f"Open tasks:\n{json.dumps(sorted(open_tasks))}\n\n"
         f"Commit messages:\n{json.dumps(commit_messages)}\n\n"
         "Return a JSON array of task titles (from the open tasks list) that these commits indicate "
         "are completed. Only include tasks you are confident were addressed. "
         "Return an empty array if none match. Respond with ONLY the JSON array, no other text."
     )
 
-    text = _call_gemini(client, prompt)
+    text = _call_gemini(prompt, ANALYZE_COMMITS_TEMPLATE)
     if text is None:
-        return []
+        return None
 
     json_match = re.search(r'\[.*\]', text, re.DOTALL)
     if json_match:
@@ -158,4 +393,49 @@ def analyze_commits(commit_messages: list[str], open_tasks: list[str]) -> list[s
         print(f'[ERROR] Failed to parse Gemini JSON for analyze_commits. Raw: {text[:200]}')
         traceback.print_exc()
 
-    return []
+    return None
+
+
+def analyze_commit_batch(pushes: dict[str, list[str]], open_tasks: list[str]) -> dict[str, list[str]] | None:
+    """Use Gemini to attribute completed open tasks to each of several pushes in one call.
+
+    pushes: {push id: commit messages}. Returns {push id: completed task titles} with
+    an entry for every push id; pushes Gemini says nothing about complete nothing.
+    Returns None when no usable answer came back, as analyze_commits does.
+    """
+    results = {push_id: [] for push_id in pushes}
+    if not settings.GEMINI_API_KEY or not pushes:
+        return results
+
+    prompt = (
+        "You are an assistant that analyzes git commit messages to detect task completion.\n\n"
+        f"Open tasks:\n{json.dumps(open_tasks)}\n\n"
+        "Pushes, as a JSON object mapping each push id to that push's commit messages:\n"
+        f"{json.dumps(pushes)}\n\n"
+        "Judge each push independently. Return a JSON object mapping every push id to an array "
+        "of task titles (from the open tasks list) that the commits in that push indicate are "
+        "completed. Only include tasks you are confident were addressed. Use an empty array for "
+        "a push that completes nothing. Respond with ONLY the JSON object, no other text."
+    )
+
+    text = _call_gemini(prompt)
+    if text is None:
+        return None
+
+    json_match = re.search(r'\{.*\}', text, re.DOTALL)
+    if json_match:
+        text = json_match.group(0)
+
+    try:
+        result = json.loads(text)
+        if isinstance(result, dict):
+            known = set(open_tasks)
+            for push_id, titles in result.items():
+                if push_id in results and isinstance(titles, list):
+                    results[push_id] = [t for t in titles if t in known]
+            return results
+    except (json.JSONDecodeError, TypeError):
+        print(f'[ERROR] Failed to parse Gemini JSON for analyze_commit_batch. Raw: {text[:200]}')
+        traceback.print_exc()
+
+    return None
@@ -0,0 +1,106 @@
+import hashlib
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.utils import timezone
+
+from ..models import GeminiResponse
+
+# Over-cap entries are trimmed every this many stores rather than on each one
+_PRUNE_EVERY = 100
+
+
+class _Counters:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def add(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+            return getattr(self, name)
+
+    def snapshot(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+                'stores': self.stores,
+                'errors': self.errors,
+            }
+
+
+_counters = _Counters()
+
+
+def cache_enabled():
+    return settings.GEMINI_CACHE_MAX_ENTRIES > 0
+
+
+def cache_key(model, template, prompt):
+    """Content address of a response: the model, the prompt template's version and the full prompt."""
+    return hashlib.sha256(f'{model}\0{template}\0{prompt}'.encode()).hexdigest()
+
+
+def get_cached(template, prompt, models):
+    """Return (model, text) for the first of `models` with a live cached response, or None."""
+    keys = {cache_key(model, template, prompt): model for model in models}
+    try:
+        # The TTL monitor only runs once a minute, so don't trust created_at blindly
+        fresh_since = timezone.now() - timedelta(seconds=settings.GEMINI_CACHE_TTL_SECONDS)
+        found = dict(
+            GeminiResponse.objects.filter(key__in=list(keys), created_at__gte=fresh_since)
+            .values_list('key', 'text')
+        )
+    except Exception:
+        _counters.add('errors')
+        print('[WARNING] Gemini cache lookup failed')
+        traceback.print_exc()
+        return None
+
+    for key, model in keys.items():
+        if key in found:
+            _counters.add('hits')
+            return model, found[key]
+    _counters.add('misses')
+    return None
+
+
+def store(template, prompt, model, text):
+    """Cache a successful response; concurrent identical stores keep the first."""
+    try:
+        GeminiResponse.objects.create(key=cache_key(model, template, prompt), model=model, template=template, text=text)
+    except IntegrityError:
+        return
+    except Exception:
+        _counters.add('errors')
+        print('[WARNING] Gemini cache store failed')
+        traceback.print_exc()
+        return
+    if _counters.add('stores') % _PRUNE_EVERY == 0:
+        _prune()
+
+
+def _prune():
+    """Delete the oldest entries beyond GEMINI_CACHE_MAX_ENTRIES."""
+    try:
+        excess = GeminiResponse.objects.count() - settings.GEMINI_CACHE_MAX_ENTRIES
+        if excess > 0:
+            oldest = list(GeminiResponse.objects.order_by('created_at').values_list('pk', flat=True)[:excess])
+            GeminiResponse.objects.filter(pk__in=oldest).delete()
+    except Exception:
+        _counters.add('errors')
+        print('[WARNING] Gemini cache prune failed')
+        traceback.print_exc()
+
+
+def gemini_cache_metrics():
+    return _counters.snapshot()
@@ -1,46 +1,258 @@
 import base64
+import contextvars
+import hashlib
 import re
+import threading
 import traceback
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from difflib import SequenceMatcher
+from functools import partial
+
 import requests
+from django.conf import settings
+from django.db import connection
+from django_mongodb_backend.transaction import atomic
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .github_rate_limit import RateLimitScheduler
 
 GITHUB_API = 'https://api.github.com'
 
 
-def _github_headers(token):
-    return {
-        'Authorization': f'Bearer {token}',
-        'Accept': 'application/vnd.github+json',
-        'X-GitHub-Api-Version': '2022-11-28',
-    }
+class GitHubClient:
+    """Shared HTTP client for the GitHub REST API.
+
+    One pooled requests.Session reuses keep-alive connections, so calls after the
+    first skip the TCP/TLS handshake. Requests use separate connect and read
+    timeouts, and idempotent methods are retried with backoff on 5xx responses.
+    conditional_get() keeps an LRU of validated responses for ETag revalidation.
+    """
+
+    RETRY_STATUSES = (500, 502, 503, 504)
+
+    def __init__(
+        self, base_url=GITHUB_API, pool_maxsize=10, connect_timeout=3.05, read_timeout=10, retries=3,
+        etag_cache_size=256, scheduler=None,
+    ):
+        self.base_url = base_url.rstrip('/')
+        self.scheduler = scheduler
+        self.timeout = (connect_timeout, read_timeout)
+        self.etag_cache_size = etag_cache_size
+        self._etag_cache = OrderedDict()  # (path, token hash) -> last 200 response
+        self._etag_lock = threading.Lock()
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Accept': 'application/vnd.github+json',
+            'X-GitHub-Api-Version': '2022-11-28',
+        })
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.5,
+            status_forcelist=self.RETRY_STATUSES,
+            # POST is left out: retrying it could create a duplicate issue or hook
+            allowed_methods=frozenset({'GET', 'HEAD', 'PUT', 'PATCH', 'DELETE'}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def request(self, method, path, token, **kwargs):
+        """Send a request to `path` (relative to the API root) authenticated with `token`.
+
+        With a scheduler attached, the call first waits for rate-limit budget, and a
+        call rejected by a rate limit is retried once if the backoff is short enough.
+        """
+        url = path if path.startswith('http') else f'{self.base_url}{path}'
+        headers = {'Authorization': f'Bearer {token}', **kwargs.pop('headers', {})}
+        kwargs.setdefault('timeout', self.timeout)
+        if self.scheduler is None:
+            return self.session.request(method, url, headers=headers, **kwargs)
+
+        self.scheduler.acquire(token)
+        resp = self.session.request(method, url, headers=headers, **kwargs)
+        if self.scheduler.record(token, resp):
+            print(f'[WARNING] GitHub rate limit hit on {method} {path} ({resp.status_code})')
+            if self.scheduler.retry_delay(token) is not None:
+                self.scheduler.acquire(token)
+                resp = self.session.request(method, url, headers=headers, **kwargs)
+                self.scheduler.record(token, resp)
+        return resp
+
+    def get(self, path, token, **kwargs):
+        return self.request('GET', path, token, **kwargs)
+
+    def conditional_get(self, path, token, **kwargs):
+        """GET that revalidates a cached copy with If-None-Match / If-Modified-Since.
+
+        GitHub answers an unchanged resource with 304, which does not count against
+        the rate limit; the cached 200 response is returned in its place.
+        """
+        key = (path, hashlib.sha256(token.encode()).hexdigest())
+        with self._etag_lock:
+            cached = self._etag_cache.get(key)
+            if cached is not None:
+                self._etag_cache.move_to_end(key)
+
+        headers = dict(kwargs.pop('headers', {}))
+        if cached is not None:
+            if cached.headers.get('ETag'):
+                headers['If-None-Match'] = cached.headers['ETag']
+            if cached.headers.get('Last-Modified'):
+                headers['If-Modified-Since'] = cached.headers['Last-Modified']
+
+        resp = self.get(path, token, headers=headers, **kwargs)
+        if resp.status_code == 304 and cached is not None:
+            return cached
+        if resp.status_code == 200 and (resp.headers.get('ETag') or resp.headers.get('Last-Modified')):
+            resp.content  # read the body now so the response can be replayed later
+            with self._etag_lock:
+                self._etag_cache[key] = resp
+                self._etag_cache.move_to_end(key)
+                while len(self._etag_cache) > self.etag_cache_size:
+                    self._etag_cache.popitem(last=False)
+        return resp
+
+    def post(self, path, token, **kwargs):
+        return self.request('POST', path, token, **kwargs)
+
+    def patch(self, path, token, **kwargs):
+        return self.request('PATCH', path, token, **kwargs)
+
+    def delete(self, path, token, **kwargs):
+        return self.request('DELETE', path, token, **kwargs)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_github_client():
+    """Return the process-wide GitHubClient, building it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GitHubClient(
+                    base_url=settings.GITHUB_API_URL,
+                    pool_maxsize=settings.GITHUB_HTTP_POOL_MAXSIZE,
+                    connect_timeout=settings.GITHUB_HTTP_CONNECT_TIMEOUT,
+                    read_timeout=settings.GITHUB_HTTP_READ_TIMEOUT,
+                    retries=settings.GITHUB_HTTP_RETRIES,
+                    etag_cache_size=settings.GITHUB_ETAG_CACHE_SIZE,
+                    scheduler=RateLimitScheduler(
+                        reserve=settings.GITHUB_RATE_LIMIT_RESERVE,
+                        burst=settings.GITHUB_BACKGROUND_BURST,
+                        interactive_max_wait=settings.GITHUB_INTERACTIVE_MAX_WAIT,
+                        background_max_wait=settings.GITHUB_BACKGROUND_MAX_WAIT,
+                    ),
+                )
+    return _client
+
+
+def github_rate_limit_metrics():
+    """Current rate-limit budget per token fingerprint, for the metrics endpoint."""
+    client = _client
+    if client is None or client.scheduler is None:
+        return {}
+    return client.scheduler.snapshot()
 
 
 def render_tasks_as_checkboxes(tasks):
-    """Render a queryset of Tasks as GitHub-flavored markdown checkboxes."""
+    """Render a queryset of Tasks as GitHub-flavored markdown checkboxes, nested by checkbox_depth."""
     lines = []
+    depth = -1
     for task in tasks.order_by('checkbox_index', 'created_at'):
         checked = 'x' if task.status == 'done' else ' '
-        lines.append(f'- [{checked}] {task.title}')
+        # A child can't be more than one level below the line above it
+        depth = min(task.checkbox_depth, depth + 1)
+        lines.append(f'{"  " * depth}- [{checked}] {task.title}')
     return '\n'.join(lines)
 
 
+Checkbox = namedtuple('Checkbox', 'title is_checked line offset depth parent')
+Checkbox.__doc__ = """A task-list item: 1-based line and character offset in the body, nesting
+depth (0 = top level) and the list index of its parent checkbox, or None."""
+# Builds a Checkbox from one tuple without going through the generated keyword __new__
+_make_checkbox = partial(tuple.__new__, Checkbox)
+
+# One pass over the whole body: each match is either a code fence or a checkbox item
+# ('-', '*', '+' bullets or '1.' / '1)' ordered items, at any indentation).
+_CHECKBOX_RE = re.compile(
+    r'^(?P<indent>[ \t]*)(?:'
+    r'(?P<fence>`{3,}|~{3,})[^\n]*'
+    r'|(?:[-*+]|\d{1,9}[.)])[ \t]+\[(?P<mark>[ xX])\][ \t]+(?P<title>[^\n]*\S)[ \t\r]*'
+    r')$',
+    re.MULTILINE,
+)
+
+
 def parse_checkboxes_from_body(body):
     """Parse markdown checkboxes from a GitHub issue/PR body.
 
-    Returns list of (title, is_checked) tuples.
+    Returns a list of Checkbox tuples in body order. Items inside fenced code
+    blocks are ignored; indentation under another checkbox makes an item its child.
+    Large PR templates are parsed on every edit webhook, so the loop stays lean:
+    lines are counted only across the gaps between matches, and top-level items
+    (the common case) don't walk the ancestor stack.
     """
-    if not body:
+    if not body or '[' not in body:
         return []
-    pattern = r'^- \[([ xX])\] (.+)$'
     results = []
-    for line in body.splitlines():
-        match = re.match(pattern, line.strip())
-        if match:
-            is_checked = match.group(1).lower() == 'x'
-            title = match.group(2).strip()
-            results.append((title, is_checked))
+    root = None  # list index of the last top-level checkbox
+    stack = []  # (indent width, list index) of the open indented ancestors under it
+    fence = None
+    line, end = 1, 0
+    count = body.count
+    for match in _CHECKBOX_RE.finditer(body):
+        indent, marker, mark, title = match.groups()
+        start, stop = match.span()
+        line += 1 if start == end + 1 else count('\n', end, start)
+        end = stop
+
+        if marker is not None:
+            if fence is None:
+                fence = marker
+            elif marker[0] == fence[0] and len(marker) >= len(fence):
+                fence = None
+            continue
+        if fence is not None:
+            continue
+
+        if indent:
+            width = len(indent.expandtabs(4)) if '\t' in indent else len(indent)
+            while stack and stack[-1][0] >= width:
+                stack.pop()
+            parent = stack[-1][1] if stack else root
+            depth = len(stack) + (root is not None)
+            stack.append((width, len(results)))
+        else:
+            stack.clear()
+            root, parent, depth = len(results), None, 0
+        results.append(_make_checkbox((title, mark != ' ', line, start, depth, parent)))
     return results
 
 
+def body_fingerprint(body):
+    """Hash of an issue/PR body, insensitive to the line endings and edge whitespace GitHub rewrites."""
+    normalized = (body or '').replace('\r\n', '\n').strip()
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def render_issue_body(feature, tasks=None):
+    """Render a Feature's description followed by its task checkboxes."""
+    tasks = feature.tasks.all() if tasks is None else tasks
+    body = ''
+    if feature.description:
+        body = feature.description + '\n\n'
+    if tasks.exists():
+        body += render_tasks_as_checkboxes(tasks)
+    return body.strip()
+
+
 def create_github_issue(workspace, feature):
     """Create a GitHub issue for a Feature. Updates feature with github fields."""
     if not workspace.github_token:
@@ -48,18 +260,12 @@ def create_github_issue(workspace, feature):
         return None
 
     tasks = feature.tasks.all()
-    body = ''
-    if feature.description:
-        body = feature.description + '\n\n'
-    if tasks.exists():
-        body += render_tasks_as_checkboxes(tasks)
+    body = render_issue_body(feature, tasks)
 
-    url = f'{GITHUB_API}/repos/{workspace.github_repo_owner}/{workspace.github_repo_name}/issues'
-    resp = requests.post(
-        url,
-        json={'title': feature.name, 'body': body.strip()},
-        headers=_github_headers(workspace.github_token),
-        timeout=10,
+    resp = get_github_client().post(
+        f'/repos/{workspace.github_repo_owner}/{workspace.github_repo_name}/issues',
+        workspace.github_token,
+        json={'title': feature.name, 'body': body},
     )
 
     if resp.status_code != 201:
@@ -72,44 +278,45 @@ def create_github_issue(workspace, feature):
     feature.github_id = data['id']
     feature.html_url = data.get('html_url', '')
     feature.state = 'open'
-    feature.save(update_fields=['type', 'github_number', 'github_id', 'html_url', 'state'])
+    feature.github_body_hash = body_fingerprint(body)
+    feature.save(update_fields=['type', 'github_number', 'github_id', 'html_url', 'state', 'github_body_hash'])
 
-    # Assign checkbox indices to tasks
-    for i, task in enumerate(tasks.order_by('created_at')):
+    # Assign checkbox indices to tasks, in the order they were rendered
+    for i, task in enumerate(tasks.order_by('checkbox_index', 'created_at')):
         task.checkbox_index = i
         task.save(update_fields=['checkbox_index'])
 
     return data
 
 
-def update_issue_body(workspace, feature):
-    """Update the GitHub issue/PR body with current task checkboxes."""
+def update_issue_body(workspace, feature, force=False):
+    """Update the GitHub issue/PR body with current task checkboxes.
+
+    The PATCH is skipped when the rendered body matches the one last pushed to or
+    received from GitHub, unless `force` is set. Returns the issue data, a
+    {'number', 'body', 'unchanged': True} stub when skipped, or None on failure.
+    """
     if not workspace.github_token or not feature.github_number:
         return None
 
-    tasks = feature.tasks.all()
-    body = ''
-    if feature.description:
-        body = feature.description + '\n\n'
-    if tasks.exists():
-        body += render_tasks_as_checkboxes(tasks)
+    body = render_issue_body(feature)
+    fingerprint = body_fingerprint(body)
+    if not force and fingerprint == feature.github_body_hash:
+        return {'number': feature.github_number, 'body': body, 'unchanged': True}
 
     # Use issues endpoint for both issues and PRs (GitHub supports it for both)
-    url = (
-        f'{GITHUB_API}/repos/{workspace.github_repo_owner}/{workspace.github_repo_name}'
-        f'/issues/{feature.github_number}'
-    )
-    resp = requests.patch(
-        url,
-        json={'body': body.strip()},
-        headers=_github_headers(workspace.github_token),
-        timeout=10,
+    resp = get_github_client().patch(
+        f'/repos/{workspace.github_repo_owner}/{workspace.github_repo_name}/issues/{feature.github_number}',
+        workspace.github_token,
+        json={'body': body},
     )
 
     if resp.status_code != 200:
         print(f'[ERROR] Failed to update issue body: {resp.status_code} {resp.text}')
         return None
 
+    feature.github_body_hash = fingerprint
+    feature.save(update_fields=['github_body_hash'])
     return resp.json()
 
 
@@ -129,7 +336,7 @@ def register_webhook(workspace, webhook_url, secret, token=None):
     if workspace.webhook_id:
         unregister_webhook(workspace, github_token)
 
-    url = f'{GITHUB_API}/repos/{workspace.github_repo_owner}/{workspace.github_repo_name}/hooks'
+    path = f'/repos/{workspace.github_repo_owner}/{workspace.github_repo_name}/hooks'
     payload = {
         'name': 'web',
         'active': True,
@@ -152,7 +359,7 @@ def register_webhook(workspace, webhook_url, secret, token=None):
             'insecure_ssl': '0',
         },
     }
-    resp = requests.post(url, json=payload, headers=_github_headers(github_token), timeout=10)
+    resp = get_github_client().post(path, github_token, json=payload)
 
     if resp.status_code == 201:
         hook_id = str(resp.json().get('id', ''))
@@ -174,11 +381,10 @@ def unregister_webhook(workspace, token=None):
     if not github_token:
         return
 
-    url = (
-        f'{GITHUB_API}/repos/{workspace.github_repo_owner}/{workspace.github_repo_name}'
-        f'/hooks/{workspace.webhook_id}'
+    resp = get_github_client().delete(
+        f'/repos/{workspace.github_repo_owner}/{workspace.github_repo_name}/hooks/{workspace.webhook_id}',
+        github_token,
     )
-    resp = requests.delete(url, headers=_github_headers(github_token), timeout=10)
 
     if resp.status_code in (204, 404):
         workspace.webhook_id = ''
@@ -199,6 +405,8 @@ def fetch_repo_summary(workspace) -> str:
 
     Returns a concatenated string containing README, language stats, and the first
     matching dependency file. Returns an empty string if no content could be fetched.
+    The README, languages and dependency-file probes run concurrently and use
+    conditional requests, so the summary takes as long as the slowest probe.
     """
     if not workspace.github_token:
         print(f'[WARNING] No GitHub token on workspace {workspace.id}, skipping repo summary')
@@ -206,94 +414,219 @@ def fetch_repo_summary(workspace) -> str:
 
     owner = workspace.github_repo_owner
     name = workspace.github_repo_name
-    headers = _github_headers(workspace.github_token)
-    parts = []
+    client = get_github_client()
+    token = workspace.github_token
 
-    try:
-        resp = requests.get(
-            f'{GITHUB_API}/repos/{owner}/{name}/readme',
-            headers=headers,
-            timeout=10,
-        )
-        if resp.status_code == 200:
-            content = base64.b64decode(resp.json().get('content', '')).decode('utf-8', errors='replace')
-            parts.append(f'## README\n{content[:_REPO_SUMMARY_README_LIMIT]}')
-    except Exception:
-        print(f'[WARNING] Failed to fetch README for {owner}/{name}')
-        traceback.print_exc()
-
-    try:
-        resp = requests.get(
-            f'{GITHUB_API}/repos/{owner}/{name}/languages',
-            headers=headers,
-            timeout=10,
-        )
-        if resp.status_code == 200:
-            lang_str = ', '.join(f'{k}: {v}' for k, v in resp.json().items())
-            parts.append(f'## Languages\n{lang_str[:_REPO_SUMMARY_LANG_LIMIT]}')
-    except Exception:
-        print(f'[WARNING] Failed to fetch languages for {owner}/{name}')
-        traceback.print_exc()
-
-    for dep_file in _REPO_SUMMARY_DEP_FILES:
+    def probe(label, path):
         try:
-            resp = requests.get(
-                f'{GITHUB_API}/repos/{owner}/{name}/contents/{dep_file}',
-                headers=headers,
-                timeout=10,
-            )
-            if resp.status_code == 200:
-                content = base64.b64decode(resp.json().get('content', '')).decode('utf-8', errors='replace')
-                parts.append(f'## {dep_file}\n{content[:_REPO_SUMMARY_DEP_LIMIT]}')
-                break
+            resp = client.conditional_get(path, token)
+            return resp if resp.status_code == 200 else None
         except Exception:
-            print(f'[WARNING] Failed to fetch {dep_file} for {owner}/{name}')
+            print(f'[WARNING] Failed to fetch {label} for {owner}/{name}')
             traceback.print_exc()
+            return None
+
+    probes = {
+        'README': f'/repos/{owner}/{name}/readme',
+        'languages': f'/repos/{owner}/{name}/languages',
+        **{dep_file: f'/repos/{owner}/{name}/contents/{dep_file}' for dep_file in _REPO_SUMMARY_DEP_FILES},
+    }
+    with ThreadPoolExecutor(max_workers=min(len(probes), settings.GITHUB_SUMMARY_MAX_WORKERS)) as pool:
+        # copy_context() carries the caller's GitHub call priority into the pool threads
+        futures = {
+            label: pool.submit(contextvars.copy_context().run, probe, label, path)
+            for label, path in probes.items()
+        }
+        responses = {label: future.result() for label, future in futures.items()}
+
+    parts = []
+    if responses['README'] is not None:
+        content = base64.b64decode(responses['README'].json().get('content', '')).decode('utf-8', errors='replace')
+        parts.append(f'## README\n{content[:_REPO_SUMMARY_README_LIMIT]}')
+
+    if responses['languages'] is not None:
+        lang_str = ', '.join(f'{k}: {v}' for k, v in responses['languages'].json().items())
+        parts.append(f'## Languages\n{lang_str[:_REPO_SUMMARY_LANG_LIMIT]}')
+
+    # Keep the original preference order: first dependency file that exists wins
+    for dep_file in _REPO_SUMMARY_DEP_FILES:
+        if responses[dep_file] is not None:
+            content = base64.b64decode(responses[dep_file].json().get('content', '')).decode('utf-8', errors='replace')
+            parts.append(f'## {dep_file}\n{content[:_REPO_SUMMARY_DEP_LIMIT]}')
+            break
 
     return '\n\n'.join(parts)
 
 
-def sync_tasks_from_checkboxes(feature, checkboxes):
-    """Sync tasks from parsed checkboxes. Returns (created, updated) counts.
+def _write_transaction():
+    """A MongoDB transaction where the deployment supports one (replica set or sharded cluster)."""
+    if connection.features._supports_transactions:
+        return atomic()
+    return nullcontext()
+
+
+def _align_checkboxes(old, new):
+    """Pair up the lines of two checkbox lists by title.
 
-    checkboxes: list of (title, is_checked) tuples from parse_checkboxes_from_body.
+    old, new: [(title, is_checked, depth)]. Lines are aligned with difflib: a run replaced
+    by one of the same length is the same lines reworded, and a line deleted in one
+    place and inserted in another is a move. Returns (pairs, deleted, inserted):
+    (old index, new index) for every line that keeps its task, then the old indexes
+    with no counterpart and the new indexes with none.
+    """
+    pairs = []
+    deleted = []
+    inserted = []
+    matcher = SequenceMatcher(None, [line[0] for line in old], [line[0] for line in new], autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal' or (tag == 'replace' and i2 - i1 == j2 - j1):
+            pairs.extend(zip(range(i1, i2), range(j1, j2)))
+        else:
+            deleted.extend(range(i1, i2))
+            inserted.extend(range(j1, j2))
+
+    # A line deleted in one place and inserted in another is a move: keep its task
+    deleted_by_title = {}
+    for i in deleted:
+        deleted_by_title.setdefault(old[i][0], []).append(i)
+    moves = []
+    for j in inserted:
+        candidates = deleted_by_title.get(new[j][0])
+        if candidates:
+            moves.append((candidates.pop(0), j))
+    pairs.extend(moves)
+    deleted = sorted(set(deleted) - {i for i, _ in moves})
+    inserted = sorted(set(inserted) - {j for _, j in moves})
+    return pairs, deleted, inserted
+
+
+def _apply_checkbox(task, title, is_checked, depth, index):
+    """Point `task` at a checkbox line. Returns True if anything changed.
+
+    Checking a box completes the task; unchecking reopens a done task but leaves
+    one in progress alone.
     """
     from ..models import Task
+    from .commit_matcher import normalize_title
 
-    all_tasks = list(feature.tasks.all())
-    # Match by checkbox_index first (avoids duplicate-title ambiguity), fall back to title
-    existing_by_index = {t.checkbox_index: t for t in all_tasks if t.checkbox_index is not None}
-    existing_by_title = {t.title: t for t in all_tasks if t.checkbox_index is None}
-    created = 0
-    updated = 0
-
-    seen_titles = set()
-    for i, (title, is_checked) in enumerate(checkboxes):
-        seen_titles.add(title)
-        new_status = Task.Status.DONE if is_checked else Task.Status.TODO
-
-        task = existing_by_index.get(i) or existing_by_title.get(title)
-        if task is not None:
-            changed = False
-            if task.checkbox_index != i:
-                task.checkbox_index = i
-                changed = True
-            if is_checked and task.status != Task.Status.DONE:
-                task.status = Task.Status.DONE
-                changed = True
-            elif not is_checked and task.status == Task.Status.DONE:
-                task.status = Task.Status.TODO
-                changed = True
-            if changed:
-                task.save(update_fields=['checkbox_index', 'status'])
-                updated += 1
-        else:
-            Task.objects.create(
-                feature=feature,
-                title=title,
-                status=new_status,
-                checkbox_index=i,
+    status = Task.Status.DONE if is_checked else (
+        Task.Status.TODO if task.status == Task.Status.DONE else task.status
+    )
+    if (task.title, task.checkbox_index, task.checkbox_depth, task.status) == (title, index, depth, status):
+        return False
+    if task.title != title:
+        task.title, task.normalized_title = title, normalize_title(title)
+    task.checkbox_index, task.checkbox_depth, task.status = index, depth, status
+    return True
+
+
+def _new_checkbox_task(feature, title, is_checked, depth, index):
+    from ..models import Task
+    from .commit_matcher import normalize_title
+
+    return Task(
+        feature=feature,
+        workspace_id=feature.workspace_id,  # bulk_create bypasses Task.save()
+        title=title,
+        normalized_title=normalize_title(title),
+        status=Task.Status.DONE if is_checked else Task.Status.TODO,
+        checkbox_index=index,
+        checkbox_depth=depth,
+    )
+
+
+def _write_checkbox_sync(to_update, to_create, to_delete=()):
+    """Write a checkbox sync with one delete, one bulk_update and one bulk_create, atomically where supported."""
+    from ..models import Task
+
+    if not (to_update or to_create or to_delete):
+        return
+    with _write_transaction():
+        if to_delete:
+            Task.objects.filter(pk__in=[task.pk for task in to_delete]).delete()
+        if to_update:
+            Task.objects.bulk_update(
+                to_update, ['title', 'normalized_title', 'checkbox_index', 'checkbox_depth', 'status'],
             )
-            created += 1
+        if to_create:
+            Task.objects.bulk_create(to_create)
+
+
+def sync_tasks_from_checkboxes(feature, checkboxes):
+    """Reconcile a feature's tasks with the checkboxes of its whole body. Returns (created, updated, deleted) counts.
+
+    checkboxes: list of Checkbox tuples from parse_checkboxes_from_body.
+
+    Each checkbox is matched to the task holding its checkbox_index (avoids
+    duplicate-title ambiguity), falling back to a task with no index and the same
+    title; the matched task takes the line's title, checked state and depth, and
+    unmatched checkboxes create tasks. A full resync has no signal that a line was
+    removed rather than renumbered, so it never deletes: a task left without a
+    line (its index is past the end of the list, or shared with another task) is
+    detached by clearing its checkbox_index, keeping its status, assignee and
+    commit link, and is re-adopted by title if the line comes back. Only
+    sync_tasks_from_checkbox_edit, which sees the removal, deletes tasks, so
+    `deleted` is always 0 here. Only changed tasks are written, with one
+    bulk_update and one bulk_create, in a single transaction where supported.
+    """
+    by_index = {}
+    unindexed_by_title = {}
+    detached = []
+    for task in feature.tasks.order_by('created_at'):
+        if task.checkbox_index is None:
+            unindexed_by_title.setdefault(task.title, task)
+        elif task.checkbox_index in by_index:
+            detached.append(task)
+        else:
+            by_index[task.checkbox_index] = task
+
+    to_update = []
+    to_create = []
+    for i, checkbox in enumerate(checkboxes):
+        task = by_index.pop(i, None) or unindexed_by_title.pop(checkbox.title, None)
+        if task is None:
+            to_create.append(_new_checkbox_task(feature, checkbox.title, checkbox.is_checked, checkbox.depth, i))
+        elif _apply_checkbox(task, checkbox.title, checkbox.is_checked, checkbox.depth, i):
+            to_update.append(task)
+    for task in [*by_index.values(), *detached]:
+        task.checkbox_index = None
+        to_update.append(task)
+
+    _write_checkbox_sync(to_update, to_create)
+    return len(to_create), len(to_update), 0
+
+
+def sync_tasks_from_checkbox_edit(feature, old_checkboxes, new_checkboxes):
+    """Apply only the checkbox lines that changed between two versions of a body.
+
+    Both arguments are parse_checkboxes_from_body results. Lines are aligned by
+    title (see _align_checkboxes): aligned lines that moved, were toggled or were
+    (un)indented update their task, lines reworded in place keep their task under the new title,
+    inserted lines create tasks and deleted lines delete theirs. Unchanged lines
+    are never read or written.
+
+    Returns (created, updated, deleted) counts, or None when the tasks at the
+    affected indexes don't carry `old_checkboxes`' titles and a full
+    sync_tasks_from_checkboxes is needed.
+    """
+    # Compare lines by content only; prose edits above a checkbox shift its line number
+    old = [(c.title, c.is_checked, c.depth) for c in old_checkboxes]
+    new = [(c.title, c.is_checked, c.depth) for c in new_checkboxes]
+    if old == new:
+        return 0, 0, 0
+
+    pairs, deleted, inserted = _align_checkboxes(old, new)
+    changed = [(i, j) for i, j in pairs if i != j or old[i] != new[j]]
+
+    old_indexes = [i for i, _ in changed] + deleted
+    tasks_by_index = {t.checkbox_index: t for t in feature.tasks.filter(checkbox_index__in=old_indexes)}
+    # Indexes assigned from another parse of the body (or drifted) point at other lines' tasks
+    if len(tasks_by_index) != len(old_indexes) or any(tasks_by_index[i].title != old[i][0] for i in old_indexes):
+        return None
+
+    to_update = [tasks_by_index[i] for i, j in changed if _apply_checkbox(tasks_by_index[i], *new[j], j)]
+    to_create = [_new_checkbox_task(feature, *new[j], j) for j in inserted]
+    to_delete = [tasks_by_index[i] for i in deleted]
 
-    return created, updated
+    _write_checkbox_sync(to_update, to_create, to_delete)
+    return len(to_create), len(to_update), len(to_delete)
@@ -0,0 +1,195 @@
+import contextvars
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+
+INTERACTIVE = 'interactive'
+BACKGROUND = 'background'
+
+_priority = contextvars.ContextVar('github_call_priority', default=INTERACTIVE)
+
+_SECONDARY_LIMIT_MARKERS = ('secondary rate limit', 'abuse detection')
+
+
+@contextmanager
+def github_call_priority(priority):
+    """Run the enclosed GitHub calls at `priority` (INTERACTIVE or BACKGROUND)."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority():
+    return _priority.get()
+
+
+def token_fingerprint(token):
+    """Short, non-reversible id for a token, safe to use as a metrics key."""
+    return hashlib.sha256(token.encode()).hexdigest()[:12]
+
+
+class TokenBudget:
+    """Rate-limit state for one GitHub token.
+
+    GitHub's X-RateLimit-* headers are the source of truth for the remaining budget.
+    Background calls are additionally paced by a local token bucket that spreads the
+    remaining budget over the time left in the window, and they may not spend the
+    last `reserve` calls, which are kept for interactive requests.
+    """
+
+    def __init__(self, reserve, burst):
+        self.reserve = reserve
+        self.burst = burst
+        self.limit = None
+        self.remaining = None
+        self.reset_at = None
+        self.blocked_until = 0.0
+        self.secondary_strikes = 0
+        self.tokens = float(burst)
+        self.refilled_at = time.monotonic()
+        # metrics
+        self.requests = 0
+        self.throttled = 0
+        self.waited_seconds = 0.0
+        self.secondary_limit_hits = 0
+        self.primary_limit_hits = 0
+
+    def _refill(self, now_mono, now_wall):
+        if self.remaining is not None and self.reset_at is not None and self.reset_at > now_wall:
+            rate = max(self.remaining - self.reserve, 0) / (self.reset_at - now_wall)
+        else:
+            rate = self.burst  # nothing known yet: effectively unpaced
+        self.tokens = min(self.burst, self.tokens + (now_mono - self.refilled_at) * rate)
+        self.refilled_at = now_mono
+        return rate
+
+    def delay_for(self, priority):
+        """Seconds the caller must wait before sending, or 0 to send now (consumes budget)."""
+        now_mono, now_wall = time.monotonic(), time.time()
+        if self.blocked_until > now_wall:
+            return self.blocked_until - now_wall
+
+        exhausted_at = 0 if priority == INTERACTIVE else self.reserve
+        if self.remaining is not None and self.remaining <= exhausted_at and self.reset_at:
+            if self.reset_at > now_wall:
+                return self.reset_at - now_wall
+            self.remaining = None  # the window has rolled over
+
+        if priority == BACKGROUND:
+            rate = self._refill(now_mono, now_wall)
+            if self.tokens < 1:
+                return (1 - self.tokens) / rate if rate > 0 else 1.0
+            self.tokens -= 1
+
+        if self.remaining is not None:
+            self.remaining -= 1
+        self.requests += 1
+        return 0
+
+    def record(self, response):
+        """Update the budget from a response; returns True if it was a rate-limit rejection."""
+        headers = response.headers
+        now_wall = time.time()
+        if headers.get('X-RateLimit-Remaining') is not None:
+            try:
+                self.limit = int(headers.get('X-RateLimit-Limit', self.limit or 0))
+                self.remaining = int(headers['X-RateLimit-Remaining'])
+                self.reset_at = float(headers.get('X-RateLimit-Reset', self.reset_at or 0))
+            except ValueError:
+                pass
+
+        if response.status_code not in (403, 429):
+            self.secondary_strikes = 0
+            return False
+
+        retry_after = headers.get('Retry-After')
+        body = response.text.lower() if response.content else ''
+        if retry_after is not None and retry_after.isdigit():
+            self.secondary_limit_hits += 1
+            self.blocked_until = now_wall + int(retry_after)
+        elif self.remaining == 0 and self.reset_at:
+            self.primary_limit_hits += 1
+            self.blocked_until = self.reset_at
+        elif any(marker in body for marker in _SECONDARY_LIMIT_MARKERS):
+            # No Retry-After: GitHub asks for at least a minute, growing on repeats
+            self.secondary_limit_hits += 1
+            self.secondary_strikes += 1
+            self.blocked_until = now_wall + min(60 * 2 ** (self.secondary_strikes - 1), 900)
+        else:
+            return False  # an ordinary permission error
+        return True
+
+    def snapshot(self):
+        now_wall = time.time()
+        return {
+            'limit': self.limit,
+            'remaining': self.remaining,
+            'reset_in': round(self.reset_at - now_wall, 1) if self.reset_at else None,
+            'blocked_for': round(max(self.blocked_until - now_wall, 0), 1),
+            'requests': self.requests,
+            'throttled': self.throttled,
+            'waited_seconds': round(self.waited_seconds, 2),
+            'primary_limit_hits': self.primary_limit_hits,
+            'secondary_limit_hits': self.secondary_limit_hits,
+        }
+
+
+class RateLimitScheduler:
+    """Per-token admission control for GitHub API calls.
+
+    acquire() blocks until a call may be sent, for at most the priority's max wait;
+    past that the call is sent anyway and GitHub's own rejection is surfaced.
+    """
+
+    def __init__(self, reserve=100, burst=10, interactive_max_wait=5.0, background_max_wait=300.0):
+        self.reserve = reserve
+        self.burst = burst
+        self.max_wait = {INTERACTIVE: interactive_max_wait, BACKGROUND: background_max_wait}
+        self._budgets = {}
+        self._lock = threading.Lock()
+
+    def _budget(self, token):
+        key = token_fingerprint(token)
+        budget = self._budgets.get(key)
+        if budget is None:
+            budget = self._budgets[key] = TokenBudget(self.reserve, self.burst)
+        return budget
+
+    def acquire(self, token, priority=None):
+        """Wait for budget; returns the seconds actually waited."""
+        priority = priority or current_priority()
+        deadline = time.monotonic() + self.max_wait[priority]
+        waited = 0.0
+        while True:
+            with self._lock:
+                budget = self._budget(token)
+                delay = budget.delay_for(priority)
+                if delay <= 0:
+                    return waited
+                remaining_wait = deadline - time.monotonic()
+                if remaining_wait <= 0:
+                    budget.requests += 1
+                    return waited
+                delay = min(delay, remaining_wait)
+                budget.throttled += 1
+                budget.waited_seconds += delay
+            time.sleep(delay)
+            waited += delay
+
+    def record(self, token, response):
+        with self._lock:
+            return self._budget(token).record(response)
+
+    def retry_delay(self, token, priority=None):
+        """Seconds until a rate-limited call may be retried, if within the priority's max wait."""
+        priority = priority or current_priority()
+        with self._lock:
+            wait = self._budget(token).blocked_until - time.time()
+        return wait if 0 < wait <= self.max_wait[priority] else None
+
+    def snapshot(self):
+        with self._lock:
+            return {key: budget.snapshot() for key, budget in self._budgets.items()}
@@ -0,0 +1,139 @@
+import atexit
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from ..models import Feature
+from .github import update_issue_body
+from .github_rate_limit import BACKGROUND, github_call_priority
+
+
+def sync_dirty_feature(feature_id):
+    """PATCH a feature's issue body if it is still marked dirty, then clear the mark.
+
+    The mark is cleared only if no edit re-marked the feature while the body was
+    being rendered and sent. A failed PATCH pushes the mark ISSUE_SYNC_RETRY_SECONDS
+    into the future so the worker retries it later. Returns True once the feature
+    needs no further sync.
+    """
+    feature = Feature.objects.select_related('workspace').filter(pk=feature_id).first()
+    if feature is None or feature.body_dirty_at is None:
+        return True
+    dirty_at = feature.body_dirty_at
+    synced = True
+    if feature.github_number and feature.workspace.github_token:
+        try:
+            with github_call_priority(BACKGROUND):
+                synced = update_issue_body(feature.workspace, feature) is not None
+        except Exception:
+            print(f'[ERROR] Failed to sync feature {feature_id} to GitHub')
+            traceback.print_exc()
+            synced = False
+
+    marked = Feature.objects.filter(pk=feature_id, body_dirty_at=dirty_at)
+    if synced:
+        marked.update(body_dirty_at=None)
+    else:
+        marked.update(body_dirty_at=timezone.now() + timedelta(seconds=settings.ISSUE_SYNC_RETRY_SECONDS))
+    return synced
+
+
+def flush_dirty_features(limit=100):
+    """Sync features marked dirty at least ISSUE_SYNC_DEBOUNCE_SECONDS ago. Returns how many were due.
+
+    Run periodically by `manage.py process_webhooks`, so edits whose in-process
+    timer was lost to a restart still reach GitHub.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.ISSUE_SYNC_DEBOUNCE_SECONDS)
+    feature_ids = list(
+        Feature.objects.filter(body_dirty_at__lte=cutoff)
+        .order_by('body_dirty_at')
+        .values_list('pk', flat=True)[:limit]
+    )
+    for feature_id in feature_ids:
+        sync_dirty_feature(feature_id)
+    return len(feature_ids)
+
+
+class IssueSyncQueue:
+    """Coalesces task edits into at most one issue-body PATCH per feature per window.
+
+    The durable record of a pending sync is Feature.body_dirty_at; this queue only
+    makes the common case prompt. mark_dirty() returns immediately and a daemon
+    thread syncs each feature `debounce` seconds after its first edit in this
+    process, so a burst of checkbox ticks becomes a single GitHub call. Anything
+    the timer never gets to (the process is killed or recycled) is picked up by
+    flush_dirty_features() in the worker.
+    """
+
+    def __init__(self, debounce):
+        self.debounce = debounce
+        self._due = {}  # feature_id -> monotonic time the flush is due
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def mark_dirty(self, feature_id):
+        if self.debounce <= 0:
+            self._flush(feature_id)
+            return
+        with self._cond:
+            self._due.setdefault(feature_id, time.monotonic() + self.debounce)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='issue-sync', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def pending(self):
+        with self._cond:
+            return len(self._due)
+
+    def flush_all(self):
+        """Flush every dirty feature now, ignoring the debounce window."""
+        with self._cond:
+            feature_ids = list(self._due)
+            self._due.clear()
+        for feature_id in feature_ids:
+            self._flush(feature_id)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._due:
+                    self._cond.wait()
+                now = time.monotonic()
+                ready = [feature_id for feature_id, due in self._due.items() if due <= now]
+                if not ready:
+                    self._cond.wait(min(self._due.values()) - now)
+                    continue
+                for feature_id in ready:
+                    del self._due[feature_id]
+            for feature_id in ready:
+                self._flush(feature_id)
+
+    def _flush(self, feature_id):
+        try:
+            sync_dirty_feature(feature_id)
+        except Exception:
+            # The mark is still set, so the worker will retry
+            print(f'[ERROR] Failed to sync feature {feature_id} to GitHub')
+            traceback.print_exc()
+
+
+_queue = IssueSyncQueue(settings.ISSUE_SYNC_DEBOUNCE_SECONDS)
+atexit.register(_queue.flush_all)
+
+
+def mark_feature_dirty(feature_id):
+    """Record that the feature's GitHub body is out of date and schedule a coalesced sync.
+
+    The mark is written to MongoDB before returning, so the sync survives a
+    restart of this process.
+    """
+    if feature_id is None:
+        return
+    Feature.objects.filter(pk=feature_id).update(body_dirty_at=timezone.now())
+    _queue.mark_dirty(feature_id)
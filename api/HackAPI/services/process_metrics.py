@@ -0,0 +1,62 @@
+import os
+import socket
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from ..models import ProcessMetrics
+from .commit_batcher import commit_batcher_metrics
+from .commit_matcher import commit_matcher_metrics
+from .gemini import gemini_model_metrics
+from .gemini_cache import gemini_cache_metrics
+from .github import github_rate_limit_metrics
+
+_started_at = timezone.now()
+_last_snapshot = float('-inf')
+
+
+def process_name(role):
+    """Label for this process's figures: "<role>@<host>:<pid>"."""
+    return f'{role}@{socket.gethostname()}:{os.getpid()}'
+
+
+def local_metrics():
+    """Health and budget counters of the external services, as seen by this process."""
+    return {
+        'github_rate_limits': github_rate_limit_metrics(),
+        'gemini_models': gemini_model_metrics(),
+        'gemini_cache': gemini_cache_metrics(),
+        'commit_analysis': commit_batcher_metrics(),
+        'commit_matching': commit_matcher_metrics(),
+    }
+
+
+def snapshot_metrics(role='worker'):
+    """Store this process's counters in MongoDB, at most once per METRICS_SNAPSHOT_SECONDS.
+
+    Run periodically by `manage.py process_webhooks`. Returns True if a snapshot was written.
+    """
+    global _last_snapshot
+    now = time.monotonic()
+    if now - _last_snapshot < settings.METRICS_SNAPSHOT_SECONDS:
+        return False
+    _last_snapshot = now
+    ProcessMetrics.objects.update_or_create(
+        process=process_name(role),
+        defaults={'metrics': local_metrics(), 'started_at': _started_at},
+    )
+    return True
+
+
+def stored_metrics():
+    """The latest snapshot of every worker that wrote one within the TTL, by process."""
+    return [
+        {
+            'process': row.process,
+            'started_at': row.started_at,
+            'updated_at': row.updated_at,
+            'metrics': row.metrics,
+        }
+        for row in ProcessMetrics.objects.order_by('process')
+    ]
@@ -0,0 +1,157 @@
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+
+from ..models import Task
+
+_TOKEN_RE = re.compile(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+')
+_STOPWORDS = frozenset(
+    'a an and are as at be by for from in into is it of on or the this to with '
+    'add added adds fix fixed fixes update updated updates use wip merge branch pull request'.split()
+)
+
+# Standard Okapi BM25 parameters
+_K1 = 1.2
+_B = 0.75
+
+# Workspaces whose task index is kept in memory
+_MAX_INDEXES = 256
+
+
+def tokenize(text):
+    """Lowercased word tokens, splitting camelCase, snake_case and path segments."""
+    return [
+        token for token in (match.group(0).lower() for match in _TOKEN_RE.finditer(text or ''))
+        if len(token) > 1 and token not in _STOPWORDS
+    ]
+
+
+class TaskIndex:
+    """Incrementally maintained BM25 index over one workspace's open tasks.
+
+    refresh() reads only (pk, title, updated_at) for the open tasks and re-tokenizes
+    the title and description of tasks that are new or changed since the last
+    refresh; tasks that were completed or deleted are dropped.
+    """
+
+    def __init__(self, workspace_id):
+        self.workspace_id = workspace_id
+        self._docs = {}  # pk -> (version, title, term counts, length)
+        self._df = Counter()
+        self._total_length = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def refresh(self):
+        current = {
+            pk: (title, updated_at)
+            for pk, title, updated_at in Task.objects.filter(workspace_id=self.workspace_id)
+            .exclude(status=Task.Status.DONE)
+            .values_list('pk', 'title', 'updated_at')
+        }
+        for pk in [pk for pk in self._docs if pk not in current]:
+            self._remove(pk)
+
+        stale = [pk for pk, version in current.items() if pk not in self._docs or self._docs[pk][0] != version]
+        if stale:
+            for pk, title, description in Task.objects.filter(pk__in=stale).values_list('pk', 'title', 'description'):
+                self._remove(pk)
+                terms = Counter(tokenize(f'{title}\n{description}'))
+                length = sum(terms.values())
+                self._docs[pk] = (current[pk], title, terms, length)
+                self._df.update(terms.keys())
+                self._total_length += length
+
+    def _remove(self, pk):
+        doc = self._docs.pop(pk, None)
+        if doc is None:
+            return
+        _, _, terms, length = doc
+        for term in terms:
+            if self._df[term] <= 1:
+                del self._df[term]
+            else:
+                self._df[term] -= 1
+        self._total_length -= length
+
+    def ranked_titles(self, query, limit):
+        """The `limit` distinct open task titles scoring highest for `query` under BM25 (zero scores omitted)."""
+        query_terms = set(tokenize(query))
+        n = len(self._docs)
+        if not query_terms or not n:
+            return []
+        avg_length = self._total_length / n or 1
+        idf = {
+            term: math.log(1 + (n - self._df[term] + 0.5) / (self._df[term] + 0.5))
+            for term in query_terms if term in self._df
+        }
+        scores = []
+        for _, title, terms, length in self._docs.values():
+            score = 0.0
+            for term, weight in idf.items():
+                tf = terms.get(term)
+                if tf:
+                    score += weight * tf * (_K1 + 1) / (tf + _K1 * (1 - _B + _B * length / avg_length))
+            if score > 0:
+                scores.append((score, title))
+        ranked = {}
+        for _, title in sorted(scores, reverse=True):
+            if len(ranked) >= limit:
+                break
+            ranked.setdefault(title, None)
+        return list(ranked)
+
+    def titles_by_recency(self):
+        """Distinct open task titles, most recently updated first."""
+        docs = sorted(self._docs.values(), key=lambda doc: doc[0][1], reverse=True)
+        return list(dict.fromkeys(title for _, title, _, _ in docs))
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def _index_for(workspace_id):
+    with _indexes_lock:
+        index = _indexes.get(workspace_id)
+        if index is None:
+            index = _indexes[workspace_id] = TaskIndex(workspace_id)
+        _indexes.move_to_end(workspace_id)
+        while len(_indexes) > _MAX_INDEXES:
+            _indexes.popitem(last=False)
+        return index
+
+
+def candidate_tasks(workspace_id, queries, limit=None):
+    """Pick at most `limit` open task titles worth showing Gemini for these pushes.
+
+    queries: one text per push (commit messages and changed file paths). Each push's
+    BM25 ranking is interleaved so every push gets its best candidates in; leftover
+    slots go to the most recently updated tasks, so tasks with no word overlap with
+    the commits can still be matched by the model. Returns (candidates, open task count).
+    """
+    limit = settings.GEMINI_TASK_CANDIDATES if limit is None else limit
+    index = _index_for(workspace_id)
+    with index.lock:
+        index.refresh()
+        open_count = len(index)
+        if open_count <= limit:
+            return index.titles_by_recency(), open_count
+        rankings = [index.ranked_titles(query, limit) for query in queries]
+        fallback = index.titles_by_recency()
+
+    chosen = {}
+    for rank in range(max((len(r) for r in rankings), default=0)):
+        for ranking in rankings:
+            if rank < len(ranking) and len(chosen) < limit:
+                chosen.setdefault(ranking[rank], None)
+    for title in fallback:
+        if len(chosen) >= limit:
+            break
+        chosen.setdefault(title, None)
+    return list(chosen), open_count
@@ -0,0 +1,126 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Min
+from django.utils import timezone
+
+from ..models import WebhookEvent
+
+# GitHub delivery headers kept alongside the raw body (Django META names)
+_QUEUED_HEADERS = {
+    'HTTP_X_GITHUB_EVENT': 'X-GitHub-Event',
+    'HTTP_X_GITHUB_DELIVERY': 'X-GitHub-Delivery',
+    'HTTP_X_GITHUB_HOOK_ID': 'X-GitHub-Hook-ID',
+    'HTTP_X_GITHUB_HOOK_INSTALLATION_TARGET_ID': 'X-GitHub-Hook-Installation-Target-ID',
+    'HTTP_X_GITHUB_HOOK_INSTALLATION_TARGET_TYPE': 'X-GitHub-Hook-Installation-Target-Type',
+    'HTTP_X_HUB_SIGNATURE_256': 'X-Hub-Signature-256',
+}
+
+_OPEN_STATUSES = [WebhookEvent.Status.PENDING, WebhookEvent.Status.PROCESSING]
+
+
+def ordering_key_for(payload):
+    """Return the key deliveries are serialized on — the repo's owner/name."""
+    repo = payload.get('repository', {}) or {}
+    owner = (repo.get('owner', {}) or {}).get('login', '')
+    name = repo.get('name', '')
+    return f'{owner}/{name}'
+
+
+def enqueue_delivery(request, event, payload):
+    """Persist a verified delivery (raw body + GitHub headers) for the worker. Returns the WebhookEvent."""
+    headers = {header: request.META[key] for key, header in _QUEUED_HEADERS.items() if key in request.META}
+    return WebhookEvent.objects.create(
+        delivery_id=request.META.get('HTTP_X_GITHUB_DELIVERY', ''),
+        event=event,
+        ordering_key=ordering_key_for(payload),
+        headers=headers,
+        body=request.body.decode('utf-8', errors='replace'),
+    )
+
+
+def release_expired_leases():
+    """Hand deliveries whose worker died mid-processing back to the queue."""
+    cutoff = timezone.now() - timedelta(seconds=settings.WEBHOOK_LEASE_SECONDS)
+    return WebhookEvent.objects.filter(
+        status=WebhookEvent.Status.PROCESSING, locked_at__lt=cutoff,
+    ).update(status=WebhookEvent.Status.PENDING, locked_at=None)
+
+
+def claim_due_events(limit, busy_keys=()):
+    """Claim up to `limit` deliveries that are due, at most one per ordering key.
+
+    Only the oldest open delivery for a key is eligible, so a key whose head is still
+    processing or waiting out a retry backoff blocks everything queued behind it.
+    Keys in `busy_keys` (already being processed by this worker) are skipped.
+    """
+    if limit <= 0:
+        return []
+
+    now = timezone.now()
+    heads = {
+        row['ordering_key']: row['head']
+        for row in (
+            WebhookEvent.objects.filter(status__in=_OPEN_STATUSES)
+            .exclude(ordering_key__in=list(busy_keys))
+            .values('ordering_key')
+            .annotate(head=Min('created_at'))
+        )
+    }
+    if not heads:
+        return []
+
+    candidates = (
+        WebhookEvent.objects.filter(
+            ordering_key__in=list(heads),
+            status=WebhookEvent.Status.PENDING,
+            next_attempt_at__lte=now,
+        )
+        .order_by('created_at')
+        .only('id', 'ordering_key', 'created_at')
+    )
+
+    claimed_ids = []
+    for candidate in candidates:
+        if len(claimed_ids) >= limit:
+            break
+        if heads.get(candidate.ordering_key) != candidate.created_at:
+            continue
+        # Conditional update so two workers never claim the same delivery
+        won = WebhookEvent.objects.filter(pk=candidate.pk, status=WebhookEvent.Status.PENDING).update(
+            status=WebhookEvent.Status.PROCESSING, locked_at=now,
+        )
+        if won:
+            claimed_ids.append(candidate.pk)
+            heads.pop(candidate.ordering_key)
+
+    return list(WebhookEvent.objects.filter(pk__in=claimed_ids).order_by('created_at'))
+
+
+def mark_done(webhook_event, result):
+    webhook_event.status = WebhookEvent.Status.DONE
+    webhook_event.attempts += 1
+    webhook_event.locked_at = None
+    webhook_event.last_error = ''
+    webhook_event.result = result
+    webhook_event.save(update_fields=['status', 'attempts', 'locked_at', 'last_error', 'result', 'updated_at'])
+
+
+def mark_failed(webhook_event, error, max_attempts=None):
+    """Record a failed attempt and schedule an exponential-backoff retry, or give up."""
+    max_attempts = max_attempts or settings.WEBHOOK_MAX_ATTEMPTS
+    webhook_event.attempts += 1
+    webhook_event.locked_at = None
+    webhook_event.last_error = error
+    if webhook_event.attempts >= max_attempts:
+        webhook_event.status = WebhookEvent.Status.FAILED
+    else:
+        delay = min(
+            settings.WEBHOOK_RETRY_BACKOFF_SECONDS * 2 ** (webhook_event.attempts - 1),
+            settings.WEBHOOK_RETRY_MAX_BACKOFF_SECONDS,
+        )
+        webhook_event.status = WebhookEvent.Status.PENDING
+        webhook_event.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+    webhook_event.save(
+        update_fields=['status', 'attempts', 'locked_at', 'last_error', 'next_attempt_at', 'updated_at']
+    )
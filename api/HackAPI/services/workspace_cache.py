@@ -0,0 +1,119 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from ..models import Workspace
+
+
+class _TTLCache:
+    """Thread-safe LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard_values(self, predicate):
+        with self._lock:
+            for key in [k for k, (_, v) in self._entries.items() if predicate(v)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = _TTLCache(settings.WORKSPACE_CACHE_MAXSIZE, settings.WORKSPACE_CACHE_TTL_SECONDS)
+
+
+def _lookup(repo_id, owner, name):
+    """Find the workspace by repository id, falling back to owner/name."""
+    if repo_id is not None:
+        try:
+            workspace = Workspace.objects.get(github_repo_id=repo_id)
+        except Workspace.DoesNotExist:
+            pass
+        else:
+            # The repo was renamed or transferred; keep API calls pointed at the new name
+            if owner and name and (workspace.github_repo_owner, workspace.github_repo_name) != (owner, name):
+                workspace.github_repo_owner = owner
+                workspace.github_repo_name = name
+                workspace.save(update_fields=['github_repo_owner', 'github_repo_name'])
+            return workspace
+
+    try:
+        workspace = Workspace.objects.get(github_repo_owner=owner, github_repo_name=name)
+    except Workspace.DoesNotExist:
+        return None
+
+    if repo_id is not None and workspace.github_repo_id is None:
+        workspace.github_repo_id = repo_id
+        workspace.save(update_fields=['github_repo_id'])
+    return workspace
+
+
+def resolve_workspace(payload):
+    """Return the Workspace for a webhook payload's repository, or None.
+
+    The routed Workspace is cached per process under both the repository id and
+    owner/name, so a hit costs no query. Each caller gets its own copy. Entries are
+    dropped when the workspace is saved or deleted in this process (post_save /
+    post_delete); a change made by another process is picked up once the entry
+    expires after WORKSPACE_CACHE_TTL_SECONDS.
+    """
+    repo = payload.get('repository', {}) or {}
+    repo_id = repo.get('id')
+    owner = (repo.get('owner', {}) or {}).get('login', '')
+    name = repo.get('name', '')
+
+    id_key = ('id', repo_id) if repo_id is not None else None
+    name_key = ('name', owner, name)
+
+    for key in filter(None, (id_key, name_key)):
+        workspace = _cache.get(key)
+        if workspace is not None:
+            return copy.deepcopy(workspace)
+
+    workspace = _lookup(repo_id, owner, name)
+    if workspace is not None:
+        cached = copy.deepcopy(workspace)
+        if id_key:
+            _cache.set(id_key, cached)
+        _cache.set(name_key, cached)
+    return workspace
+
+
+def invalidate_workspace(workspace):
+    """Drop this process's cached routes to `workspace`."""
+    _cache.discard_values(lambda cached: cached.pk == workspace.pk)
+
+
+@receiver(post_save, sender=Workspace)
+@receiver(post_delete, sender=Workspace)
+def _workspace_changed(sender, instance, **kwargs):
+    invalidate_workspace(instance)
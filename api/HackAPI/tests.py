@@ -1,3 +1,1068 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+import threading
+import time
+from contextlib import nullcontext
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .management.commands import process_webhooks
+from .models import (
+    BootstrapJob, CommitAnalysis, Feature, ProcessMetrics, Task, WebhookDelivery, WebhookEvent, Workspace,
+)
+from .services import bootstrap, commit_batcher, gemini, github, process_metrics, workspace_cache
+from .services.bootstrap import claim_bootstrap_jobs, release_stale_bootstraps, run_bootstrap
+from .services.commit_batcher import process_due_analyses, submit_commit_analysis
+from .services.commit_matcher import match_commits
+from .services.github import (
+    parse_checkboxes_from_body, render_tasks_as_checkboxes, sync_tasks_from_checkbox_edit, sync_tasks_from_checkboxes,
+)
+from .services.delivery_ledger import IN_PROGRESS, claim_delivery, record_result
+from .services.github_rate_limit import BACKGROUND, INTERACTIVE, github_call_priority, token_fingerprint
+from .services.webhook_queue import claim_due_events, mark_done, mark_failed, release_expired_leases
+from .services.workspace_cache import resolve_workspace
+from .views.webhooks import handle_push
+
+
+def make_workspace(user, name='Workspace', owner='octo', repo='repo', **kwargs):
+    return Workspace.objects.create(
+        name=name,
+        github_repo_url=f'https://github.com/{owner}/{repo}',
+        github_repo_owner=owner,
+        github_repo_name=repo,
+        created_by=user,
+        members=[user.pk],
+        **kwargs,
+    )
+
+
+def checkbox_body(*items):
+    """An issue body listing `items` as checkboxes; a title prefixed with 'x ' is checked."""
+    lines = ['Intro prose.', '']
+    for item in items:
+        checked = item.startswith('x ')
+        lines.append(f"- [{'x' if checked else ' '}] {item[2:] if checked else item}")
+    return '\n'.join(lines)
+
+
+class TaskListQueryCountTests(TestCase):
+    """The task list must cost the same number of queries however many workspaces and features a user has."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('member')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _grow(self, workspaces, features_per_workspace, tasks_per_feature=2):
+        for w in range(workspaces):
+            workspace = make_workspace(self.user, name=f'ws-{w}', repo=f'repo-{Workspace.objects.count()}')
+            for f in range(features_per_workspace):
+                feature = Feature.objects.create(workspace=workspace, name=f'feature-{f}')
+                Task.objects.bulk_create([
+                    Task(feature=feature, workspace_id=workspace.pk, title=f'task-{f}-{t}', checkbox_index=t)
+                    for t in range(tasks_per_feature)
+                ])
+
+    def _list_queries(self, path='/api/tasks/'):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_is_constant_as_workspaces_and_features_grow(self):
+        self._grow(workspaces=1, features_per_workspace=1)
+        baseline = self._list_queries()
+
+        self._grow(workspaces=4, features_per_workspace=3)
+        self.assertEqual(self._list_queries(), baseline)
+
+        self._grow(workspaces=10, features_per_workspace=5)
+        self.assertEqual(self._list_queries(), baseline)
+
+    def test_filtered_list_query_count_is_constant(self):
+        self._grow(workspaces=1, features_per_workspace=1)
+        workspace = Workspace.objects.first()
+        path = f'/api/tasks/?workspace={workspace.pk}'
+        baseline = self._list_queries(path)
+
+        self._grow(workspaces=5, features_per_workspace=4)
+        self.assertEqual(self._list_queries(path), baseline)
+
+
+class _StubGitHubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.hits.append((self.path, time.monotonic()))
+        status, headers = self.server.responses.pop(0) if self.server.responses else (200, {})
+        limit = self.server.rate_limit
+        body = json.dumps({'path': self.path}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('X-RateLimit-Limit', str(limit['limit']))
+        self.send_header('X-RateLimit-Remaining', str(limit['remaining']))
+        self.send_header('X-RateLimit-Reset', str(int(limit['reset'])))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubGitHubServer(ThreadingHTTPServer):
+    """Local stand-in for api.github.com that answers with configurable X-RateLimit-* headers.
+
+    `responses` holds (status, extra headers) to send before falling back to 200s;
+    `hits` records (path, monotonic time) for every request received.
+    """
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _StubGitHubHandler)
+        self.rate_limit = {'limit': 5000, 'remaining': 5000, 'reset': time.time() + 3600}
+        self.responses = []
+        self.hits = []
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+
+@override_settings(
+    GITHUB_RATE_LIMIT_RESERVE=5,
+    GITHUB_BACKGROUND_BURST=2,
+    GITHUB_INTERACTIVE_MAX_WAIT=3,
+    GITHUB_BACKGROUND_MAX_WAIT=0.5,
+    GITHUB_HTTP_RETRIES=0,
+)
+class GitHubRateLimitTests(SimpleTestCase):
+    """RateLimitScheduler behaviour against a local fake GitHub, through the shared GitHubClient."""
+
+    def setUp(self):
+        self.server = self.enterContext(StubGitHubServer())
+        github._client = None
+        self.enterContext(override_settings(GITHUB_API_URL=self.server.url))
+        self.addCleanup(setattr, github, '_client', None)
+
+    def _timed_get(self, priority, path='/repos/octo/repo', token='token-a'):
+        started = time.monotonic()
+        with github_call_priority(priority):
+            resp = github.get_github_client().get(path, token)
+        return resp, time.monotonic() - started
+
+    def _budget(self, token='token-a'):
+        return github.get_github_client().scheduler.snapshot()[token_fingerprint(token)]
+
+    def test_background_yields_the_reserve_to_interactive_calls(self):
+        self.server.rate_limit.update(remaining=5, reset=time.time() + 60)
+        self._timed_get(INTERACTIVE)  # learn the budget from the headers
+
+        resp, background_elapsed = self._timed_get(BACKGROUND)
+        self.assertEqual(resp.status_code, 200)
+        # Held for the whole background max wait, then sent anyway
+        self.assertGreaterEqual(background_elapsed, 0.45)
+
+        resp, interactive_elapsed = self._timed_get(INTERACTIVE)
+        self.assertEqual(resp.status_code, 200)
+        self.assertLess(interactive_elapsed, 0.3)
+        self.assertGreaterEqual(self._budget()['throttled'], 1)
+
+    def test_background_calls_are_paced_across_the_window(self):
+        # 10 spare calls over an hour: the burst of 2 goes out, the next background call waits
+        self.server.rate_limit.update(remaining=15, reset=time.time() + 3600)
+        self._timed_get(INTERACTIVE)
+        for _ in range(2):
+            _, elapsed = self._timed_get(BACKGROUND)
+            self.assertLess(elapsed, 0.3)
+        _, elapsed = self._timed_get(BACKGROUND)
+        self.assertGreaterEqual(elapsed, 0.45)
+
+        _, elapsed = self._timed_get(INTERACTIVE)
+        self.assertLess(elapsed, 0.3)
+
+    def test_exhausted_budget_waits_for_the_reset(self):
+        self.server.rate_limit.update(remaining=0, reset=time.time() + 1)
+        self._timed_get(INTERACTIVE)
+        self.server.rate_limit.update(remaining=5000, reset=time.time() + 3600)
+
+        resp, elapsed = self._timed_get(INTERACTIVE)
+        self.assertEqual(resp.status_code, 200)
+        self.assertGreater(elapsed, 0.1)
+        self.assertLess(elapsed, 2.5)
+        self.assertEqual(self._budget()['remaining'], 5000)
+
+    def test_budgets_are_kept_per_token(self):
+        self.server.rate_limit.update(remaining=0, reset=time.time() + 60)
+        self._timed_get(INTERACTIVE, token='token-a')
+
+        _, elapsed = self._timed_get(BACKGROUND, token='token-b')
+        self.assertLess(elapsed, 0.3)
+
+    def test_secondary_limit_retry_after_is_honoured_once(self):
+        self.server.responses.append((429, {'Retry-After': '1'}))
+
+        resp, _ = self._timed_get(INTERACTIVE)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(self.server.hits), 2)
+        self.assertGreaterEqual(self.server.hits[1][1] - self.server.hits[0][1], 0.9)
+        self.assertEqual(self._budget()['secondary_limit_hits'], 1)
+
+    def test_background_does_not_retry_past_its_max_wait(self):
+        self.server.responses.append((429, {'Retry-After': '30'}))
+
+        resp, elapsed = self._timed_get(BACKGROUND)
+        self.assertEqual(resp.status_code, 429)
+        self.assertEqual(len(self.server.hits), 1)
+        self.assertLess(elapsed, 0.3)
+
+
+class CheckboxParserTests(SimpleTestCase):
+    """parse_checkboxes_from_body: task-list syntax, fences, positions and nesting."""
+
+    def _parse(self, body):
+        return [(c.title, c.is_checked, c.depth, c.parent) for c in parse_checkboxes_from_body(body)]
+
+    def test_bullets_and_ordered_items(self):
+        body = '- [ ] Dash\n* [x] Star\n+ [X] Plus\n1. [ ] Dot\n2) [x] Paren\n-[ ] no space\n- [] empty'
+        self.assertEqual(
+            [(title, checked) for title, checked, _, _ in self._parse(body)],
+            [('Dash', False), ('Star', True), ('Plus', True), ('Dot', False), ('Paren', True)],
+        )
+
+    def test_fenced_items_are_skipped(self):
+        body = '\n'.join([
+            '- [ ] Before', '```', '- [ ] in backticks', '~~~', '- [ ] still in backticks', '```',
+            '~~~~md', '- [ ] in tildes', '~~~', '- [ ] a shorter fence does not close', '~~~~', '- [ ] After',
+        ])
+        self.assertEqual([title for title, *_ in self._parse(body)], ['Before', 'After'])
+
+    def test_lines_and_offsets(self):
+        body = 'Intro\r\n\r\n- [ ] One\r\n- [x] Two  \r\nprose\n  - [ ] Three'
+        checkboxes = parse_checkboxes_from_body(body)
+        self.assertEqual([(c.title, c.line) for c in checkboxes], [('One', 3), ('Two', 4), ('Three', 6)])
+        self.assertEqual([body[c.offset:].split('\r')[0].split('\n')[0] for c in checkboxes],
+                         ['- [ ] One', '- [x] Two  ', '  - [ ] Three'])
+
+    def test_nesting(self):
+        body = '\n'.join([
+            '- [ ] A',
+            '  - [ ] A.1',
+            '    1. [ ] A.1.a',
+            '  - [x] A.2',
+            '\t- [ ] A.2.a (tab, 4 columns)',
+            '- [ ] B',
+            '   * [ ] B.1',
+        ])
+        self.assertEqual(self._parse(body), [
+            ('A', False, 0, None),
+            ('A.1', False, 1, 0),
+            ('A.1.a', False, 2, 1),
+            ('A.2', True, 1, 0),
+            ('A.2.a (tab, 4 columns)', False, 2, 3),
+            ('B', False, 0, None),
+            ('B.1', False, 1, 5),
+        ])
+
+    def test_indented_list_without_top_level_item(self):
+        self.assertEqual(self._parse('  - [ ] A\n    - [ ] B\n  - [ ] C'), [
+            ('A', False, 0, None), ('B', False, 1, 0), ('C', False, 0, None),
+        ])
+
+
+class CheckboxSyncTests(TestCase):
+    """sync_tasks_from_checkboxes matches tasks by checkbox index, then title, and never deletes."""
+
+    def setUp(self):
+        user = User.objects.create_user('owner')
+        self.feature = Feature.objects.create(workspace=make_workspace(user), name='Feature', github_number=1)
+
+    def _sync(self, *items):
+        return sync_tasks_from_checkboxes(self.feature, parse_checkboxes_from_body(checkbox_body(*items)))
+
+    def _by_index(self):
+        """{checkbox_index: (pk, title, status)} of the feature's tasks that have a line."""
+        return {
+            task.checkbox_index: (task.pk, task.title, task.status)
+            for task in Task.objects.filter(feature=self.feature, checkbox_index__isnull=False)
+        }
+
+    def _assert_layout(self, *titles):
+        layout = self._by_index()
+        self.assertEqual([layout[i][1] for i in sorted(layout)], list(titles))
+
+    def test_reorder_updates_tasks_in_place(self):
+        self._sync('Alpha', 'Beta', 'x Gamma')
+        pks = {i: pk for i, (pk, _, _) in self._by_index().items()}
+
+        self.assertEqual(self._sync('x Gamma', 'Alpha', 'Beta'), (0, 3, 0))
+        self._assert_layout('Gamma', 'Alpha', 'Beta')
+        self.assertEqual({i: pk for i, (pk, _, _) in self._by_index().items()}, pks)
+        self.assertEqual(self._by_index()[0][2], Task.Status.DONE)
+        self.assertEqual(Task.objects.filter(feature=self.feature).count(), 3)
+
+    def test_toggle_keeps_task_identity(self):
+        self._sync('Alpha', 'Beta')
+        beta_pk = self._by_index()[1][0]
+
+        self.assertEqual(self._sync('Alpha', 'x Beta'), (0, 1, 0))
+        self.assertEqual(self._by_index()[1], (beta_pk, 'Beta', Task.Status.DONE))
+
+        self.assertEqual(self._sync('Alpha', 'Beta'), (0, 1, 0))
+        self.assertEqual(self._by_index()[1], (beta_pk, 'Beta', Task.Status.TODO))
+
+    def test_unchecking_leaves_in_progress_tasks_alone(self):
+        self._sync('Alpha')
+        Task.objects.filter(feature=self.feature).update(status=Task.Status.IN_PROGRESS)
+
+        self.assertEqual(self._sync('Alpha'), (0, 0, 0))
+        self.assertEqual(self._by_index()[0][2], Task.Status.IN_PROGRESS)
+
+    def test_insert_above_creates_one_task(self):
+        self._sync('Alpha', 'Beta')
+
+        self.assertEqual(self._sync('New', 'Alpha', 'Beta'), (1, 2, 0))
+        self._assert_layout('New', 'Alpha', 'Beta')
+        self.assertEqual(Task.objects.filter(feature=self.feature).count(), 3)
+
+    def test_removed_lines_detach_instead_of_deleting(self):
+        self._sync('Alpha', 'Beta', 'x Gamma')
+        gamma_pk = self._by_index()[2][0]
+
+        self.assertEqual(self._sync('Alpha'), (0, 2, 0))
+        self._assert_layout('Alpha')
+        detached = Task.objects.get(pk=gamma_pk)
+        self.assertEqual((detached.checkbox_index, detached.status), (None, Task.Status.DONE))
+
+        # The line coming back re-adopts the detached task by title
+        self.assertEqual(self._sync('Alpha', 'x Gamma'), (0, 1, 0))
+        self.assertEqual(self._by_index()[1], (gamma_pk, 'Gamma', Task.Status.DONE))
+
+    def test_new_line_adopts_task_without_checkbox(self):
+        local = Task.objects.create(feature=self.feature, title='Local')
+
+        self.assertEqual(self._sync('Alpha', 'Local'), (1, 1, 0))
+        self.assertEqual(self._by_index()[1][0], local.pk)
+        self._assert_layout('Alpha', 'Local')
+
+    def test_write_queries_do_not_grow_with_the_task_count(self):
+        def queries_for_reversal(count):
+            Task.objects.filter(feature=self.feature).delete()
+            titles = [f'Task {i}' for i in range(count)]
+            self._sync(*titles)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self._sync(*reversed(titles)), (0, count - count % 2, 0))
+            return len(queries)
+
+        self.assertEqual(queries_for_reversal(4), queries_for_reversal(40))
+
+    def test_writes_run_in_a_transaction_when_supported(self):
+        self._sync('Alpha')
+        with mock.patch.object(connection.features, '_supports_transactions', True), \
+                mock.patch.object(github, 'atomic', return_value=nullcontext()) as atomic:
+            self._sync('x Alpha', 'Beta')
+        atomic.assert_called_once_with()
+        self._assert_layout('Alpha', 'Beta')
+
+    def test_writes_without_transaction_support(self):
+        self._sync('Alpha')
+        with mock.patch.object(connection.features, '_supports_transactions', False), \
+                mock.patch.object(github, 'atomic') as atomic:
+            self.assertEqual(self._sync('x Alpha', 'Beta'), (1, 1, 0))
+        atomic.assert_not_called()
+        self._assert_layout('Alpha', 'Beta')
+        self.assertEqual(self._by_index()[0][2], Task.Status.DONE)
+
+    def test_nesting_is_stored_and_rendered(self):
+        body = '- [ ] Parent\n  - [x] Child\n    - [ ] Grandchild\n- [ ] Sibling'
+        sync_tasks_from_checkboxes(self.feature, parse_checkboxes_from_body(body))
+        self.assertEqual(
+            list(Task.objects.filter(feature=self.feature).order_by('checkbox_index')
+                 .values_list('title', 'checkbox_depth')),
+            [('Parent', 0), ('Child', 1), ('Grandchild', 2), ('Sibling', 0)],
+        )
+        self.assertEqual(render_tasks_as_checkboxes(self.feature.tasks.all()), body)
+
+        # Outdenting a line updates its task in place
+        child_pk = self._by_index()[1][0]
+        outdented = '- [ ] Parent\n- [x] Child\n  - [ ] Grandchild\n- [ ] Sibling'
+        self.assertEqual(sync_tasks_from_checkboxes(self.feature, parse_checkboxes_from_body(outdented)), (0, 2, 0))
+        self.assertEqual(Task.objects.get(pk=child_pk).checkbox_depth, 0)
+        self.assertEqual(render_tasks_as_checkboxes(self.feature.tasks.all()), outdented)
+
+    def test_edit_diff_applies_indentation_changes(self):
+        before = '- [ ] Parent\n- [ ] Child'
+        after = '- [ ] Parent\n  - [ ] Child'
+        sync_tasks_from_checkboxes(self.feature, parse_checkboxes_from_body(before))
+
+        self.assertEqual(sync_tasks_from_checkbox_edit(
+            self.feature, parse_checkboxes_from_body(before), parse_checkboxes_from_body(after),
+        ), (0, 1, 0))
+        self.assertEqual(render_tasks_as_checkboxes(self.feature.tasks.all()), after)
+
+    def test_rendering_never_skips_a_level(self):
+        Task.objects.create(feature=self.feature, title='Orphan', checkbox_index=0, checkbox_depth=2)
+        Task.objects.create(feature=self.feature, title='Deep', checkbox_index=1, checkbox_depth=3)
+        self.assertEqual(render_tasks_as_checkboxes(self.feature.tasks.all()), '- [ ] Orphan\n  - [ ] Deep')
+
+    def test_no_op_sync_writes_nothing(self):
+        self._sync('Alpha', 'x Beta')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self._sync('Alpha', 'x Beta'), (0, 0, 0))
+        self.assertEqual(len(queries), 1)  # the read of the feature's tasks
+
+
+class CheckboxDeletionPolicyTests(TestCase):
+    """Only an edit diff that removes a checkbox line deletes its task; a full resync never does."""
+
+    EDITS = [
+        ('delete', ['Alpha', 'Beta', 'Gamma'], ['Alpha', 'Gamma'], 1),
+        ('delete all', ['Alpha', 'Beta'], [], 2),
+        ('reorder and delete', ['Alpha', 'Beta', 'Gamma', 'Delta'], ['Delta', 'Alpha', 'Gamma'], 1),
+        ('insert and delete', ['Alpha', 'Beta', 'Gamma'], ['New', 'Alpha', 'Gamma', 'Newer'], 1),
+        ('reword and toggle', ['Alpha', 'Beta'], ['x Alpha', 'Beta, reworded'], 0),
+        ('move', ['Alpha', 'Beta', 'Gamma'], ['Gamma', 'Alpha', 'Beta'], 0),
+    ]
+
+    def setUp(self):
+        self.user = User.objects.create_user('owner')
+        self.workspace = make_workspace(self.user)
+
+    def _feature(self, items):
+        feature = Feature.objects.create(workspace=self.workspace, name='Feature', github_number=1)
+        sync_tasks_from_checkboxes(feature, parse_checkboxes_from_body(checkbox_body(*items)))
+        return feature
+
+    def _layout(self, feature):
+        return [
+            (title, status) for title, status in
+            Task.objects.filter(feature=feature, checkbox_index__isnull=False)
+            .order_by('checkbox_index').values_list('title', 'status')
+        ]
+
+    def test_edit_diff_deletes_only_removed_lines(self):
+        for name, old_items, new_items, removed in self.EDITS:
+            with self.subTest(name):
+                feature = self._feature(old_items)
+                old = parse_checkboxes_from_body(checkbox_body(*old_items))
+                new = parse_checkboxes_from_body(checkbox_body(*new_items))
+
+                created, _, deleted = sync_tasks_from_checkbox_edit(feature, old, new)
+
+                self.assertEqual(deleted, removed)
+                self.assertEqual(Task.objects.filter(feature=feature).count(), len(old_items) - removed + created)
+
+    def test_full_resync_never_deletes(self):
+        for name, old_items, new_items, _ in self.EDITS:
+            with self.subTest(name):
+                feature = self._feature(old_items)
+                before = set(Task.objects.filter(feature=feature).values_list('pk', flat=True))
+
+                new = parse_checkboxes_from_body(checkbox_body(*new_items))
+                _, _, deleted = sync_tasks_from_checkboxes(feature, new)
+
+                self.assertEqual(deleted, 0)
+                self.assertLessEqual(before, set(Task.objects.filter(feature=feature).values_list('pk', flat=True)))
+
+    def test_both_paths_render_the_same_checkboxes(self):
+        for name, old_items, new_items, _ in self.EDITS:
+            with self.subTest(name):
+                incremental, full = self._feature(old_items), self._feature(old_items)
+                old = parse_checkboxes_from_body(checkbox_body(*old_items))
+                new = parse_checkboxes_from_body(checkbox_body(*new_items))
+
+                sync_tasks_from_checkbox_edit(incremental, old, new)
+                sync_tasks_from_checkboxes(full, new)
+
+                self.assertEqual(self._layout(incremental), self._layout(full))
+
+
+@override_settings(GEMINI_BATCH_WINDOW_SECONDS=5, GEMINI_BATCH_MAX_PUSHES=20)
+class CommitAnalysisQueueTests(TestCase):
+    """Queued commit analyses are batched per workspace, applied in order and retried on failure."""
+
+    def setUp(self):
+        user = User.objects.create_user('owner')
+        self.workspace = make_workspace(user)
+        feature = Feature.objects.create(workspace=self.workspace, name='Feature')
+        for title in ('Add login', 'Add logout'):
+            Task.objects.create(feature=feature, title=title)
+
+    def _make_due(self):
+        CommitAnalysis.objects.update(next_attempt_at=timezone.now())
+
+    def _completed_by(self):
+        done = Task.objects.filter(workspace=self.workspace, status=Task.Status.DONE)
+        return dict(done.values_list('title', 'completed_by_commit'))
+
+    def test_queued_pushes_are_analyzed_in_one_call(self):
+        self.assertIsNone(submit_commit_analysis(self.workspace.pk, ['login form'], 'aaa'))
+        self.assertIsNone(submit_commit_analysis(self.workspace.pk, ['logout button'], 'bbb'))
+        self.assertEqual(process_due_analyses(), 0)  # still inside the window
+
+        self._make_due()
+        with mock.patch.object(commit_batcher, 'analyze_commit_batch', return_value={
+            'push-0': ['Add login'], 'push-1': ['Add logout'],
+        }) as analyze:
+            self.assertEqual(process_due_analyses(), 2)
+
+        analyze.assert_called_once()
+        self.assertEqual(analyze.call_args.args[0], {'push-0': ['login form'], 'push-1': ['logout button']})
+        self.assertEqual(self._completed_by(), {'Add login': 'aaa', 'Add logout': 'bbb'})
+        self.assertEqual(set(CommitAnalysis.objects.values_list('status', flat=True)), {CommitAnalysis.Status.DONE})
+
+    def test_failed_analysis_is_retried(self):
+        submit_commit_analysis(self.workspace.pk, ['login form'], 'aaa')
+        self._make_due()
+        with mock.patch.object(commit_batcher, 'analyze_commits', side_effect=RuntimeError('boom')):
+            process_due_analyses()
+
+        analysis = CommitAnalysis.objects.get()
+        self.assertEqual((analysis.status, analysis.attempts), (CommitAnalysis.Status.PENDING, 1))
+        self.assertGreater(analysis.next_attempt_at, timezone.now())
+        self.assertEqual(self._completed_by(), {})
+
+        self._make_due()
+        with mock.patch.object(commit_batcher, 'analyze_commits', return_value=['Add login']):
+            self.assertEqual(process_due_analyses(), 1)
+        self.assertEqual(CommitAnalysis.objects.get().status, CommitAnalysis.Status.DONE)
+        self.assertEqual(self._completed_by(), {'Add login': 'aaa'})
+
+    @override_settings(GEMINI_API_KEY='test-key')
+    def test_no_answer_from_gemini_is_retried(self):
+        submit_commit_analysis(self.workspace.pk, ['login form'], 'aaa')
+        submit_commit_analysis(self.workspace.pk, ['logout button'], 'bbb')
+        self._make_due()
+        # Every model exhausted or cooling down: _call_gemini has no answer
+        with mock.patch.object(gemini, '_call_gemini', return_value=None):
+            self.assertEqual(process_due_analyses(), 2)
+
+        for analysis in CommitAnalysis.objects.all():
+            self.assertEqual((analysis.status, analysis.attempts), (CommitAnalysis.Status.PENDING, 1))
+            self.assertIn('no usable commit analysis', analysis.last_error)
+        self.assertEqual(self._completed_by(), {})
+
+    @override_settings(GEMINI_BATCH_MAX_PUSHES=2)
+    def test_full_batch_keeps_retry_backoff(self):
+        submit_commit_analysis(self.workspace.pk, ['login form'], 'aaa')
+        retry_at = timezone.now() + timedelta(minutes=5)
+        CommitAnalysis.objects.update(attempts=1, next_attempt_at=retry_at)
+
+        submit_commit_analysis(self.workspace.pk, ['logout button'], 'bbb')
+
+        self.assertEqual(CommitAnalysis.objects.get(sha='aaa').next_attempt_at, retry_at)
+        self.assertLessEqual(CommitAnalysis.objects.get(sha='bbb').next_attempt_at, timezone.now())
+
+    def test_workspace_waits_for_its_batch_in_progress(self):
+        submit_commit_analysis(self.workspace.pk, ['login form'], 'aaa')
+        submit_commit_analysis(self.workspace.pk, ['logout button'], 'bbb')
+        self._make_due()
+        first = CommitAnalysis.objects.order_by('created_at').first()
+        CommitAnalysis.objects.filter(pk=first.pk).update(
+            status=CommitAnalysis.Status.PROCESSING, locked_at=timezone.now(),
+        )
+
+        with mock.patch.object(commit_batcher, 'analyze_commits') as analyze:
+            self.assertEqual(process_due_analyses(), 0)
+        analyze.assert_not_called()
+
+    @override_settings(GEMINI_BATCH_WINDOW_SECONDS=0)
+    def test_zero_window_analyzes_inline(self):
+        with mock.patch.object(commit_batcher, 'analyze_commits', return_value=['Add login']):
+            completion = submit_commit_analysis(self.workspace.pk, ['login form'], 'aaa')
+
+        self.assertEqual(completion, {'completed_tasks': ['Add login'], 'tasks_completed': 1})
+        self.assertFalse(CommitAnalysis.objects.exists())
+
+
+@override_settings(GEMINI_BATCH_WINDOW_SECONDS=5)
+class CommitMatchingTests(TestCase):
+    """Commits naming their task are matched per commit; only the rest are sent for analysis."""
+
+    def setUp(self):
+        user = User.objects.create_user('owner')
+        self.workspace = make_workspace(user)
+        self.feature = Feature.objects.create(workspace=self.workspace, name='Feature')
+        self.login = Task.objects.create(feature=self.feature, title='Add login page')
+
+    def test_normalized_title_follows_title(self):
+        task = Task.objects.create(feature=self.feature, title='Backend: Add Logout-Button (#12)')
+        self.assertEqual(task.normalized_title, 'backend add logout button')
+
+        task.title = 'Remove logout'
+        task.save(update_fields=['title'])
+        task.refresh_from_db()
+        self.assertEqual(task.normalized_title, 'remove logout')
+
+    def test_subject_matches_by_normalized_title(self):
+        matches, matched_shas = match_commits(
+            self.workspace, [('fix: add login page\n\nbody', 'aaa'), ('tweak', 'bbb')],
+        )
+
+        self.assertEqual(matches, {self.login.pk: ('Add login page', 'aaa')})
+        self.assertEqual(matched_shas, {'aaa'})
+
+    def test_only_conventional_prefixes_are_stripped(self):
+        backend = Task.objects.create(feature=self.feature, title='Backend: add search')
+        frontend = Task.objects.create(feature=self.feature, title='Frontend: add search')
+        prefixed = Task.objects.create(feature=self.feature, title='feat: add export')
+
+        matches, _ = match_commits(self.workspace, [
+            ('Backend: add search', 'aaa'),
+            ('feat(api)!: Add login page (#3)', 'bbb'),
+            ('feat: add export', 'ccc'),
+        ])
+
+        self.assertEqual(matches, {
+            backend.pk: ('Backend: add search', 'aaa'),
+            self.login.pk: ('Add login page', 'bbb'),
+            prefixed.pk: ('feat: add export', 'ccc'),
+        })
+        self.assertNotIn(frontend.pk, matches)
+
+    def test_push_sends_only_unmatched_commits_for_analysis(self):
+        result = handle_push({'ref': 'refs/heads/main', 'commits': [
+            {'id': 'a' * 40, 'message': 'Add login page', 'added': ['login.py']},
+            {'id': 'b' * 40, 'message': 'Refactor session storage', 'modified': ['session.py']},
+        ]}, self.workspace)
+
+        self.assertEqual(result['completed_tasks'], ['Add login page'])
+        self.assertEqual(result['completion_analysis'], 'queued')
+        self.login.refresh_from_db()
+        self.assertEqual((self.login.status, self.login.completed_by_commit), (Task.Status.DONE, 'a' * 12))
+        analysis = CommitAnalysis.objects.get()
+        self.assertEqual(analysis.commit_messages, ['Refactor session storage'])
+        self.assertEqual(analysis.changed_files, ['session.py'])
+        self.assertEqual(analysis.sha, 'b' * 12)
+
+
+class GenerateStreamTests(TestCase):
+    """generate_stream ends with `done` only when generation finishes, and with `error` otherwise."""
+
+    def setUp(self):
+        user = User.objects.create_user('owner')
+        self.workspace = make_workspace(user)
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def _events(self, generated):
+        with mock.patch('HackAPI.views.workspaces.stream_features_and_tasks', return_value=generated):
+            response = self.client.post(
+                f'/api/workspaces/{self.workspace.pk}/generate_stream/', {'description': 'A todo app'}, format='json',
+            )
+            body = b''.join(response.streaming_content).decode()
+        return [
+            (block.split('\n')[0].removeprefix('event: '), json.loads(block.split('\n')[1].removeprefix('data: ')))
+            for block in body.strip().split('\n\n')
+        ]
+
+    def _failing_after_one(self):
+        yield {'name': 'Accounts', 'tasks': [{'title': 'Sign up'}]}
+        raise RuntimeError('stream cut off')
+
+    def test_done_after_every_feature(self):
+        events = self._events(iter([{'name': 'Accounts', 'tasks': []}, {'name': 'Lists', 'tasks': []}]))
+
+        self.assertEqual([name for name, _ in events], ['feature', 'feature', 'done'])
+        self.assertEqual(events[-1][1], {'count': 2})
+
+    def test_failure_mid_stream_ends_with_error(self):
+        events = self._events(self._failing_after_one())
+
+        self.assertEqual([name for name, _ in events], ['feature', 'error'])
+        self.assertEqual(events[-1][1]['count'], 1)
+        self.assertTrue(Feature.objects.filter(workspace=self.workspace, name='Accounts').exists())
+
+    def test_nothing_generated_ends_with_error(self):
+        events = self._events(iter([]))
+
+        self.assertEqual([name for name, _ in events], ['error'])
+
+
+@override_settings(BOOTSTRAP_JOB_TIMEOUT_SECONDS=600, BOOTSTRAP_MAX_ATTEMPTS=3)
+class BootstrapJobTests(TestCase):
+    """Bootstrap jobs are queued by the API, run by the worker and resumed after a crash."""
+
+    FEATURES = [
+        {'name': 'Accounts', 'tasks': [{'title': 'Sign up'}]},
+        {'name': 'Lists', 'tasks': [{'title': 'Create list'}]},
+    ]
+
+    def setUp(self):
+        user = User.objects.create_user('owner')
+        self.workspace = make_workspace(user)
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.url = f'/api/workspaces/{self.workspace.pk}/bootstrap/'
+
+    def _run(self, job_id):
+        with mock.patch.object(bootstrap, 'register_webhook', return_value={'id': 1}) as register, \
+                mock.patch.object(bootstrap, 'fetch_repo_summary', return_value='README'), \
+                mock.patch.object(bootstrap, 'generate_features_from_repo', return_value=self.FEATURES):
+            run_bootstrap(job_id)
+        return register
+
+    def _job(self):
+        return BootstrapJob.objects.get(workspace=self.workspace)
+
+    def test_post_returns_the_active_job_with_409(self):
+        first = self.client.post(self.url)
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(first.data['status'], BootstrapJob.Status.PENDING)
+
+        second = self.client.post(self.url)
+        self.assertEqual(second.status_code, 409)
+        self.assertEqual(second.data['id'], first.data['id'])
+        self.assertEqual(BootstrapJob.objects.filter(workspace=self.workspace).count(), 1)
+
+    def test_poll_follows_the_job_lifecycle(self):
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        job_id = self.client.post(self.url).data['id']
+
+        self.assertEqual(claim_bootstrap_jobs(5), [self._job().pk])
+        self.assertEqual(claim_bootstrap_jobs(5), [])
+        running = self.client.get(self.url)
+        self.assertEqual((running.data['id'], running.data['status']), (job_id, BootstrapJob.Status.RUNNING))
+
+        self._run(self._job().pk)
+        done = self.client.get(self.url).data
+        self.assertEqual((done['status'], done['progress']), (BootstrapJob.Status.DONE, 100))
+        self.assertEqual(done['result']['features_created'], 2)
+        self.assertEqual(Feature.objects.filter(workspace=self.workspace).count(), 2)
+        # A finished job no longer blocks a new one
+        self.assertEqual(self.client.post(self.url).status_code, 202)
+
+    def test_stale_running_job_is_resumed(self):
+        self.client.post(self.url)
+        claim_bootstrap_jobs(1)
+        accounts = Feature.objects.create(workspace=self.workspace, name='Accounts')
+        BootstrapJob.objects.filter(workspace=self.workspace).update(
+            step='creating_features',
+            result={'webhook_registered': True, 'features_created': 1, 'feature_ids': [str(accounts.pk)]},
+            updated_at=timezone.now() - timedelta(seconds=601),
+        )
+
+        self.assertEqual(release_stale_bootstraps(), 1)
+        self.assertEqual(claim_bootstrap_jobs(1), [self._job().pk])
+        register = self._run(self._job().pk)
+
+        job = self._job()
+        self.assertEqual((job.status, job.attempts), (BootstrapJob.Status.DONE, 2))
+        self.assertEqual(job.result['features_created'], 2)
+        register.assert_not_called()
+        names = Feature.objects.filter(workspace=self.workspace).values_list('name', flat=True)
+        self.assertEqual(sorted(names), ['Accounts', 'Lists'])
+
+    def test_resume_reuses_the_saved_feature_list_and_keeps_progress(self):
+        self.client.post(self.url)
+        claim_bootstrap_jobs(1)
+        lists = Feature.objects.create(workspace=self.workspace, name='Lists')
+        saved = [{'name': 'Lists', 'tasks': []}, {'name': 'Billing', 'tasks': [{'title': 'Add invoices'}]}]
+        BootstrapJob.objects.filter(workspace=self.workspace).update(
+            step='creating_features', progress=65,
+            result={
+                'webhook_registered': True, 'features_created': 1, 'feature_ids': [str(lists.pk)],
+                'generated': saved,
+            },
+            updated_at=timezone.now() - timedelta(seconds=601),
+        )
+        release_stale_bootstraps()
+        claim_bootstrap_jobs(1)
+
+        progress = []
+        create = bootstrap.create_generated_feature
+
+        def record_progress(workspace, feature_data):
+            progress.append(self._job().progress)
+            return create(workspace, feature_data)
+
+        with mock.patch.object(bootstrap, 'create_generated_feature', side_effect=record_progress), \
+                mock.patch.object(bootstrap, 'fetch_repo_summary') as fetch, \
+                mock.patch.object(bootstrap, 'generate_features_from_repo') as generate:
+            run_bootstrap(self._job().pk)
+
+        fetch.assert_not_called()
+        generate.assert_not_called()
+        self.assertEqual(progress, [65])
+        job = self._job()
+        self.assertEqual((job.status, job.result['features_created']), (BootstrapJob.Status.DONE, 2))
+        self.assertNotIn('generated', job.result)
+        names = Feature.objects.filter(workspace=self.workspace).values_list('name', flat=True)
+        self.assertEqual(sorted(names), ['Billing', 'Lists'])
+
+    def test_stale_job_out_of_attempts_fails(self):
+        self.client.post(self.url)
+        claim_bootstrap_jobs(1)
+        BootstrapJob.objects.filter(workspace=self.workspace).update(
+            attempts=3, updated_at=timezone.now() - timedelta(seconds=601),
+        )
+
+        self.assertEqual(release_stale_bootstraps(), 0)
+        self.assertEqual(self._job().status, BootstrapJob.Status.FAILED)
+        self.assertEqual(claim_bootstrap_jobs(1), [])
+
+
+class WorkspaceCacheTests(TestCase):
+    """resolve_workspace serves repeat deliveries from memory and forgets saved or deleted workspaces."""
+
+    def setUp(self):
+        workspace_cache._cache.clear()  # rolled-back workspaces of earlier tests sent no post_delete
+        self.workspace = make_workspace(User.objects.create_user('owner'), github_repo_id=4242)
+        self.payload = {'repository': {'id': 4242, 'name': 'repo', 'owner': {'login': 'octo'}}}
+        resolve_workspace(self.payload)
+
+    def test_hit_costs_no_query_and_is_a_private_copy(self):
+        with self.assertNumQueries(0):
+            first = resolve_workspace(self.payload)
+            second = resolve_workspace(self.payload)
+
+        self.assertEqual(first.pk, self.workspace.pk)
+        self.assertIsNot(first, second)
+        first.members.append('someone')
+        self.assertNotIn('someone', resolve_workspace(self.payload).members)
+
+    def test_save_drops_the_entry(self):
+        self.workspace.github_token = 'new-token'
+        self.workspace.save()
+
+        self.assertEqual(resolve_workspace(self.payload).github_token, 'new-token')
+
+    def test_delete_drops_the_entry(self):
+        self.workspace.delete()
+
+        self.assertIsNone(resolve_workspace(self.payload))
+
+
+class ServiceMetricsTests(TestCase):
+    """Workers store their process-local counters; the endpoint labels every figure with its process."""
+
+    def setUp(self):
+        process_metrics._last_snapshot = float('-inf')
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+
+    def test_worker_snapshot_is_throttled_and_updated_in_place(self):
+        self.assertTrue(process_metrics.snapshot_metrics())
+        self.assertFalse(process_metrics.snapshot_metrics())
+
+        process_metrics._last_snapshot = float('-inf')
+        with mock.patch.object(process_metrics, 'commit_matcher_metrics', return_value={'commits_sent_to_llm': 7}):
+            self.assertTrue(process_metrics.snapshot_metrics())
+
+        row = ProcessMetrics.objects.get()
+        self.assertEqual(row.process, process_metrics.process_name('worker'))
+        self.assertEqual(row.metrics['commit_matching'], {'commits_sent_to_llm': 7})
+
+    def test_endpoint_reports_web_and_worker_figures_separately(self):
+        ProcessMetrics.objects.create(
+            process='worker@host-a:1', started_at=timezone.now(), metrics={'gemini_cache': {'hits': 3}},
+        )
+
+        response = self.client.get('/api/metrics/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['web']['process'], process_metrics.process_name('web'))
+        self.assertIn('gemini_cache', response.data['web']['metrics'])
+        self.assertEqual(
+            [(w['process'], w['metrics']) for w in response.data['workers']],
+            [('worker@host-a:1', {'gemini_cache': {'hits': 3}})],
+        )
+
+    def test_endpoint_is_staff_only(self):
+        self.client.force_authenticate(User.objects.create_user('member'))
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+
+
+class WorkerConnectionTests(SimpleTestCase):
+    """Every unit of work on a worker pool thread cleans up the thread's database connections."""
+
+    def setUp(self):
+        patcher = mock.patch.object(process_webhooks, 'close_old_connections')
+        self.close_old_connections = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.command = process_webhooks.Command()
+        self.event = WebhookEvent(delivery_id='d-1', event='push', body='{}')
+
+    def test_delivery(self):
+        for outcome in ({'return_value': {}}, {'side_effect': RuntimeError('boom')}):
+            with self.subTest(**outcome):
+                self.close_old_connections.reset_mock()
+                with mock.patch.object(process_webhooks, 'dispatch_event', **outcome), \
+                        mock.patch.object(process_webhooks, 'mark_done'), \
+                        mock.patch.object(process_webhooks, 'record_result'), \
+                        mock.patch.object(process_webhooks, 'mark_failed'), \
+                        mock.patch('traceback.print_exc'):
+                    self.command._process(self.event, 5)
+                self.assertEqual(self.close_old_connections.call_count, 2)
+
+    def test_bootstrap_job(self):
+        with mock.patch.object(process_webhooks, 'run_bootstrap', side_effect=RuntimeError('boom')), \
+                mock.patch('traceback.print_exc'):
+            self.command._bootstrap('job-1')
+        self.assertEqual(self.close_old_connections.call_count, 2)
+
+    def test_each_chore(self):
+        chores = [('one', mock.Mock()), ('two', mock.Mock(side_effect=RuntimeError('boom')))]
+        with mock.patch.object(process_webhooks, '_CHORES', chores), mock.patch('traceback.print_exc'):
+            self.command._run_chores()
+        self.assertEqual(self.close_old_connections.call_count, 4)
+
+
+@override_settings(WEBHOOK_RETRY_BACKOFF_SECONDS=5, WEBHOOK_RETRY_MAX_BACKOFF_SECONDS=600, WEBHOOK_LEASE_SECONDS=300)
+class WebhookQueueTests(TestCase):
+    """Queued deliveries are claimed one per repo in arrival order, leased, and retried with backoff."""
+
+    def setUp(self):
+        self.now = timezone.now()
+
+    def _event(self, key, age):
+        """A pending delivery for `key` that arrived `age` seconds ago; MongoDB dates are only millisecond-precise."""
+        event = WebhookEvent.objects.create(delivery_id=f'{key}-{age}', event='push', ordering_key=key, body='{}')
+        WebhookEvent.objects.filter(pk=event.pk).update(created_at=self.now - timedelta(seconds=age))
+        return event.pk
+
+    def _claim(self, limit=10, busy_keys=()):
+        return [event.pk for event in claim_due_events(limit, busy_keys=busy_keys)]
+
+    def test_one_delivery_per_key_oldest_first(self):
+        a1, a2, b1 = self._event('o/a', 30), self._event('o/a', 20), self._event('o/b', 10)
+
+        self.assertEqual(self._claim(), [a1, b1])
+        self.assertEqual(self._claim(), [])  # each key's head is still processing
+
+        mark_done(WebhookEvent.objects.get(pk=a1), {'status': 'processed'})
+        self.assertEqual(self._claim(), [a2])
+
+    def test_limit_and_busy_keys(self):
+        a1, b1, c1 = self._event('o/a', 30), self._event('o/b', 20), self._event('o/c', 10)
+
+        self.assertEqual(self._claim(limit=0), [])
+        self.assertEqual(self._claim(limit=1, busy_keys={'o/a'}), [b1])
+        self.assertEqual(self._claim(), [a1, c1])
+
+    def test_expired_lease_is_handed_back(self):
+        a1 = self._event('o/a', 30)
+        self._claim()
+        self.assertEqual(release_expired_leases(), 0)  # the lease is fresh
+
+        WebhookEvent.objects.filter(pk=a1).update(locked_at=self.now - timedelta(seconds=301))
+        self.assertEqual(release_expired_leases(), 1)
+        self.assertEqual(self._claim(), [a1])
+
+    def test_failure_backs_off_and_holds_back_its_key(self):
+        a1, a2, b1 = self._event('o/a', 30), self._event('o/a', 20), self._event('o/b', 10)
+        self._claim()
+        mark_done(WebhookEvent.objects.get(pk=b1), {})
+
+        for attempt, delay in [(1, 5), (2, 10)]:
+            event = WebhookEvent.objects.get(pk=a1)
+            before = timezone.now()
+            mark_failed(event, 'boom', max_attempts=3)
+
+            event.refresh_from_db()
+            self.assertEqual((event.status, event.attempts, event.last_error), ('pending', attempt, 'boom'))
+            self.assertIsNone(event.locked_at)
+            self.assertAlmostEqual((event.next_attempt_at - before).total_seconds(), delay, delta=1)
+            self.assertEqual(self._claim(), [])  # a2 waits behind its backing-off head
+
+            WebhookEvent.objects.filter(pk=a1).update(next_attempt_at=self.now)
+            self.assertEqual(self._claim(), [a1])
+
+        mark_failed(WebhookEvent.objects.get(pk=a1), 'boom', max_attempts=3)
+        self.assertEqual(WebhookEvent.objects.get(pk=a1).status, WebhookEvent.Status.FAILED)
+        self.assertEqual(self._claim(), [a2])
+
+    @override_settings(WEBHOOK_RETRY_MAX_BACKOFF_SECONDS=8)
+    def test_backoff_is_capped(self):
+        a1 = self._event('o/a', 30)
+        WebhookEvent.objects.filter(pk=a1).update(attempts=5)
+        before = timezone.now()
+
+        mark_failed(WebhookEvent.objects.get(pk=a1), 'boom', max_attempts=10)
+
+        next_attempt_at = WebhookEvent.objects.get(pk=a1).next_attempt_at
+        self.assertAlmostEqual((next_attempt_at - before).total_seconds(), 8, delta=1)
+
+
+@override_settings(GITHUB_WEBHOOK_SECRET='secret', WEBHOOK_DELIVERY_CLAIM_TIMEOUT_SECONDS=600)
+class DeliveryLedgerTests(TestCase):
+    """Redeliveries replay the stored result; a delivery that failed is forgotten so GitHub can retry it."""
+
+    def setUp(self):
+        self.client = APIClient(raise_request_exception=False)
+        self.body = json.dumps({'repository': {'name': 'repo', 'owner': {'login': 'octo'}}})
+
+    def _deliver(self, delivery_id='d-1'):
+        signature = 'sha256=' + hmac.new(b'secret', self.body.encode(), hashlib.sha256).hexdigest()
+        return self.client.post(
+            '/api/webhooks/github/', self.body, content_type='application/json',
+            HTTP_X_GITHUB_EVENT='push', HTTP_X_GITHUB_DELIVERY=delivery_id, HTTP_X_HUB_SIGNATURE_256=signature,
+        )
+
+    def test_claim_and_replay(self):
+        self.assertEqual(claim_delivery('d-1', 'push'), (True, None))
+        self.assertEqual(claim_delivery('d-1', 'push'), (False, IN_PROGRESS))
+
+        record_result('d-1', {'status': 'processed', 'tasks_completed': 2})
+        self.assertEqual(claim_delivery('d-1', 'push'), (False, {'status': 'processed', 'tasks_completed': 2}))
+
+    def test_abandoned_claim_is_taken_over_once(self):
+        claim_delivery('d-1', 'push')
+        WebhookDelivery.objects.filter(delivery_id='d-1').update(
+            updated_at=timezone.now() - timedelta(seconds=601),
+        )
+
+        self.assertEqual(claim_delivery('d-1', 'push'), (True, None))
+        self.assertEqual(claim_delivery('d-1', 'push'), (False, IN_PROGRESS))
+
+    def test_duplicate_delivery_is_not_processed_again(self):
+        with mock.patch('HackAPI.views.webhooks.dispatch_event', return_value={'status': 'processed'}) as dispatch:
+            first = self._deliver()
+            second = self._deliver()
+
+        self.assertEqual(first.data, {'status': 'processed'})
+        self.assertEqual(second.data, {'status': 'processed', 'duplicate': True})
+        dispatch.assert_called_once()
+
+    def test_failed_delivery_is_forgotten(self):
+        with mock.patch('HackAPI.views.webhooks.dispatch_event', side_effect=RuntimeError('boom')):
+            self.assertEqual(self._deliver().status_code, 500)
+        self.assertFalse(WebhookDelivery.objects.filter(delivery_id='d-1').exists())
+
+        with mock.patch('HackAPI.views.webhooks.dispatch_event', return_value={'status': 'processed'}):
+            self.assertEqual(self._deliver().data, {'status': 'processed'})
+
+    @override_settings(GITHUB_WEBHOOK_ASYNC=True)
+    def test_worker_forgets_a_delivery_only_once_it_gives_up(self):
+        self.assertEqual(self._deliver().status_code, 202)
+        event = WebhookEvent.objects.get(delivery_id='d-1')
+        command = process_webhooks.Command()
+
+        with mock.patch.object(process_webhooks, 'close_old_connections'), \
+                mock.patch.object(process_webhooks, 'dispatch_event', side_effect=RuntimeError('boom')), \
+                mock.patch('traceback.print_exc'):
+            command._process(event, 2)
+            self.assertTrue(WebhookDelivery.objects.filter(delivery_id='d-1').exists())  # will be retried
+
+            command._process(event, 2)
+            self.assertEqual(event.status, WebhookEvent.Status.FAILED)
+            self.assertFalse(WebhookDelivery.objects.filter(delivery_id='d-1').exists())
+
+        self.assertEqual(self._deliver().status_code, 202)  # GitHub's manual redelivery is accepted
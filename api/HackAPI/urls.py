@@ -8,6 +8,7 @@ from .views import (
     github_oauth_url,
     github_oauth_callback,
     github_webhook,
+    service_metrics,
 )
 
 router = DefaultRouter()
@@ -20,4 +21,5 @@ urlpatterns = [
     path('auth/github/', github_oauth_url, name='github-oauth-url'),
     path('auth/github/callback/', github_oauth_callback, name='github-oauth-callback'),
     path('webhooks/github/', github_webhook, name='github-webhook'),
+    path('metrics/', service_metrics, name='service-metrics'),
 ]
@@ -1,4 +1,5 @@
 from .auth import desktop_auth_callback, github_oauth_callback, github_oauth_url
+from .metrics import service_metrics
 from .tasks import FeatureViewSet, TaskViewSet
 from .workspaces import WorkspaceViewSet
 from .webhooks import github_webhook
@@ -11,4 +12,5 @@ __all__ = [
     'TaskViewSet',
     'WorkspaceViewSet',
     'github_webhook',
+    'service_metrics',
 ]
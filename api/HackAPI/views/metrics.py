@@ -0,0 +1,21 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from ..services.process_metrics import local_metrics, process_name, stored_metrics
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def service_metrics(request):
+    """Health and budget counters for the external services, per process (staff only).
+
+    Counters are process-local. `web` is the process serving this request; `workers`
+    are the snapshots written by each `manage.py process_webhooks` worker, where
+    webhook deliveries, commit analysis and bootstrap jobs (most Gemini and cache
+    traffic) run. Each snapshot is at most METRICS_SNAPSHOT_SECONDS old.
+    """
+    return Response({
+        'web': {'process': process_name('web'), 'metrics': local_metrics()},
+        'workers': stored_metrics(),
+    })
@@ -0,0 +1,37 @@
+from rest_framework.permissions import SAFE_METHODS
+
+from ..pagination import KeysetPagination
+
+
+class ProjectedListMixin:
+    """Keyset pagination plus a `?fields=a,b,c` projection for read endpoints.
+
+    The projection limits both the MongoDB projection (QuerySet.only) and the
+    serializer output. It is ignored on writes so validation always sees every field.
+    """
+
+    pagination_class = KeysetPagination
+    fields_query_param = 'fields'
+
+    def get_requested_fields(self):
+        if self.request is None or self.request.method not in SAFE_METHODS:
+            return None
+        raw = self.request.query_params.get(self.fields_query_param, '')
+        requested = {name.strip() for name in raw.split(',') if name.strip()}
+        return requested | {'id'} if requested else None
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        requested = self.get_requested_fields()
+        if requested:
+            context['fields'] = requested
+        return context
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        requested = self.get_requested_fields()
+        if requested:
+            model_fields = {f.name for f in queryset.model._meta.concrete_fields}
+            # created_at is the pagination key, so it is always loaded
+            queryset = queryset.only(*((requested & model_fields) | {'created_at'}))
+        return queryset
@@ -5,20 +5,24 @@ from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from .mixins import ProjectedListMixin
 from ..models import Feature, Task, Workspace
 from ..serializers import FeatureSerializer, TaskSerializer
 from ..services.github import create_github_issue, update_issue_body
+from ..services.issue_sync import mark_feature_dirty
 
 
-class FeatureViewSet(viewsets.ModelViewSet):
+def _member_workspace_ids(user):
+    """Lazy subquery of the ids of workspaces `user` belongs to (evaluated by MongoDB, not Python)."""
+    return Workspace.objects.filter(members=user.id).values('pk')
+
+
+class FeatureViewSet(ProjectedListMixin, viewsets.ModelViewSet):
     serializer_class = FeatureSerializer
 
     def get_queryset(self):
         try:
-            workspaces = Workspace.objects.filter(members=self.request.user.id)
-            workspace_ids = [w.pk for w in workspaces]
-            print(f'[DEBUG] user={self.request.user.id} workspace_ids={workspace_ids}')
-            qs = Feature.objects.filter(workspace_id__in=workspace_ids)
+            qs = Feature.objects.filter(workspace_id__in=_member_workspace_ids(self.request.user))
             workspace_id = self.request.query_params.get('workspace')
             if workspace_id:
                 qs = qs.filter(workspace_id=ObjectId(workspace_id))
@@ -41,44 +45,34 @@ class FeatureViewSet(viewsets.ModelViewSet):
     def sync_to_github(self, request, pk=None):
         """Force-push current tasks as checkboxes to GitHub."""
         feature = self.get_object()
-        result = update_issue_body(feature.workspace, feature)
+        result = update_issue_body(feature.workspace, feature, force=True)
         if result is None:
             return Response({'status': 'failed'}, status=400)
         return Response({'status': 'synced'})
 
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(ProjectedListMixin, viewsets.ModelViewSet):
     serializer_class = TaskSerializer
 
     def get_queryset(self):
         try:
-            workspaces = Workspace.objects.filter(members=self.request.user.id)
-            workspace_ids = [w.pk for w in workspaces]
-            features = Feature.objects.filter(workspace_id__in=workspace_ids)
-            feature_ids = [f.pk for f in features]
-            qs = Task.objects.filter(feature_id__in=feature_ids)
+            qs = Task.objects.filter(workspace_id__in=_member_workspace_ids(self.request.user))
             feature_id = self.request.query_params.get('feature')
             if feature_id:
                 qs = qs.filter(feature_id=ObjectId(feature_id))
             workspace_id = self.request.query_params.get('workspace')
             if workspace_id:
-                ws_features = Feature.objects.filter(workspace_id=ObjectId(workspace_id))
-                ws_feature_ids = [f.pk for f in ws_features]
-                qs = qs.filter(feature_id__in=ws_feature_ids)
+                qs = qs.filter(workspace_id=ObjectId(workspace_id))
             return qs
         except Exception:
             print('[ERROR] TaskViewSet.get_queryset failed')
             traceback.print_exc()
             raise
 
-    def _sync_feature_to_github(self, task):
-        """Sync the parent feature's checkboxes to GitHub after task changes."""
-        if task.feature and task.feature.github_number:
-            try:
-                update_issue_body(task.feature.workspace, task.feature)
-            except Exception:
-                print(f'[ERROR] Failed to sync feature {task.feature.id} to GitHub')
-                traceback.print_exc()
+    def _sync_feature_to_github(self, feature):
+        """Queue a coalesced sync of the feature's checkboxes to GitHub after task changes."""
+        if feature and feature.github_number:
+            mark_feature_dirty(feature.pk)
 
     def perform_create(self, serializer):
         task = serializer.save()
@@ -89,18 +83,16 @@ class TaskViewSet(viewsets.ModelViewSet):
             ).order_by('-checkbox_index').values_list('checkbox_index', flat=True).first()
             task.checkbox_index = max_idx + 1 if max_idx is not None else 0
             task.save(update_fields=['checkbox_index'])
-        self._sync_feature_to_github(task)
+        self._sync_feature_to_github(task.feature)
 
     def perform_update(self, serializer):
+        previous_feature = serializer.instance.feature
         task = serializer.save()
-        self._sync_feature_to_github(task)
+        self._sync_feature_to_github(task.feature)
+        if previous_feature and previous_feature.pk != task.feature_id:
+            self._sync_feature_to_github(previous_feature)
 
     def perform_destroy(self, instance):
         feature = instance.feature
         instance.delete()
-        if feature and feature.github_number:
-            try:
-                update_issue_body(feature.workspace, feature)
-            except Exception:
-                print(f'[ERROR] Failed to sync feature {feature.id} to GitHub')
-                traceback.print_exc()
+        self._sync_feature_to_github(feature)
@@ -1,16 +1,26 @@
 import hashlib
 import hmac
+import time
+from collections import defaultdict
 from datetime import datetime, timezone
 
 from django.conf import settings
+from django.db import connections
+from pymongo.errors import BulkWriteError
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 
-from ..services.gemini import analyze_commits
-from ..services.github import parse_checkboxes_from_body, sync_tasks_from_checkboxes
+from ..services.commit_batcher import mark_tasks_done, submit_commit_analysis
+from ..services.commit_matcher import match_commits
+from ..services.github import (
+    body_fingerprint, parse_checkboxes_from_body, sync_tasks_from_checkbox_edit, sync_tasks_from_checkboxes,
+)
+from ..services.delivery_ledger import claim_delivery, forget_delivery, record_result
+from ..services.webhook_queue import enqueue_delivery
+from ..services.workspace_cache import resolve_workspace
 from ..models import (
-    Feature, Task, Workspace,
+    Feature, Task,
     Commit, GitHubLabel, GitHubMilestone,
     PullRequest, PRReview, PRComment,
 )
@@ -29,17 +39,6 @@ def verify_github_signature(request):
     return hmac.compare_digest(signature, expected)
 
 
-def _get_workspace(payload):
-    """Return the Workspace for this payload's repo, or None."""
-    repo = payload.get('repository', {})
-    owner = repo.get('owner', {}).get('login', '')
-    name = repo.get('name', '')
-    try:
-        return Workspace.objects.get(github_repo_owner=owner, github_repo_name=name)
-    except Workspace.DoesNotExist:
-        return None
-
-
 def _parse_dt(value):
     """Parse an ISO 8601 datetime string to a timezone-aware datetime, or return None."""
     if not value:
@@ -52,64 +51,135 @@ def _parse_dt(value):
 
 # ── sub-handlers ──────────────────────────────────────────────────────────────
 
-def handle_push(payload, workspace):
-    commits = payload.get('commits', [])
-    commit_messages = [c.get('message', '') for c in commits]
-    branch = payload.get('ref', '').replace('refs/heads/', '')
+def _insert_new_commits(workspace, commits, branch):
+    """Store the push's commits in bulk. Returns (stored, skipped) counts.
 
-    commits_stored = 0
+    One `$in` query finds shas already stored, then the rest go out in a single
+    unordered insert_many. Duplicate-key errors (a concurrent delivery of the same
+    commits) are tolerated and counted as skipped.
+    """
+    by_sha = {}
     for c in commits:
-        sha = c.get('id', '')
-        if not sha:
-            continue
-        author = c.get('author', {})
-        _, created = Commit.objects.get_or_create(
+        if c.get('id'):
+            by_sha.setdefault(c['id'], c)
+    if not by_sha:
+        return 0, 0
+
+    existing = set(Commit.objects.filter(sha__in=list(by_sha)).values_list('sha', flat=True))
+    new_commits = [
+        Commit(
+            workspace=workspace,
             sha=sha,
-            defaults={
-                'workspace': workspace,
-                'message': c.get('message', ''),
-                'author_login': author.get('username', ''),
-                'author_name': author.get('name', ''),
-                'author_email': author.get('email', ''),
-                'url': c.get('url', ''),
-                'branch': branch,
-                'added_files': c.get('added', []),
-                'modified_files': c.get('modified', []),
-                'removed_files': c.get('removed', []),
-                'github_timestamp': _parse_dt(c.get('timestamp')),
-            },
+            message=c.get('message', ''),
+            author_login=c.get('author', {}).get('username', ''),
+            author_name=c.get('author', {}).get('name', ''),
+            author_email=c.get('author', {}).get('email', ''),
+            url=c.get('url', ''),
+            branch=branch,
+            added_files=c.get('added', []),
+            modified_files=c.get('modified', []),
+            removed_files=c.get('removed', []),
+            github_timestamp=_parse_dt(c.get('timestamp')),
         )
-        if created:
-            commits_stored += 1
+        for sha, c in by_sha.items() if sha not in existing
+    ]
+    if not new_commits:
+        return 0, len(existing)
+
+    connection = connections[Commit.objects.db]
+    fields = [f for f in Commit._meta.concrete_fields if not f.primary_key]
+    docs = [
+        {f.column: f.get_db_prep_save(f.pre_save(commit, True), connection=connection) for f in fields}
+        for commit in new_commits
+    ]
+    try:
+        stored = len(connection.get_collection(Commit._meta.db_table).insert_many(docs, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        if any(err.get('code') != 11000 for err in e.details.get('writeErrors', [])):
+            raise
+        stored = e.details.get('nInserted', 0)
 
-    if not commit_messages:
-        return {'commits_stored': commits_stored, 'completed_tasks': []}
+    return stored, len(by_sha) - stored
 
-    open_tasks = list(
-        Task.objects.filter(feature__workspace=workspace)
-        .exclude(status=Task.Status.DONE)
-        .values_list('title', flat=True)
-    )
 
-    if not open_tasks:
-        return {'commits_stored': commits_stored, 'completed_tasks': []}
+def _complete_matched(matches):
+    """Mark the tasks found by match_commits done, one update per completing sha.
 
-    completed_titles = analyze_commits(commit_messages, open_tasks)
+    Returns (titles, number of tasks changed).
+    """
+    ids_by_sha = defaultdict(list)
+    for pk, (_, sha) in matches.items():
+        ids_by_sha[sha].append(pk)
+    changed = sum(mark_tasks_done(sha, pk__in=ids) for sha, ids in ids_by_sha.items())
+    return list(dict.fromkeys(title for title, _ in matches.values())), changed
+
+
+def handle_push(payload, workspace):
+    commits = payload.get('commits', [])
+    branch = payload.get('ref', '').replace('refs/heads/', '')
+
+    started = time.perf_counter()
+    commits_stored, commits_skipped = _insert_new_commits(workspace, commits, branch)
+    ingest_ms = round((time.perf_counter() - started) * 1000, 1)
+    stats = {'commits_stored': commits_stored, 'commits_skipped': commits_skipped, 'commit_ingest_ms': ingest_ms}
+
+    if not commits:
+        return {**stats, 'completed_tasks': [], 'tasks_completed': 0}
+
+    # Commits that name their task ("fixes #42", an exact title) don't need Gemini
+    matches, matched_shas = match_commits(workspace, [(c.get('message', ''), c.get('id', '')[:12]) for c in commits])
+    titles, changed = _complete_matched(matches) if matches else ([], 0)
+    unmatched = [c for c in commits if c.get('id', '')[:12] not in matched_shas]
+    if not unmatched:
+        return {**stats, 'completed_tasks': titles, 'tasks_completed': changed, 'completion_analysis': 'deterministic'}
+
+    # Only the remaining commits go to Gemini, queued and analyzed with other pushes to
+    # this workspace unless batching is disabled
+    changed_files = {path for c in unmatched for path in [*c.get('added', []), *c.get('modified', [])]}
+    completion = submit_commit_analysis(
+        workspace.pk, [c.get('message', '') for c in unmatched], unmatched[0].get('id', '')[:12], sorted(changed_files),
+    )
+    if completion is None:
+        return {**stats, 'completed_tasks': titles, 'tasks_completed': changed, 'completion_analysis': 'queued'}
+    return {
+        **stats,
+        'completed_tasks': list(dict.fromkeys([*titles, *completion['completed_tasks']])),
+        'tasks_completed': changed + completion['tasks_completed'],
+    }
 
-    marked = []
-    first_sha = commits[0].get('id', '')[:12] if commits else ''
-    for title in completed_titles:
-        updated = (
-            Task.objects.filter(
-                feature__workspace=workspace,
-                title=title,
-                status__in=[Task.Status.TODO, Task.Status.IN_PROGRESS],
-            ).update(status=Task.Status.DONE, completed_by_commit=first_sha)
-        )
-        if updated:
-            marked.append(title)
 
-    return {'commits_stored': commits_stored, 'completed_tasks': marked}
+def _previous_body(payload, body):
+    """The body before an `edited` event; GitHub omits changes.body when only the title changed."""
+    changes = (payload.get('changes') or {}).get('body')
+    if changes is None:
+        return body
+    return changes.get('from') or ''
+
+
+def _sync_edited_body(feature, body, previous_body=None):
+    """Apply an edited issue/PR body to its Feature and tasks, then save the feature.
+
+    A body whose fingerprint matches the last one pushed or received is our own
+    update_issue_body PATCH echoing back (or a title-only edit), so its checkboxes
+    are not re-parsed. When the previous body is the one the tasks were last synced
+    from, only the checkbox lines that changed are applied; otherwise every
+    checkbox is reconciled.
+    """
+    fingerprint = body_fingerprint(body)
+    if fingerprint == feature.github_body_hash:
+        feature.save(update_fields=['name'])
+        return
+    in_step = previous_body is not None and body_fingerprint(previous_body) == feature.github_body_hash
+    feature.description = body
+    feature.github_body_hash = fingerprint
+    feature.save(update_fields=['name', 'description', 'github_body_hash'])
+
+    checkboxes = parse_checkboxes_from_body(body)
+    if in_step and sync_tasks_from_checkbox_edit(
+        feature, parse_checkboxes_from_body(previous_body), checkboxes,
+    ) is not None:
+        return
+    sync_tasks_from_checkboxes(feature, checkboxes)
 
 
 def handle_pull_request(payload, workspace):
@@ -185,6 +255,7 @@ def handle_pull_request(payload, workspace):
     )
 
     # Create/sync Feature for this PR
+    completion = {}
     pr_body = pr_data.get('body', '') or ''
     feature_state = Feature.State.CLOSED if state in ('closed', 'merged') else Feature.State.OPEN
 
@@ -195,6 +266,7 @@ def handle_pull_request(payload, workspace):
             defaults={
                 'name': pr_data.get('title', ''),
                 'description': pr_body,
+                'github_body_hash': body_fingerprint(pr_body),
                 'type': Feature.Type.PULL_REQUEST,
                 'github_number': pr_number,
                 'html_url': pr_data.get('html_url', ''),
@@ -208,13 +280,11 @@ def handle_pull_request(payload, workspace):
     elif action == 'edited':
         try:
             feature = Feature.objects.get(workspace=workspace, github_id=github_id)
-            feature.name = pr_data.get('title', feature.name)
-            feature.description = pr_body
-            feature.save(update_fields=['name', 'description'])
-            checkboxes = parse_checkboxes_from_body(pr_body)
-            sync_tasks_from_checkboxes(feature, checkboxes)
         except Feature.DoesNotExist:
             pass
+        else:
+            feature.name = pr_data.get('title', feature.name)
+            _sync_edited_body(feature, pr_body, _previous_body(payload, pr_body))
 
     elif action == 'closed':
         Feature.objects.filter(workspace=workspace, github_id=github_id).update(state=Feature.State.CLOSED)
@@ -222,24 +292,23 @@ def handle_pull_request(payload, workspace):
         # On merge, auto-complete linked tasks via Gemini
         if pr_data.get('merged'):
             pr_context = [f"{pr.title}\n{pr.body}"]
-            open_tasks = list(
-                Task.objects.filter(feature__workspace=workspace)
-                .exclude(status=Task.Status.DONE)
-                .values_list('title', flat=True)
-            )
-            if open_tasks:
-                completed_titles = analyze_commits(pr_context, open_tasks)
-                for title in completed_titles:
-                    Task.objects.filter(
-                        feature__workspace=workspace,
-                        title=title,
-                        status__in=[Task.Status.TODO, Task.Status.IN_PROGRESS],
-                    ).update(status=Task.Status.DONE, completed_by_commit=pr.head_sha[:12])
+            head_sha = pr.head_sha[:12]
+            completion = {'completed_tasks': [], 'tasks_completed': 0}
+            matches, _ = match_commits(workspace, [(pr_context[0], head_sha)])
+            if matches:
+                completion['completed_tasks'], completion['tasks_completed'] = _complete_matched(matches)
+                completion['completion_analysis'] = 'deterministic'
+            else:
+                analyzed = submit_commit_analysis(workspace.pk, pr_context, head_sha)
+                if analyzed is None:
+                    completion['completion_analysis'] = 'queued'
+                else:
+                    completion.update(analyzed)
 
     elif action == 'reopened':
         Feature.objects.filter(workspace=workspace, github_id=github_id).update(state=Feature.State.OPEN)
 
-    return {'pr_number': pr.number, 'action': action, 'state': state}
+    return {'pr_number': pr.number, 'action': action, 'state': state, **completion}
 
 
 def handle_pull_request_review(payload, workspace):
@@ -375,6 +444,7 @@ def handle_issues(payload, workspace):
             defaults={
                 'name': issue.get('title', ''),
                 'description': issue.get('body', '') or '',
+                'github_body_hash': body_fingerprint(issue.get('body', '')),
                 'type': Feature.Type.ISSUE,
                 'github_number': issue_number,
                 'html_url': issue.get('html_url', ''),
@@ -392,20 +462,18 @@ def handle_issues(payload, workspace):
         except Feature.DoesNotExist:
             return {'issue_number': issue_number, 'action': action, 'status': 'feature_not_found'}
         feature.name = issue.get('title', feature.name)
-        feature.description = issue.get('body', '') or ''
-        feature.save(update_fields=['name', 'description'])
-        checkboxes = parse_checkboxes_from_body(issue.get('body', ''))
-        sync_tasks_from_checkboxes(feature, checkboxes)
+        body = issue.get('body', '') or ''
+        _sync_edited_body(feature, body, _previous_body(payload, body))
 
     elif action == 'closed':
-        Feature.objects.filter(
+        issue_features = Feature.objects.filter(
             workspace=workspace, github_number=issue_number, type=Feature.Type.ISSUE,
-        ).update(state=Feature.State.CLOSED)
+        )
+        feature_ids = list(issue_features.values_list('pk', flat=True))
+        issue_features.update(state=Feature.State.CLOSED)
         # Also mark all tasks as done
         Task.objects.filter(
-            feature__workspace=workspace,
-            feature__github_number=issue_number,
-            feature__type=Feature.Type.ISSUE,
+            workspace=workspace, feature_id__in=feature_ids,
         ).exclude(status=Task.Status.DONE).update(status=Task.Status.DONE)
 
     elif action == 'reopened':
@@ -467,38 +535,77 @@ def handle_milestone(payload, workspace):
     return {'milestone_id': ms_data.get('id'), 'action': action}
 
 
+# ── dispatch ──────────────────────────────────────────────────────────────────
+
+HANDLERS = {
+    'push': handle_push,
+    'pull_request': handle_pull_request,
+    'pull_request_review': handle_pull_request_review,
+    'pull_request_review_comment': handle_pull_request_review_comment,
+    'issue_comment': handle_issue_comment,
+    'issues': handle_issues,
+    'create': handle_create,
+    'delete': handle_delete,
+    'label': handle_label,
+    'milestone': handle_milestone,
+}
+
+
+def dispatch_event(event, payload):
+    """Route a verified delivery to its handler. Shared by the endpoint and the queue worker."""
+    workspace = resolve_workspace(payload)
+    if workspace is None:
+        return {'status': 'no matching workspace'}
+
+    handler = HANDLERS.get(event)
+    if handler is None:
+        return {'status': 'ignored'}
+
+    result = handler(payload, workspace)
+    return {'status': 'processed', **result}
+
+
 # ── main endpoint ─────────────────────────────────────────────────────────────
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def github_webhook(request):
-    """Handle GitHub webhook events — dispatch to per-event handlers."""
+    """Handle GitHub webhook events — dispatch to per-event handlers.
+
+    With GITHUB_WEBHOOK_ASYNC enabled the delivery is queued and acknowledged with
+    202 straight away; `manage.py process_webhooks` runs the handlers. Deliveries are
+    deduplicated on X-GitHub-Delivery.
+    """
     if not verify_github_signature(request):
         return Response({'error': 'Invalid signature'}, status=403)
 
     event = request.META.get('HTTP_X_GITHUB_EVENT', '')
     payload = request.data
 
-    workspace = _get_workspace(payload)
-    if workspace is None:
-        return Response({'status': 'no matching workspace'})
-
-    handlers = {
-        'push': handle_push,
-        'pull_request': handle_pull_request,
-        'pull_request_review': handle_pull_request_review,
-        'pull_request_review_comment': handle_pull_request_review_comment,
-        'issue_comment': handle_issue_comment,
-        'issues': handle_issues,
-        'create': handle_create,
-        'delete': handle_delete,
-        'label': handle_label,
-        'milestone': handle_milestone,
-    }
-
-    handler = handlers.get(event)
-    if handler is None:
+    if event not in HANDLERS:
         return Response({'status': 'ignored'})
 
-    result = handler(payload, workspace)
-    return Response({'status': 'processed', **result})
+    # Redeliveries replay the stored result without touching the ORM or Gemini
+    delivery_id = request.META.get('HTTP_X_GITHUB_DELIVERY', '')
+    if delivery_id:
+        is_new, stored = claim_delivery(delivery_id, event)
+        if not is_new:
+            return Response({**stored, 'duplicate': True})
+
+    if settings.GITHUB_WEBHOOK_ASYNC:
+        try:
+            enqueue_delivery(request, event, payload)
+        except Exception:
+            forget_delivery(delivery_id)
+            raise
+        result = {'status': 'queued', 'delivery': delivery_id}
+        record_result(delivery_id, result)
+        return Response(result, status=202)
+
+    try:
+        result = dispatch_event(event, payload)
+    except Exception:
+        forget_delivery(delivery_id)
+        raise
+    record_result(delivery_id, result)
+    return Response(result)
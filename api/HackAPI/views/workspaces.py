@@ -1,87 +1,57 @@
 import traceback
 
-from django.conf import settings
+from django.http import StreamingHttpResponse
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
-from ..models import Feature, Task, Workspace
-from ..serializers import FeatureSerializer, TaskSerializer, WorkspaceSerializer
-from ..services.gemini import generate_features_and_tasks, generate_features_from_repo
-from ..services.github import create_github_issue, fetch_repo_summary, register_webhook, unregister_webhook
+from .mixins import ProjectedListMixin
+from ..models import Workspace
+from ..serializers import BootstrapJobSerializer, FeatureSerializer, TaskSerializer, WorkspaceSerializer
+from ..services.bootstrap import create_generated_feature, register_workspace_webhook, start_bootstrap
+from ..services.gemini import generate_features_and_tasks, stream_features_and_tasks
+from ..services.github import unregister_webhook
 
 
-class WorkspaceViewSet(viewsets.ModelViewSet):
+class WorkspaceViewSet(ProjectedListMixin, viewsets.ModelViewSet):
     serializer_class = WorkspaceSerializer
 
     def get_queryset(self):
         return Workspace.objects.filter(members=self.request.user.id)
 
-    def _register_webhook(self, workspace):
-        try:
-            register_webhook(
-                workspace,
-                webhook_url=settings.GITHUB_WEBHOOK_URL,
-                secret=settings.GITHUB_WEBHOOK_SECRET,
-            )
-        except Exception:
-            print(f'[WARNING] Failed to register webhook for workspace {workspace.id}')
-            traceback.print_exc()
-
-    def _generate_from_repo(self, workspace):
-        try:
-            summary = fetch_repo_summary(workspace)
-            if not summary:
-                print(f'[INFO] Empty repo summary for workspace {workspace.id}, skipping AI generation')
-                return
-
-            raw = generate_features_from_repo(summary)
-            if not raw:
-                print(f'[INFO] Gemini returned no features for workspace {workspace.id}')
-                return
-
-            for feature_data in raw:
-                feature = Feature.objects.create(
-                    workspace=workspace,
-                    name=feature_data.get('name', 'Untitled Feature'),
-                    description=feature_data.get('description', ''),
-                )
-                for i, task_data in enumerate(feature_data.get('tasks', [])):
-                    priority = task_data.get('priority', 'medium')
-                    if priority not in ('low', 'medium', 'high'):
-                        priority = 'medium'
-                    Task.objects.create(
-                        feature=feature,
-                        title=task_data.get('title', 'Untitled Task'),
-                        description=task_data.get('description', ''),
-                        priority=priority,
-                        checkbox_index=i,
-                    )
-                try:
-                    create_github_issue(workspace, feature)
-                except Exception:
-                    print(f'[WARNING] Failed to create GitHub issue for auto-generated feature {feature.id}')
-                    traceback.print_exc()
-        except Exception:
-            print(f'[WARNING] Auto-generation from repo failed for workspace {workspace.id} — workspace creation continues')
-            traceback.print_exc()
+    def _generated_feature_data(self, feature, tasks):
+        feature_out = FeatureSerializer(feature).data
+        feature_out['tasks'] = TaskSerializer(tasks, many=True).data
+        return feature_out
 
     def perform_create(self, serializer):
         workspace = serializer.save(created_by=self.request.user)
         if self.request.user.id not in workspace.members:
             workspace.members.append(self.request.user.id)
         workspace.save()
+        self.bootstrap_job = None
         if workspace.github_repo_owner and workspace.github_repo_name:
-            self._register_webhook(workspace)
-            self._generate_from_repo(workspace)
+            # Webhook registration and AI generation run in the worker; poll bootstrap/
+            self.bootstrap_job, _ = start_bootstrap(workspace)
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        if self.bootstrap_job is not None:
+            response.data['bootstrap_job'] = BootstrapJobSerializer(self.bootstrap_job).data
+        return response
 
     def perform_update(self, serializer):
         old = self.get_object()
         old_repo = (old.github_repo_owner, old.github_repo_name)
         workspace = serializer.save()
         new_repo = (workspace.github_repo_owner, workspace.github_repo_name)
+        if new_repo != old_repo and workspace.github_repo_id is not None:
+            # Pointed at a different repo; the next delivery records the new id
+            workspace.github_repo_id = None
+            workspace.save(update_fields=['github_repo_id'])
         if new_repo != old_repo and workspace.github_repo_owner and workspace.github_repo_name:
-            self._register_webhook(workspace)
+            register_workspace_webhook(workspace)
 
     def perform_destroy(self, instance):
         try:
@@ -107,6 +77,27 @@ class WorkspaceViewSet(viewsets.ModelViewSet):
             workspace.save()
         return Response({'status': 'left'})
 
+    @action(detail=True, methods=['get', 'post'])
+    def bootstrap(self, request, pk=None):
+        """GET: status of the workspace's most recent bootstrap job. POST: queue a new one.
+
+        POST answers 409 with the existing job while one is pending or running.
+        """
+        workspace = self.get_object()
+        if request.method == 'POST':
+            if not (workspace.github_repo_owner and workspace.github_repo_name):
+                return Response({'error': 'workspace has no GitHub repository'}, status=status.HTTP_400_BAD_REQUEST)
+            job, created = start_bootstrap(workspace)
+            return Response(
+                BootstrapJobSerializer(job).data,
+                status=status.HTTP_202_ACCEPTED if created else status.HTTP_409_CONFLICT,
+            )
+
+        job = workspace.bootstrap_jobs.order_by('-created_at').first()
+        if job is None:
+            return Response({'error': 'no bootstrap job for this workspace'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(BootstrapJobSerializer(job).data)
+
     @action(detail=True, methods=['post'])
     def generate(self, request, pk=None):
         """Generate features and tasks from a text description using Gemini.
@@ -129,34 +120,51 @@ class WorkspaceViewSet(viewsets.ModelViewSet):
 
         created_features = []
         for feature_data in raw:
-            feature = Feature.objects.create(
-                workspace=workspace,
-                name=feature_data.get('name', 'Untitled Feature'),
-                description=feature_data.get('description', ''),
-            )
+            feature, tasks = create_generated_feature(workspace, feature_data)
+            created_features.append(self._generated_feature_data(feature, tasks))
+
+        return Response(created_features, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'])
+    def generate_stream(self, request, pk=None):
+        """Streaming variant of `generate`, as server-sent events.
+
+        Request body: {"description": "..."}
+        Emits a `feature` event (the created feature with its tasks) as soon as each
+        one is generated and persisted, then `done` with the count once the whole
+        plan is in. If generation fails, or produces nothing, the stream ends with
+        `error` instead, carrying the count of features created before the failure.
+        """
+        description = request.data.get('description', '').strip()
+        if not description:
+            return Response({'error': 'description is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        workspace = self.get_object()
+        renderer = JSONRenderer()
 
-            tasks = []
-            for i, task_data in enumerate(feature_data.get('tasks', [])):
-                priority = task_data.get('priority', 'medium')
-                if priority not in ('low', 'medium', 'high'):
-                    priority = 'medium'
-                task = Task.objects.create(
-                    feature=feature,
-                    title=task_data.get('title', 'Untitled Task'),
-                    description=task_data.get('description', ''),
-                    priority=priority,
-                    checkbox_index=i,
-                )
-                tasks.append(task)
+        def sse(event, data):
+            return b'event: ' + event.encode() + b'\ndata: ' + renderer.render(data) + b'\n\n'
 
+        def events():
+            created = 0
             try:
-                create_github_issue(workspace, feature)
+                for feature_data in stream_features_and_tasks(description):
+                    feature, tasks = create_generated_feature(workspace, feature_data)
+                    created += 1
+                    yield sse('feature', self._generated_feature_data(feature, tasks))
             except Exception:
-                print(f'[ERROR] Failed to create GitHub issue for generated feature {feature.id}')
+                print(f'[ERROR] Streaming generation failed for workspace {workspace.id}')
                 traceback.print_exc()
-
-            feature_out = FeatureSerializer(feature).data
-            feature_out['tasks'] = TaskSerializer(tasks, many=True).data
-            created_features.append(feature_out)
-
-        return Response(created_features, status=status.HTTP_201_CREATED)
+                yield sse('error', {'error': 'Feature generation failed — try again', 'count': created})
+                return
+            if created:
+                yield sse('done', {'count': created})
+            else:
+                yield sse('error', {
+                    'error': 'Failed to generate features — check GEMINI_API_KEY or try again', 'count': 0,
+                })
+
+        response = StreamingHttpResponse(events(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # don't let a reverse proxy hold events back
+        return response
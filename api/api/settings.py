@@ -136,9 +136,86 @@ GITHUB_CLIENT_SECRET = os.getenv('GITHUB_CLIENT_SECRET', '')
 GITHUB_WEBHOOK_SECRET = os.getenv('GITHUB_WEBHOOK_SECRET', '')
 # Full public URL GitHub will POST events to (e.g. https://yourserver.com/api/webhooks/github/)
 GITHUB_WEBHOOK_URL = os.getenv('GITHUB_WEBHOOK_URL', 'http://localhost:8000/api/webhooks/github/')
+# Pooled HTTP client used for all GitHub REST calls (services/github.py).
+# GITHUB_API_URL can point at a local fake GitHub for testing.
+GITHUB_API_URL = os.getenv('GITHUB_API_URL', 'https://api.github.com')
+GITHUB_HTTP_POOL_MAXSIZE = int(os.getenv('GITHUB_HTTP_POOL_MAXSIZE', '10'))
+GITHUB_HTTP_CONNECT_TIMEOUT = float(os.getenv('GITHUB_HTTP_CONNECT_TIMEOUT', '3.05'))
+GITHUB_HTTP_READ_TIMEOUT = float(os.getenv('GITHUB_HTTP_READ_TIMEOUT', '10'))
+GITHUB_HTTP_RETRIES = int(os.getenv('GITHUB_HTTP_RETRIES', '3'))
+# Responses kept for If-None-Match revalidation, and parallel repo-summary probes
+GITHUB_ETAG_CACHE_SIZE = int(os.getenv('GITHUB_ETAG_CACHE_SIZE', '256'))
+GITHUB_SUMMARY_MAX_WORKERS = int(os.getenv('GITHUB_SUMMARY_MAX_WORKERS', '8'))
+# Rate-limit scheduling: background calls never spend the last RESERVE requests of
+# a token's window and are paced to spread the rest; interactive calls wait at most
+# GITHUB_INTERACTIVE_MAX_WAIT seconds for budget before being sent anyway.
+GITHUB_RATE_LIMIT_RESERVE = int(os.getenv('GITHUB_RATE_LIMIT_RESERVE', '100'))
+GITHUB_BACKGROUND_BURST = int(os.getenv('GITHUB_BACKGROUND_BURST', '10'))
+GITHUB_INTERACTIVE_MAX_WAIT = float(os.getenv('GITHUB_INTERACTIVE_MAX_WAIT', '5'))
+GITHUB_BACKGROUND_MAX_WAIT = float(os.getenv('GITHUB_BACKGROUND_MAX_WAIT', '300'))
+# Task edits mark their feature dirty (Feature.body_dirty_at); its issue body is
+# re-rendered and PATCHed once this many seconds after the first edit. 0 syncs inline
+# on every edit. `manage.py process_webhooks` flushes marks the web process missed,
+# and retries a failed PATCH after ISSUE_SYNC_RETRY_SECONDS.
+ISSUE_SYNC_DEBOUNCE_SECONDS = float(os.getenv('ISSUE_SYNC_DEBOUNCE_SECONDS', '2'))
+ISSUE_SYNC_RETRY_SECONDS = float(os.getenv('ISSUE_SYNC_RETRY_SECONDS', '60'))
+
+# ---------------------------------------------------------------------------
+# Webhook ingestion — when async, verified deliveries are queued in MongoDB
+# and acknowledged with 202; `manage.py process_webhooks` drains the queue.
+# ---------------------------------------------------------------------------
+GITHUB_WEBHOOK_ASYNC = os.getenv('GITHUB_WEBHOOK_ASYNC', 'False').lower() in ('true', '1', 'yes')
+WEBHOOK_WORKER_CONCURRENCY = int(os.getenv('WEBHOOK_WORKER_CONCURRENCY', '4'))
+WEBHOOK_WORKER_POLL_SECONDS = float(os.getenv('WEBHOOK_WORKER_POLL_SECONDS', '1.0'))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv('WEBHOOK_MAX_ATTEMPTS', '5'))
+WEBHOOK_RETRY_BACKOFF_SECONDS = float(os.getenv('WEBHOOK_RETRY_BACKOFF_SECONDS', '5'))
+WEBHOOK_RETRY_MAX_BACKOFF_SECONDS = float(os.getenv('WEBHOOK_RETRY_MAX_BACKOFF_SECONDS', '600'))
+# A delivery left 'processing' longer than this (crashed worker) is handed out again
+WEBHOOK_LEASE_SECONDS = float(os.getenv('WEBHOOK_LEASE_SECONDS', '300'))
+# How long X-GitHub-Delivery ids are remembered for redelivery deduplication
+# (applied when the TTL index is created by migration 0008)
+WEBHOOK_DELIVERY_TTL_SECONDS = int(os.getenv('WEBHOOK_DELIVERY_TTL_SECONDS', str(7 * 24 * 3600)))
+# A delivery still 'in_progress' this long after it was claimed (the request crashed)
+# is handed to the next redelivery instead of being rejected as a duplicate
+WEBHOOK_DELIVERY_CLAIM_TIMEOUT_SECONDS = float(os.getenv('WEBHOOK_DELIVERY_CLAIM_TIMEOUT_SECONDS', '600'))
+# In-process cache of the Workspace a delivery's repository routes to; entries are
+# dropped when this process saves or deletes the workspace, and expire after the TTL
+WORKSPACE_CACHE_TTL_SECONDS = float(os.getenv('WORKSPACE_CACHE_TTL_SECONDS', '60'))
+WORKSPACE_CACHE_MAXSIZE = int(os.getenv('WORKSPACE_CACHE_MAXSIZE', '1024'))
+# New workspaces are bootstrapped (webhook, repo scan, generated features) by
+# `manage.py process_webhooks`, this many jobs at a time per worker. A job left
+# 'running' with no progress for TIMEOUT seconds (its worker died) is resumed, up to
+# MAX_ATTEMPTS runs in all.
+BOOTSTRAP_MAX_WORKERS = int(os.getenv('BOOTSTRAP_MAX_WORKERS', '4'))
+BOOTSTRAP_JOB_TIMEOUT_SECONDS = float(os.getenv('BOOTSTRAP_JOB_TIMEOUT_SECONDS', '600'))
+BOOTSTRAP_MAX_ATTEMPTS = int(os.getenv('BOOTSTRAP_MAX_ATTEMPTS', '3'))
+# Service counters are process-local, so each worker writes its own to MongoDB
+# (ProcessMetrics) this often for the metrics endpoint. A stopped worker's row expires
+# after the TTL (applied when the TTL index is created by migration 0023).
+METRICS_SNAPSHOT_SECONDS = float(os.getenv('METRICS_SNAPSHOT_SECONDS', '30'))
+METRICS_SNAPSHOT_TTL_SECONDS = int(os.getenv('METRICS_SNAPSHOT_TTL_SECONDS', '3600'))
 
 # ---------------------------------------------------------------------------
 # Gemini AI
 # ---------------------------------------------------------------------------
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', '')
+# A model answering 429/503 is skipped for this long, doubling on repeats up to the max
+GEMINI_MODEL_COOLDOWN_SECONDS = float(os.getenv('GEMINI_MODEL_COOLDOWN_SECONDS', '30'))
+GEMINI_MODEL_MAX_COOLDOWN_SECONDS = float(os.getenv('GEMINI_MODEL_MAX_COOLDOWN_SECONDS', '600'))
+# Responses to identical prompts are reused from MongoDB. The TTL is applied when the
+# index is created by migration 0014; MAX_ENTRIES caps the collection (0 disables).
+GEMINI_CACHE_TTL_SECONDS = int(os.getenv('GEMINI_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+GEMINI_CACHE_MAX_ENTRIES = int(os.getenv('GEMINI_CACHE_MAX_ENTRIES', '5000'))
+# Pushes and merged PRs needing task-completion analysis are queued in MongoDB
+# (CommitAnalysis) and `manage.py process_webhooks` analyzes each workspace's queue in
+# one Gemini call once its oldest entry is this many seconds old (at most MAX_PUSHES
+# per call). Failed batches are retried with the WEBHOOK_RETRY_* backoff, up to
+# WEBHOOK_MAX_ATTEMPTS. 0 analyzes each push inline.
+GEMINI_BATCH_WINDOW_SECONDS = float(os.getenv('GEMINI_BATCH_WINDOW_SECONDS', '5'))
+GEMINI_BATCH_MAX_PUSHES = int(os.getenv('GEMINI_BATCH_MAX_PUSHES', '20'))
+# How long finished analyses are kept (applied when the TTL index is created by migration 0018)
+COMMIT_ANALYSIS_TTL_SECONDS = int(os.getenv('COMMIT_ANALYSIS_TTL_SECONDS', str(7 * 24 * 3600)))
+# At most this many open tasks, ranked by BM25 relevance to the commits, go into a
+# commit-analysis prompt
+GEMINI_TASK_CANDIDATES = int(os.getenv('GEMINI_TASK_CANDIDATES', '50'))
 
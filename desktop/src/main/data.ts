@@ -261,6 +261,7 @@ export interface Task {
     assigned_to: User | null
     completed_by_commit: string
     checkbox_index: number | null
+    checkbox_depth: number
     created_at: string
     updated_at: string
 }